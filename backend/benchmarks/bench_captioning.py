@@ -0,0 +1,109 @@
+"""
+Benchmark batched image captioning against the one-at-a-time loop.
+
+Compares `ImageRAG.generate_image_caption` called once per image with
+`ImageRAG.generate_image_captions` at one or more batch sizes, and reports
+images per second for each mode.
+
+Usage (from the backend directory):
+    python benchmarks/bench_captioning.py --images 16 --batch-sizes 2 4 8
+    python benchmarks/bench_captioning.py --image-dir /path/to/images
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from opensearch_utils import ImageRAG  # noqa: E402
+
+
+def synthetic_images(count: int, size: int = 384) -> List[Image.Image]:
+    """Generate simple, deterministic test images with shapes and text."""
+    images = []
+    for i in range(count):
+        image = Image.new("RGB", (size, size), color=(30 * (i % 8), 120, 200 - 20 * (i % 8)))
+        draw = ImageDraw.Draw(image)
+        draw.rectangle([40 + i % 50, 40, 200, 200], fill=(240, 200, 40))
+        draw.ellipse([180, 160 + i % 40, 340, 320], fill=(20, 20, 160))
+        draw.text((50, 330), f"Sample image {i}", fill=(255, 255, 255))
+        images.append(image)
+    return images
+
+
+def load_images(image_dir: str, limit: int) -> List[Image.Image]:
+    """Load up to `limit` images from a directory."""
+    images = []
+    for name in sorted(os.listdir(image_dir)):
+        if len(images) >= limit:
+            break
+        try:
+            images.append(Image.open(os.path.join(image_dir, name)).convert("RGB"))
+        except Exception:
+            continue
+    return images
+
+
+def bench_sequential(image_rag: ImageRAG, images: List[Image.Image]) -> float:
+    """Caption images one at a time through the single-image API; return images/sec."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = []
+        for i, image in enumerate(images):
+            path = os.path.join(tmp_dir, f"image_{i}.png")
+            image.save(path)
+            paths.append(path)
+
+        start = time.perf_counter()
+        for path in paths:
+            image_rag.generate_image_caption(path)
+        elapsed = time.perf_counter() - start
+    return len(images) / elapsed
+
+
+def bench_batched(image_rag: ImageRAG, images: List[Image.Image], batch_size: int) -> float:
+    """Caption images with the batched API; return images/sec."""
+    start = time.perf_counter()
+    results = image_rag.generate_image_captions(images, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+
+    failed = sum(1 for result in results if result["error"])
+    if failed:
+        print(f"  warning: {failed} images failed at batch size {batch_size}")
+    return len(images) / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=16, help="Number of images to caption")
+    parser.add_argument("--image-dir", help="Directory of real images to use instead of synthetic ones")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[2, 4, 8])
+    args = parser.parse_args()
+
+    images = load_images(args.image_dir, args.images) if args.image_dir else synthetic_images(args.images)
+    if not images:
+        sys.exit("No images to benchmark")
+
+    image_rag = ImageRAG()
+
+    # Load the captioner and run one warm-up caption outside the timed region
+    image_rag.generate_image_captions(images[:1], batch_size=1)
+    print(f"Captioner: {image_rag.caption_model.config.model_type} on {image_rag.device}")
+    print(f"Images: {len(images)}\n")
+
+    baseline = bench_sequential(image_rag, images)
+    print(f"{'mode':<20}{'images/sec':>12}{'speedup':>10}")
+    print(f"{'one-at-a-time':<20}{baseline:>12.3f}{1.0:>10.2f}")
+
+    for batch_size in args.batch_sizes:
+        throughput = bench_batched(image_rag, images, batch_size)
+        print(f"{f'batch={batch_size}':<20}{throughput:>12.3f}{throughput / baseline:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
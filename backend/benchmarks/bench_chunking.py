@@ -0,0 +1,169 @@
+"""
+Benchmark the token-budgeted chunker against the line-based `chunk_code` splitter.
+
+Builds documents from the sample corpus in two layouts that stress the line
+splitter in opposite ways:
+- "pdf": each paragraph on a single long line, like PyPDF2 page text
+- "docx": one sentence per line, like short-paragraph DOCX files
+and reports, per splitter and layout:
+- chunk count and chunks longer than the embedder's max sequence length
+- ingest time (chunking + embedding every chunk)
+- retrieval recall@k: the first sentence of each passage is the query, and a
+  retrieved chunk is relevant if it overlaps the passage (or one of its copies)
+
+Usage (from the backend directory):
+    python benchmarks/bench_chunking.py
+    python benchmarks/bench_chunking.py --corpus my_corpus.txt --copies 5 --k 1 3 5
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chunking import TokenChunker  # noqa: E402
+from config import EMBEDDING_MODEL  # noqa: E402
+from model_registry import get_embedding_model  # noqa: E402
+from utils import chunk_code  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "sample_corpus.txt")
+
+
+def load_passages(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        return [p.strip().replace("\n", " ") for p in f.read().split("\n\n") if p.strip()]
+
+
+def build_document(passages: List[str], layout: str) -> Tuple[str, List[Tuple[int, int]], List[str]]:
+    """
+    Lay passages out as one document.
+
+    Returns:
+        Tuple: Document text, (start, end) span of every passage, and one query per passage
+    """
+    parts, spans, queries = [], [], []
+    offset = 0
+    for passage in passages:
+        sentences = passage.split(". ")
+        queries.append(sentences[0])
+        text = passage if layout == "pdf" else ".\n".join(sentences)
+        spans.append((offset, offset + len(text)))
+        parts.append(text)
+        offset += len(text) + 1
+    # PDF-like text puts a page's worth of passages (eight) on each line
+    document = ""
+    for i, part in enumerate(parts):
+        separator = "\n" if layout == "docx" or i % 8 == 7 else " "
+        document += part + separator
+    return document, spans, queries
+
+
+def line_chunks(document: str) -> List[Tuple[str, int, int]]:
+    """Chunk with `chunk_code` and recover each chunk's character span."""
+    chunks, cursor = [], 0
+    for chunk in chunk_code(document):
+        start = document.find(chunk, max(0, cursor - len(chunk)))
+        chunks.append((chunk, start, start + len(chunk)))
+        cursor = start + len(chunk)
+    return chunks
+
+
+def token_chunks(chunker: TokenChunker, document: str) -> List[Tuple[str, int, int]]:
+    return [(c["text"], c["start_char"], c["end_char"]) for c in chunker.iter_chunks([document])]
+
+
+def evaluate(
+    name: str,
+    split_fn,
+    document: str,
+    spans: List[Tuple[int, int]],
+    queries: List[str],
+    unique: int,
+    embedder,
+    tokenizer,
+    max_seq_length: int,
+    ks: List[int]
+) -> Dict:
+    start = time.perf_counter()
+    chunks = split_fn(document)
+    vectors = np.asarray(embedder.embed_documents([text for text, _, _ in chunks]), dtype=np.float32)
+    ingest_seconds = time.perf_counter() - start
+
+    token_counts = [len(ids) for ids in tokenizer([text for text, _, _ in chunks])["input_ids"]]
+    truncated = sum(1 for count in token_counts if count > max_seq_length)
+
+    query_vectors = np.asarray(embedder.embed_documents(queries[:unique]), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    ranking = np.argsort(-(query_vectors @ vectors.T), axis=1)
+
+    recall = {}
+    for k in ks:
+        hits = 0
+        for query_index, top in enumerate(ranking[:, :k]):
+            # Copies of passage q sit at q, q + unique, q + 2 * unique, ...
+            relevant = spans[query_index::unique]
+            hits += any(
+                chunks[i][1] < span_end and chunks[i][2] > span_start
+                for i in top for span_start, span_end in relevant
+            )
+        recall[k] = hits / unique
+
+    return {
+        "name": name,
+        "chunks": len(chunks),
+        "truncated": truncated,
+        "mean_tokens": float(np.mean(token_counts)),
+        "ingest_seconds": ingest_seconds,
+        "recall": recall,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Text file of passages separated by blank lines")
+    parser.add_argument("--copies", type=int, default=3, help="Repeat the corpus to make longer documents")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    args = parser.parse_args()
+
+    unique_passages = load_passages(args.corpus)
+    passages = unique_passages * args.copies
+    embedder = get_embedding_model(args.model)
+    chunker = TokenChunker(model_name=args.model)
+    max_seq_length = getattr(embedder.client, "max_seq_length", chunker.tokenizer.model_max_length)
+
+    print(f"Model: {args.model} (max sequence length {max_seq_length})")
+    print(f"Token chunker: {chunker.max_tokens} tokens, {chunker.overlap_tokens} overlap")
+    print(f"Passages: {len(unique_passages)} x {args.copies} copies\n")
+
+    header = f"{'layout':<8}{'splitter':<10}{'chunks':>8}{'truncated':>11}{'mean tok':>10}{'ingest s':>10}"
+    header += "".join(f"{f'recall@{k}':>11}" for k in args.k)
+    print(header)
+
+    splitters = [
+        ("lines", line_chunks),
+        ("tokens", lambda document: token_chunks(chunker, document)),
+    ]
+    for layout in ("pdf", "docx"):
+        document, spans, queries = build_document(passages, layout)
+        for name, split_fn in splitters:
+            result = evaluate(
+                name, split_fn, document, spans, queries, len(unique_passages),
+                embedder, chunker.tokenizer, max_seq_length, args.k
+            )
+            row = (
+                f"{layout:<8}{name:<10}{result['chunks']:>8}{result['truncated']:>11}"
+                f"{result['mean_tokens']:>10.1f}{result['ingest_seconds']:>10.2f}"
+            )
+            row += "".join(f"{result['recall'][k]:>11.3f}" for k in args.k)
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark streaming DOCX extraction against the python-docx object model.
+
+Builds DOCX files of increasing size from the sample text corpus with
+python-docx (paragraphs plus a table every few paragraphs) and reports, per
+extractor and size:
+- extraction time
+- peak Python memory while extracting (tracemalloc); lxml's own C allocations
+  are not traced, so the python-docx figure is a lower bound
+- characters extracted; python-docx's `doc.paragraphs` skips table text
+
+The streaming extractor's peak should stay flat as documents grow.
+
+Usage (from the backend directory):
+    python benchmarks/bench_docx_extraction.py
+    python benchmarks/bench_docx_extraction.py --paragraphs 1000 10000 50000
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from docx import Document
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import iter_docx_blocks  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "sample_corpus.txt")
+
+# A 4x3 table after every this many paragraphs
+TABLE_EVERY = 20
+
+
+def build_docx(passages: List[str], paragraphs: int) -> bytes:
+    doc = Document()
+    for i in range(paragraphs):
+        doc.add_paragraph(passages[i % len(passages)])
+        if i % TABLE_EVERY == TABLE_EVERY - 1:
+            table = doc.add_table(rows=4, cols=3)
+            for r, row in enumerate(table.rows):
+                for c, cell in enumerate(row.cells):
+                    cell.text = passages[(i + r * 3 + c) % len(passages)][:80]
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def python_docx_text(data: bytes) -> int:
+    doc = Document(io.BytesIO(data))
+    return len("\n".join(para.text for para in doc.paragraphs))
+
+
+def streaming_text(data: bytes) -> int:
+    # Consume block by block, as the chunker does, without joining
+    return sum(len(block) + 1 for block in iter_docx_blocks(io.BytesIO(data)))
+
+
+def measure(fn: Callable[[bytes], int], data: bytes) -> Dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    chars = fn(data)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": seconds, "peak_mb": peak / 2**20, "chars": chars}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Text file of passages separated by blank lines")
+    parser.add_argument("--paragraphs", type=int, nargs="+", default=[1000, 5000, 20000])
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        passages = [p.strip().replace("\n", " ") for p in f.read().split("\n\n") if p.strip()]
+
+    print(f"{'paragraphs':>10}{'docx MB':>9}  {'extractor':<12}{'seconds':>9}{'peak MB':>9}{'chars':>12}")
+    for paragraphs in args.paragraphs:
+        data = build_docx(passages, paragraphs)
+        for name, fn in (("python-docx", python_docx_text), ("streaming", streaming_text)):
+            result = measure(fn, data)
+            print(
+                f"{paragraphs:>10}{len(data) / 2**20:>9.2f}  {name:<12}{result['seconds']:>9.2f}"
+                f"{result['peak_mb']:>9.1f}{result['chars']:>12}"
+            )
+
+
+if __name__ == "__main__":
+    main()
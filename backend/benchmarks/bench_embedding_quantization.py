@@ -0,0 +1,129 @@
+"""
+Benchmark int8 dynamically quantized embeddings against the fp32 baseline.
+
+Encodes a sample corpus with the fp32 and the int8 variants of the embedding
+model on CPU and reports, for each:
+- encode throughput (passages per second) and weight size
+- self-retrieval recall@k: the first sentence of each passage is used as the
+  query and must retrieve its own passage within the top k
+- overlap@k with fp32 (int8 only): share of the fp32 top-k neighbours that the
+  int8 model also returns in its top k
+
+Usage (from the backend directory):
+    python benchmarks/bench_embedding_quantization.py
+    python benchmarks/bench_embedding_quantization.py --corpus my_corpus.txt --k 1 5 10 --repeat 3
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import EMBEDDING_MODEL  # noqa: E402
+from model_registry import EmbeddingModelRegistry  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "sample_corpus.txt")
+
+
+def load_corpus(path: str) -> Tuple[List[str], List[str]]:
+    """
+    Load passages separated by blank lines and derive one query per passage.
+
+    Returns:
+        Tuple[List[str], List[str]]: Passages and their first-sentence queries
+    """
+    with open(path, encoding="utf-8") as f:
+        passages = [p.strip().replace("\n", " ") for p in f.read().split("\n\n") if p.strip()]
+    queries = [p.split(". ")[0] for p in passages]
+    return passages, queries
+
+
+def normalize(vectors: List[List[float]]) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def top_k(queries: np.ndarray, passages: np.ndarray, k: int) -> np.ndarray:
+    """Return the indices of the k most similar passages for every query."""
+    scores = queries @ passages.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def run_variant(
+    registry: EmbeddingModelRegistry,
+    model_name: str,
+    quantization: str,
+    passages: List[str],
+    queries: List[str],
+    repeat: int
+) -> Dict:
+    """Load one variant, time passage encoding and embed the queries."""
+    embedder = registry.get(model_name, "cpu", quantization)
+    # Warm-up outside the timed region
+    embedder.embed_documents(passages[:4])
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        passage_vectors = embedder.embed_documents(passages)
+    elapsed = time.perf_counter() - start
+
+    # The variant just loaded is the most recent registry entry
+    stats = registry.stats()[-1]
+    return {
+        "quantization": stats["quantization"],
+        "throughput": len(passages) * repeat / elapsed,
+        "parameter_mb": stats["parameter_bytes"] / (1024 * 1024),
+        "passages": normalize(passage_vectors),
+        "queries": normalize(embedder.embed_documents(queries)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Text file of passages separated by blank lines")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--repeat", type=int, default=3, help="Times to encode the corpus for the throughput figure")
+    args = parser.parse_args()
+
+    passages, queries = load_corpus(args.corpus)
+    if not passages:
+        sys.exit(f"No passages in {args.corpus}")
+
+    registry = EmbeddingModelRegistry()
+    baseline = run_variant(registry, args.model, "none", passages, queries, args.repeat)
+    quantized = run_variant(registry, args.model, "int8", passages, queries, args.repeat)
+    if quantized["quantization"] != "int8":
+        sys.exit("int8 quantization was not applied; see the log for the reason")
+
+    print(f"Model: {args.model}")
+    print(f"Passages: {len(passages)}, queries: {len(queries)}, repeat: {args.repeat}\n")
+
+    header = f"{'variant':<10}{'passages/sec':>14}{'weights MB':>12}"
+    header += "".join(f"{f'recall@{k}':>11}" for k in args.k)
+    header += "".join(f"{f'overlap@{k}':>12}" for k in args.k)
+    print(header)
+
+    expected = np.arange(len(passages))[:, None]
+    for variant in (baseline, quantized):
+        row = f"{variant['quantization']:<10}{variant['throughput']:>14.2f}{variant['parameter_mb']:>12.1f}"
+        for k in args.k:
+            hits = top_k(variant["queries"], variant["passages"], k) == expected
+            row += f"{hits.any(axis=1).mean():>11.3f}"
+        for k in args.k:
+            reference = top_k(baseline["queries"], baseline["passages"], k)
+            candidate = top_k(variant["queries"], variant["passages"], k)
+            overlap = np.mean([len(set(r) & set(c)) / k for r, c in zip(reference, candidate)])
+            row += f"{overlap:>12.3f}"
+        print(row)
+
+    print(f"\nSpeedup: {quantized['throughput'] / baseline['throughput']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark PDF text extraction backends.
+
+Reports pages per second for every installed backend in `pdf_extractors`,
+serially in one process and with the upload path's page-range parallelism
+(ExtractionStage), on a corpus of PDFs:
+- by default, small / medium / large PDFs rendered from the sample text corpus
+  with PyMuPDF into a temporary directory (the Dockerfile installs PyMuPDF)
+- or every *.pdf in --pdf-dir, e.g. real uploads
+
+Usage (from the backend directory):
+    python benchmarks/bench_pdf_extraction.py
+    python benchmarks/bench_pdf_extraction.py --pdf-dir ~/pdfs --repeat 3 --workers 4
+"""
+
+import argparse
+import asyncio
+import glob
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extraction import ExtractionStage  # noqa: E402
+from pdf_extractors import available_pdf_backends, count_pdf_pages, extract_pdf_page_range  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "sample_corpus.txt")
+
+# Generated corpus: name -> pages
+CORPUS_SIZES = {"small": 8, "medium": 64, "large": 256}
+
+
+def generate_corpus(text_path: str, out_dir: str) -> List[str]:
+    """Render the text corpus into PDFs of CORPUS_SIZES pages; returns their paths."""
+    try:
+        import pymupdf
+    except ImportError:
+        import fitz as pymupdf
+
+    with open(text_path, encoding="utf-8") as f:
+        passages = [p.strip().replace("\n", " ") for p in f.read().split("\n\n") if p.strip()]
+
+    paths = []
+    for name, page_count in CORPUS_SIZES.items():
+        doc = pymupdf.open()
+        for number in range(page_count):
+            page = doc.new_page()
+            # Three passages per page, cycling through the corpus
+            body = "\n\n".join(passages[(number * 3 + i) % len(passages)] for i in range(3))
+            page.insert_textbox(page.rect + (54, 54, -54, -54), body, fontsize=10)
+        path = os.path.join(out_dir, f"{name}.pdf")
+        doc.save(path)
+        doc.close()
+        paths.append(path)
+    return paths
+
+
+def bench_backend(backend: str, files: List[Tuple[str, bytes, int]], repeat: int) -> Dict:
+    """Extract every file with one backend in this process."""
+    seconds, chars = 0.0, 0
+    for _ in range(repeat):
+        for _, data, page_count in files:
+            start = time.perf_counter()
+            pages, used = extract_pdf_page_range(data, 1, page_count, preferred=backend)
+            seconds += time.perf_counter() - start
+            if used != backend:
+                return {"error": f"fell back to {used}"}
+            chars += sum(len(text) for _, text in pages)
+    total_pages = sum(page_count for _, _, page_count in files) * repeat
+    return {"pages_per_second": total_pages / seconds, "seconds": seconds / repeat, "chars": chars // repeat}
+
+
+async def bench_stage(stage: ExtractionStage, files: List[Tuple[str, bytes, int]], repeat: int) -> Dict:
+    """Extract the files through the process-pool stage, one file at a time."""
+    # Warm the pool so process start-up is not counted
+    await stage.extract(files[0][0], "pdf", files[0][1])
+
+    per_file: Dict[str, float] = {}
+    ranges: Dict[str, int] = {}
+    for _ in range(repeat):
+        for name, data, _ in files:
+            start = time.perf_counter()
+            result = await stage.extract(name, "pdf", data)
+            per_file[name] = per_file.get(name, 0.0) + time.perf_counter() - start
+            ranges[name] = result["page_ranges"]
+    seconds = sum(per_file.values())
+    total_pages = sum(page_count for _, _, page_count in files) * repeat
+    return {
+        "pages_per_second": total_pages / seconds,
+        "seconds": seconds / repeat,
+        "per_file": per_file,
+        "ranges": ranges,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf-dir", help="Directory of PDFs to use instead of the generated corpus")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Text corpus for the generated PDFs")
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Worker processes for the stage")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = sorted(glob.glob(os.path.join(args.pdf_dir, "*.pdf"))) if args.pdf_dir else generate_corpus(args.corpus, tmp)
+        files = []
+        for path in paths:
+            with open(path, "rb") as f:
+                data = f.read()
+            files.append((os.path.basename(path), data, count_pdf_pages(data)[0]))
+
+    if not files:
+        sys.exit("No PDFs found")
+
+    print(f"Corpus: {', '.join(f'{name} ({pages} pages)' for name, _, pages in files)}")
+    print(f"Repeat: {args.repeat}\n")
+
+    print(f"{'backend':<14}{'pages/s':>10}{'seconds':>10}{'chars':>12}")
+    for backend in available_pdf_backends():
+        result = bench_backend(backend, files, args.repeat)
+        if "error" in result:
+            print(f"{backend:<14}{result['error']:>32}")
+            continue
+        print(f"{backend:<14}{result['pages_per_second']:>10.1f}{result['seconds']:>10.2f}{result['chars']:>12}")
+
+    stage = ExtractionStage(workers=args.workers, max_concurrent=1, timeout_seconds=0)
+    try:
+        result = asyncio.run(bench_stage(stage, files, args.repeat))
+    finally:
+        stage.shutdown()
+    print(f"\nExtractionStage ({args.workers} workers, page-range parallelism):")
+    print(f"{'file':<14}{'ranges':>10}{'seconds':>10}")
+    for name, _, _ in files:
+        seconds = result["per_file"][name] / args.repeat
+        print(f"{name:<14}{result['ranges'][name]:>10}{seconds:>10.2f}")
+    print(f"{'total':<14}{'':>10}{result['seconds']:>10.2f}  ({result['pages_per_second']:.1f} pages/s)")
+
+
+if __name__ == "__main__":
+    main()
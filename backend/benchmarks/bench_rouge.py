@@ -0,0 +1,112 @@
+"""
+Benchmark `rouge.score` against `rouge_score.RougeScorer` on uploaded-size documents.
+
+Builds documents of several sizes from the sample corpus, each with a summary
+of sentences sampled from it, and reports per size:
+- seconds per score with `rouge_score` (stemmer on, as stored before)
+- seconds per score with `rouge.score`, cold and with the document's
+  tokenization cached (a second summary of the same document)
+- the largest difference between the two implementations' scores
+
+Exits with an error if the scores differ by more than --tolerance.
+
+Usage (from the backend directory):
+    python benchmarks/bench_rouge.py
+    python benchmarks/bench_rouge.py --sizes 2000 50000 --repeat 1
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Callable, List, Tuple
+
+from rouge_score import rouge_scorer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rouge  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "sample_corpus.txt")
+
+
+def load_passages(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        return [p.strip().replace("\n", " ") for p in f.read().split("\n\n") if p.strip()]
+
+
+def build_case(passages: List[str], words: int, seed: int) -> Tuple[str, str]:
+    """A document of about `words` words and a summary of about 5% of its sentences."""
+    rng = random.Random(seed)
+    document: List[str] = []
+    count = 0
+    while count < words:
+        passage = rng.choice(passages)
+        document.append(passage)
+        count += len(passage.split())
+    text = "\n\n".join(document)
+
+    sentences = [s.strip() + "." for s in text.replace("\n", " ").split(".") if s.strip()]
+    summary = " ".join(rng.sample(sentences, max(1, len(sentences) // 20)))
+    return text, summary
+
+
+def timed(fn: Callable[[], object], repeat: int) -> Tuple[float, object]:
+    """Best-of-`repeat` seconds per call, and the last result."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Text file of passages separated by blank lines")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000], help="Document sizes in words")
+    parser.add_argument("--repeat", type=int, default=1, help="Timed runs per measurement (best is reported)")
+    parser.add_argument("--tolerance", type=float, default=1e-9, help="Largest allowed score difference")
+    args = parser.parse_args()
+
+    passages = load_passages(args.corpus)
+    reference = rouge_scorer.RougeScorer(list(rouge.DEFAULT_ROUGE_TYPES), use_stemmer=True)
+
+    print(f"ROUGE types: {', '.join(rouge.DEFAULT_ROUGE_TYPES)}\n")
+    print(f"{'words':>8}{'summary':>9}{'rouge_score s':>15}{'cold s':>10}{'cached s':>10}{'speedup':>9}{'max diff':>11}")
+
+    worst = 0.0
+    for i, words in enumerate(args.sizes):
+        document, summary = build_case(passages, words, seed=i)
+        _, second_summary = build_case(passages, words, seed=i + 1000)
+
+        reference_seconds, expected = timed(lambda: reference.score(document, summary), args.repeat)
+
+        def cold() -> object:
+            # Each run starts without the document's tokenization
+            rouge._documents.clear()
+            return rouge.score(document, summary)
+
+        cold_seconds, actual = timed(cold, args.repeat)
+        rouge.score(document, summary)
+        cached_seconds, _ = timed(lambda: rouge.score(document, second_summary), args.repeat)
+
+        diff = max(
+            abs(a - b)
+            for rouge_type in rouge.DEFAULT_ROUGE_TYPES
+            for a, b in zip(expected[rouge_type], actual[rouge_type])
+        )
+        worst = max(worst, diff)
+        print(
+            f"{words:>8}{len(summary.split()):>9}{reference_seconds:>15.4f}{cold_seconds:>10.4f}"
+            f"{cached_seconds:>10.4f}{reference_seconds / cold_seconds:>8.1f}x{diff:>11.2e}"
+        )
+
+    if worst > args.tolerance:
+        sys.exit(f"Scores differ from rouge_score by {worst:.2e} (tolerance {args.tolerance:.0e})")
+
+
+if __name__ == "__main__":
+    main()
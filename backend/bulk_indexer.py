@@ -0,0 +1,223 @@
+"""
+Bulk writes to OpenSearch.
+
+This module provides functionality for:
+- Streaming index, update and delete actions through the `_bulk` API in size-bounded batches
+- Optionally sending batches from several worker threads in parallel
+- Turning index refresh off during large ingests and refreshing once at the end
+- Reporting per-item failures instead of failing the whole stream
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from opensearchpy import OpenSearch, helpers
+
+from config import (
+    BULK_CHUNK_DOCS,
+    BULK_CHUNK_BYTES,
+    BULK_WORKERS,
+    BULK_SUSPEND_REFRESH_MIN_DOCS
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Number of running ingests that suspended refresh on each index, so the
+# interval is only restored when the last of them finishes
+_suspended: Dict[str, Dict[str, Any]] = {}
+_suspended_lock = threading.Lock()
+
+# Failed items kept in a report; the count is always exact
+_MAX_REPORTED_ERRORS = 100
+
+
+class BulkIndexer:
+    """
+    Send index, update and delete actions to OpenSearch as one bulk stream.
+    """
+
+    def __init__(
+        self,
+        client: OpenSearch,
+        chunk_docs: int = BULK_CHUNK_DOCS,
+        chunk_bytes: int = BULK_CHUNK_BYTES,
+        workers: int = BULK_WORKERS
+    ) -> None:
+        """
+        Args:
+            client: OpenSearch client
+            chunk_docs: Maximum actions per bulk request
+            chunk_bytes: Maximum body size of a bulk request
+            workers: Threads sending bulk requests; 1 streams them sequentially
+        """
+        self.client = client
+        self.chunk_docs = max(1, chunk_docs)
+        self.chunk_bytes = max(1, chunk_bytes)
+        self.workers = max(1, workers)
+
+    @contextmanager
+    def refresh_suspended(self, index: str) -> Iterator[None]:
+        """
+        Turn periodic refresh off for `index` and refresh once on exit.
+
+        Nested and concurrent suspensions of the same index are counted; the
+        original refresh interval is restored when the last one exits.
+        """
+        with _suspended_lock:
+            state = _suspended.get(index)
+            if state is None:
+                settings = self.client.indices.get_settings(index=index, name="index.refresh_interval")
+                previous = settings.get(index, {}).get("settings", {}).get("index", {}).get("refresh_interval")
+                self.client.indices.put_settings(index=index, body={"index": {"refresh_interval": "-1"}})
+                state = _suspended[index] = {"count": 0, "previous": previous}
+                logger.debug(f"Suspended refresh on '{index}' (was {previous or 'default'})")
+            state["count"] += 1
+
+        try:
+            yield
+        finally:
+            with _suspended_lock:
+                state["count"] -= 1
+                if state["count"] == 0:
+                    del _suspended[index]
+                    try:
+                        # None resets the setting to the cluster default
+                        self.client.indices.put_settings(
+                            index=index, body={"index": {"refresh_interval": state["previous"]}}
+                        )
+                    except Exception as e:
+                        logger.error(f"Failed to restore refresh interval on '{index}': {e}")
+            self.client.indices.refresh(index=index)
+
+    def _stream(self, actions: Iterable[Dict[str, Any]]) -> Iterator[tuple]:
+        options = dict(
+            chunk_size=self.chunk_docs,
+            max_chunk_bytes=self.chunk_bytes,
+            raise_on_error=False,
+            raise_on_exception=False,
+        )
+        if self.workers > 1:
+            return helpers.parallel_bulk(self.client, actions, thread_count=self.workers, **options)
+        return helpers.streaming_bulk(self.client, actions, **options)
+
+    def run(
+        self,
+        index: str,
+        actions: Iterable[Dict[str, Any]],
+        suspend_refresh: Optional[bool] = None,
+        refresh: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Send bulk actions for one index and collect per-item results.
+
+        Args:
+            index: Target index
+            actions: Bulk actions (`_op_type`, `_id`, `_source` ...); `_index` defaults to `index`
+            suspend_refresh: Turn refresh off while sending; None decides by the number of
+                actions when `actions` is sized (BULK_SUSPEND_REFRESH_MIN_DOCS)
+            refresh: Refresh once at the end so the writes are searchable
+
+        Returns:
+            Dict: Counts of succeeded and failed items, per-item errors and timing
+        """
+        if suspend_refresh is None:
+            suspend_refresh = hasattr(actions, "__len__") and len(actions) >= BULK_SUSPEND_REFRESH_MIN_DOCS
+
+        report = {"index": index, "succeeded": 0, "failed": 0, "errors": [], "seconds": 0.0}
+        start = time.time()
+
+        def with_index(stream: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+            for action in stream:
+                action.setdefault("_index", index)
+                yield action
+
+        def consume() -> None:
+            for ok, item in self._stream(with_index(actions)):
+                if ok:
+                    report["succeeded"] += 1
+                    continue
+                op_type, result = next(iter(item.items()))
+                # A delete of a missing document is not a failure
+                if op_type == "delete" and result.get("status") == 404:
+                    report["succeeded"] += 1
+                    continue
+                report["failed"] += 1
+                if len(report["errors"]) < _MAX_REPORTED_ERRORS:
+                    report["errors"].append({
+                        "op": op_type,
+                        "id": result.get("_id"),
+                        "status": result.get("status"),
+                        "error": result.get("error") or result.get("exception"),
+                    })
+
+        if suspend_refresh:
+            with self.refresh_suspended(index):
+                consume()
+        else:
+            consume()
+            if refresh:
+                self.client.indices.refresh(index=index)
+
+        report["seconds"] = round(time.time() - start, 3)
+        log = logger.warning if report["failed"] else logger.info
+        log(
+            f"Bulk to '{index}': {report['succeeded']} ok, {report['failed']} failed "
+            f"in {report['seconds']:.2f}s"
+        )
+        return report
+
+    def index_documents(
+        self,
+        index: str,
+        documents: Iterable[Dict[str, Any]],
+        suspend_refresh: Optional[bool] = None,
+        refresh: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Index documents given as {"_id": ..., "_source": {...}} (`_id` optional).
+
+        See `run` for the arguments and the report.
+        """
+        def actions() -> Iterator[Dict[str, Any]]:
+            for doc in documents:
+                action = {"_op_type": "index", "_source": doc["_source"]}
+                if doc.get("_id") is not None:
+                    action["_id"] = doc["_id"]
+                yield action
+
+        if suspend_refresh is None and hasattr(documents, "__len__"):
+            suspend_refresh = len(documents) >= BULK_SUSPEND_REFRESH_MIN_DOCS
+        return self.run(index, actions(), suspend_refresh=suspend_refresh, refresh=refresh)
+
+    def update_documents(
+        self,
+        index: str,
+        updates: Iterable[Dict[str, Any]],
+        refresh: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Partially update documents given as {"_id": ..., "doc": {...}}.
+
+        Only the fields in "doc" are replaced. See `run` for the report.
+        """
+        actions = ({"_op_type": "update", "_id": update["_id"], "doc": update["doc"]} for update in updates)
+        return self.run(index, actions, suspend_refresh=False, refresh=refresh)
+
+    def delete_ids(self, index: str, ids: Iterable[str], refresh: bool = True) -> Dict[str, Any]:
+        """
+        Delete documents by id in bulk; ids that no longer exist count as deleted.
+
+        See `run` for the report.
+        """
+        actions = ({"_op_type": "delete", "_id": doc_id} for doc_id in ids)
+        return self.run(index, actions, suspend_refresh=False, refresh=refresh)
+
+
+# Export public API
+__all__ = [
+    "BulkIndexer",
+]
@@ -0,0 +1,225 @@
+"""
+In-process caches for model outputs.
+
+This module provides functionality for:
+- A thread-safe LRU cache with optional TTL and hit/miss counters
+- A content-addressed caption cache with an optional persistent SQLite tier
+- A shared query embedding cache for the text and CLIP encoders
+- Content fingerprints of extracted document text, for upload dedup
+"""
+
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from config import (
+    CAPTION_CACHE_SIZE,
+    CAPTION_CACHE_PATH,
+    QUERY_CACHE_SIZE,
+    QUERY_CACHE_TTL_SECONDS
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def sha256_bytes(data: bytes) -> str:
+    """Return the hex SHA-256 digest of raw bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def content_fingerprint(text: str) -> str:
+    """
+    Return the SHA-256 of normalized document text.
+
+    Text is NFKC-normalized and whitespace is collapsed, so re-extracting the
+    same file (or a copy with different line wrapping) gives the same fingerprint.
+    """
+    normalized = re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+    return sha256_bytes(normalized.encode("utf-8"))
+
+
+class LRUCache:
+    """
+    Thread-safe bounded LRU cache with an optional time-to-live.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl_seconds: Optional[float] = None) -> None:
+        """
+        Args:
+            maxsize: Maximum number of entries kept before evicting the least recently used
+            ttl_seconds: Optional lifetime of an entry; None keeps entries until evicted
+        """
+        self.maxsize = max(1, maxsize)
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for `key`, or `default` on a miss or expired entry."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, stored_at = entry
+                if self.ttl_seconds is None or time.monotonic() - stored_at < self.ttl_seconds:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store `value` under `key`, evicting the least recently used entry if full."""
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every entry; counters are kept."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class CaptionCache:
+    """
+    Content-addressed image caption cache.
+
+    Captions are keyed by the SHA-256 of the original image bytes plus the
+    captioner model id. Lookups go to an in-memory LRU tier first and then to
+    an optional SQLite tier that survives restarts.
+    """
+
+    def __init__(self, maxsize: int = CAPTION_CACHE_SIZE, path: str = CAPTION_CACHE_PATH) -> None:
+        """
+        Args:
+            maxsize: Entries kept in the in-memory tier
+            path: SQLite file for the persistent tier; empty disables it
+        """
+        self._memory = LRUCache(maxsize=maxsize)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self.persistent_hits = 0
+
+        if path:
+            try:
+                self._conn = sqlite3.connect(path, check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS captions ("
+                    "cache_key TEXT PRIMARY KEY, caption TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+                self._conn.commit()
+                logger.info(f"Caption cache persistent tier at '{path}'")
+            except sqlite3.Error as e:
+                logger.error(f"Could not open caption cache at '{path}', using memory only: {e}")
+                self._conn = None
+
+    @staticmethod
+    def _key(content_hash: str, model_id: str) -> str:
+        return f"{model_id}:{content_hash}"
+
+    def get(self, content_hash: str, model_ids: Iterable[str]) -> Optional[str]:
+        """
+        Return a cached caption for the image, trying each model id in order.
+
+        Args:
+            content_hash: SHA-256 hex digest of the image bytes
+            model_ids: Captioner model ids in order of preference
+
+        Returns:
+            Optional[str]: The cached caption, or None on a miss
+        """
+        for model_id in model_ids:
+            key = self._key(content_hash, model_id)
+            caption = self._memory.get(key)
+            if caption is not None:
+                return caption
+
+            if self._conn is not None:
+                with self._db_lock:
+                    row = self._conn.execute(
+                        "SELECT caption FROM captions WHERE cache_key = ?", (key,)
+                    ).fetchone()
+                if row is not None:
+                    self.persistent_hits += 1
+                    self._memory.put(key, row[0])
+                    return row[0]
+        return None
+
+    def put(self, content_hash: str, model_id: str, caption: str) -> None:
+        """Store a caption in every enabled tier."""
+        key = self._key(content_hash, model_id)
+        self._memory.put(key, caption)
+
+        if self._conn is not None:
+            try:
+                with self._db_lock:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO captions (cache_key, caption, created_at) VALUES (?, ?, ?)",
+                        (key, caption, time.time())
+                    )
+                    self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to persist caption for {content_hash[:12]}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters for both tiers."""
+        return {
+            **self._memory.stats(),
+            "persistent": self._conn is not None,
+            "persistent_hits": self.persistent_hits,
+        }
+
+
+def query_cache_key(model_id: str, query: str) -> Tuple[str, str]:
+    """
+    Build the query embedding cache key for a model and query.
+
+    Whitespace is collapsed and trimmed so trivially different retries share an entry.
+    """
+    return (model_id, re.sub(r"\s+", " ", query).strip())
+
+
+# Query vectors shared by the granite text embedder and the CLIP text tower
+query_embedding_cache = LRUCache(
+    maxsize=QUERY_CACHE_SIZE,
+    ttl_seconds=QUERY_CACHE_TTL_SECONDS or None
+)
+
+
+# Export public API
+__all__ = [
+    "sha256_bytes",
+    "content_fingerprint",
+    "LRUCache",
+    "CaptionCache",
+    "query_cache_key",
+    "query_embedding_cache",
+]
@@ -0,0 +1,297 @@
+"""
+Token-budgeted text chunking for embedding.
+
+This module provides functionality for:
+- Packing text into chunks by the embedding tokenizer's token count
+- Breaking chunks at sentence boundaries, preferring paragraph boundaries
+- Overlapping consecutive chunks by whole sentences, measured in tokens
+- Chunking streamed input incrementally with a generator
+- Tracking the pages each chunk of a paged document came from
+"""
+
+import logging
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import EMBEDDING_MODEL, CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# End of a sentence (terminal punctuation, closing quotes/brackets, whitespace)
+# or a blank line; every match ends a unit
+_BOUNDARY = re.compile(r"[.!?][\"'”’)\]]*\s+|\n[ \t]*\n\s*")
+
+# Streamed text without any boundary is cut at whitespace once the buffer gets this long
+_MAX_BUFFER_CHARS = 20000
+
+
+@lru_cache(maxsize=4)
+def get_chunk_tokenizer(model_name: str = EMBEDDING_MODEL) -> Any:
+    """Return the (cached) HuggingFace tokenizer of an embedding model."""
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(model_name)
+
+
+class TokenChunker:
+    """
+    Pack text into chunks of at most `max_tokens` embedding tokens.
+
+    Text is split into units at sentence ends and blank lines. Units are packed
+    greedily; when the next unit does not fit, the chunk is closed at the last
+    paragraph boundary if that keeps it at least half full, otherwise at the
+    last sentence. The next chunk starts with the trailing sentences of the
+    previous one, up to `overlap_tokens`. A single sentence longer than the
+    budget is split at token boundaries.
+
+    Every chunk is a dict with "text", "start_char", "end_char" and "tokens",
+    where the offsets index into the concatenated input.
+    """
+
+    def __init__(
+        self,
+        tokenizer: Any = None,
+        max_tokens: int = CHUNK_MAX_TOKENS,
+        overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+        model_name: str = EMBEDDING_MODEL,
+        limit_to_model: bool = True
+    ) -> None:
+        """
+        Args:
+            tokenizer: HuggingFace tokenizer; defaults to the embedding model's
+            max_tokens: Token budget per chunk, excluding special tokens
+            overlap_tokens: Maximum tokens repeated from the end of the previous chunk
+            model_name: Embedding model whose tokenizer is used when none is given
+            limit_to_model: Cap the budget at the tokenizer's model length; turn off
+                when the chunks are not embedded (e.g. summarization sections)
+        """
+        self.tokenizer = tokenizer if tokenizer is not None else get_chunk_tokenizer(model_name)
+
+        # Leave room for the special tokens the embedder adds
+        model_max = getattr(self.tokenizer, "model_max_length", None)
+        if limit_to_model and model_max and model_max < 100000 and max_tokens > model_max - 2:
+            logger.warning(f"Chunk budget {max_tokens} exceeds the model limit, using {model_max - 2}")
+            max_tokens = model_max - 2
+
+        self.max_tokens = max(1, max_tokens)
+        self.overlap_tokens = max(0, min(overlap_tokens, self.max_tokens // 2))
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """Return the number of tokens of each text, without special tokens."""
+        if not texts:
+            return []
+        encoded = self.tokenizer(texts, add_special_tokens=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+
+    def _split_long(self, start: int, text: str, paragraph_end: bool) -> List[Tuple[int, str, int, bool]]:
+        """Split a unit longer than the budget into pieces at token boundaries."""
+        piece_tokens = max(1, self.overlap_tokens or self.max_tokens // 4)
+
+        if getattr(self.tokenizer, "is_fast", False):
+            offsets = self.tokenizer(
+                text, add_special_tokens=False, return_offsets_mapping=True
+            )["offset_mapping"]
+            cuts = [offsets[i][0] for i in range(piece_tokens, len(offsets), piece_tokens)]
+        else:
+            # Slow tokenizers have no offsets; approximate with words
+            words = [m.start() for m in re.finditer(r"\S+", text)]
+            cuts = words[piece_tokens::piece_tokens]
+
+        bounds = [0] + [c for c in cuts if c > 0] + [len(text)]
+        pieces = [text[a:b] for a, b in zip(bounds, bounds[1:]) if b > a]
+        counts = self.count_tokens(pieces)
+        return [
+            (start + a, piece, count, paragraph_end and i == len(pieces) - 1)
+            for i, (a, piece, count) in enumerate(zip(bounds, pieces, counts))
+        ]
+
+    def _units(self, stream: Iterable[str]) -> Iterator[Tuple[int, str, int, bool]]:
+        """
+        Yield (start_char, text, tokens, paragraph_end) units covering the input contiguously.
+        """
+        buffer = ""
+        offset = 0
+
+        def split(region: str, region_start: int) -> Iterator[Tuple[int, str, int, bool]]:
+            units = []
+            previous = 0
+            for match in _BOUNDARY.finditer(region):
+                units.append((region_start + previous, region[previous:match.end()], match.group().count("\n") >= 2))
+                previous = match.end()
+            if previous < len(region):
+                units.append((region_start + previous, region[previous:], False))
+
+            counts = self.count_tokens([text for _, text, _ in units])
+            for (start, text, paragraph_end), count in zip(units, counts):
+                if count > self.max_tokens:
+                    yield from self._split_long(start, text, paragraph_end)
+                else:
+                    yield start, text, count, paragraph_end
+
+        for piece in stream:
+            if not piece:
+                continue
+            buffer += piece
+
+            # Only split up to the last complete boundary; the tail may continue in the next piece
+            cut = 0
+            for match in _BOUNDARY.finditer(buffer):
+                if match.end() < len(buffer):
+                    cut = match.end()
+            if not cut:
+                if len(buffer) <= _MAX_BUFFER_CHARS:
+                    continue
+                cut = max(buffer.rfind(" "), buffer.rfind("\n")) + 1 or len(buffer)
+
+            yield from split(buffer[:cut], offset)
+            offset += cut
+            buffer = buffer[cut:]
+
+        if buffer:
+            yield from split(buffer, offset)
+
+    def _emit(self, units: List[Tuple[int, str, int, bool]]) -> Optional[Dict[str, Any]]:
+        raw = "".join(text for _, text, _, _ in units)
+        text = raw.strip()
+        if not text:
+            return None
+        start = units[0][0] + len(raw) - len(raw.lstrip())
+        return {
+            "text": text,
+            "start_char": start,
+            "end_char": start + len(text),
+            "tokens": sum(count for _, _, count, _ in units),
+        }
+
+    def _overlap(self, units: List[Tuple[int, str, int, bool]]) -> List[Tuple[int, str, int, bool]]:
+        """Return the trailing units of a chunk that fit in the overlap budget."""
+        tail: List[Tuple[int, str, int, bool]] = []
+        total = 0
+        for unit in reversed(units):
+            if total + unit[2] > self.overlap_tokens:
+                break
+            tail.insert(0, unit)
+            total += unit[2]
+        # Never carry the whole chunk over
+        return tail if len(tail) < len(units) else tail[1:]
+
+    def iter_chunks(self, stream: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Chunk streamed text incrementally.
+
+        Args:
+            stream: Text pieces (e.g. pages) whose concatenation is the document
+
+        Yields:
+            Dict: Chunk with "text", "start_char", "end_char" and "tokens"
+        """
+        current: List[Tuple[int, str, int, bool]] = []
+        current_tokens = 0
+        # Units at the start of `current` repeated from the previous chunk
+        carried = 0
+
+        for unit in self._units(stream):
+            while current[carried:] and current_tokens + unit[2] > self.max_tokens:
+                # Prefer closing at a paragraph boundary that keeps the chunk half full
+                cut = len(current)
+                running = 0
+                for i, (_, _, count, paragraph_end) in enumerate(current[:-1]):
+                    running += count
+                    if i + 1 > carried and paragraph_end and running >= self.max_tokens // 2:
+                        cut = i + 1
+
+                closed, rest = current[:cut], current[cut:]
+                chunk = self._emit(closed)
+                if chunk is not None:
+                    yield chunk
+
+                overlap = self._overlap(closed)
+                current = overlap + rest
+                current_tokens = sum(u[2] for u in current)
+                carried = len(overlap)
+
+            # Drop overlap that leaves no room for the next unit
+            while carried and current_tokens + unit[2] > self.max_tokens:
+                current_tokens -= current.pop(0)[2]
+                carried -= 1
+
+            current.append(unit)
+            current_tokens += unit[2]
+
+        if current[carried:]:
+            chunk = self._emit(current)
+            if chunk is not None:
+                yield chunk
+
+    def iter_page_chunks(
+        self,
+        pages: Iterable[Tuple[Optional[int], str]],
+        align_pages: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Chunk streamed pages and record the pages each chunk spans.
+
+        Pages are joined with newlines (see `utils.join_pages`), and chunks may
+        continue across a page break unless `align_pages` is set.
+
+        Args:
+            pages: (page_number, text) pairs; page_number may be None for unpaged text
+            align_pages: Chunk every page on its own, so a page's chunks depend on
+                nothing but its text
+
+        Yields:
+            Dict: Chunk as from `iter_chunks`, plus "page_start" and "page_end"
+        """
+        if align_pages:
+            offset = 0
+            for page_number, text in pages:
+                for chunk in self.iter_chunks([text]):
+                    chunk["start_char"] += offset
+                    chunk["end_char"] += offset
+                    chunk["page_start"] = chunk["page_end"] = page_number
+                    yield chunk
+                offset += len(text) + 1
+            return
+
+        page_offsets: List[int] = []
+        page_numbers: List[Optional[int]] = []
+
+        def stream() -> Iterator[str]:
+            offset = 0
+            for i, (page_number, text) in enumerate(pages):
+                if i:
+                    text = "\n" + text
+                    offset += 1
+                page_offsets.append(offset)
+                page_numbers.append(page_number)
+                offset += len(text) - (1 if i else 0)
+                yield text
+
+        for chunk in self.iter_chunks(stream()):
+            # Pages are registered before their text reaches the chunker
+            first = bisect_right(page_offsets, chunk["start_char"]) - 1
+            last = bisect_right(page_offsets, chunk["end_char"] - 1) - 1
+            chunk["page_start"] = page_numbers[max(first, 0)]
+            chunk["page_end"] = page_numbers[max(last, 0)]
+            yield chunk
+
+    def chunk(self, text: str) -> List[Dict[str, Any]]:
+        """Chunk a whole document; see `iter_chunks`."""
+        return list(self.iter_chunks([text]))
+
+
+@lru_cache(maxsize=4)
+def get_chunker(model_name: str = EMBEDDING_MODEL) -> TokenChunker:
+    """Return the shared chunker for an embedding model with the configured budget."""
+    return TokenChunker(model_name=model_name)
+
+
+# Export public API
+__all__ = [
+    "TokenChunker",
+    "get_chunk_tokenizer",
+    "get_chunker",
+]
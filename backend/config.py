@@ -3,17 +3,104 @@ Configuration settings for the application.
 """
 
 import os
-from typing import Optional
+from typing import List, Optional
 
 # OpenSearch Configuration
 OS_HOST: str = os.getenv("OS_HOST", "http://opensearch:9200")
 
+# Bulk Indexing Configuration (BULK_WORKERS > 1 sends bulk requests in parallel)
+BULK_CHUNK_DOCS: int = int(os.getenv("BULK_CHUNK_DOCS", "500"))
+BULK_CHUNK_BYTES: int = int(os.getenv("BULK_CHUNK_BYTES", str(10 * 1024 * 1024)))
+BULK_WORKERS: int = int(os.getenv("BULK_WORKERS", "1"))
+# Ingests of at least this many documents run with index refresh turned off
+BULK_SUSPEND_REFRESH_MIN_DOCS: int = int(os.getenv("BULK_SUSPEND_REFRESH_MIN_DOCS", "1000"))
+
 # Embedding Model Configuration
 EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "ibm-granite/granite-embedding-278m-multilingual")
+EMBEDDING_DEVICE: Optional[str] = os.getenv("EMBEDDING_DEVICE") or None
+# "none" for fp32, "int8" for dynamic int8 quantization of linear layers (CPU only)
+EMBEDDING_QUANTIZATION: str = os.getenv("EMBEDDING_QUANTIZATION", "none").lower()
+
+# Query Micro-Batching Configuration
+EMBED_BATCH_WINDOW_MS: float = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+EMBED_BATCH_MAX_SIZE: int = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+
+# Chunk Embedding Store Configuration (empty directory disables the store)
+EMBEDDING_STORE_DIR: str = os.getenv("EMBEDDING_STORE_DIR", "embedding_store")
+EMBEDDING_STORE_MAX_MB: int = int(os.getenv("EMBEDDING_STORE_MAX_MB", "1024"))
+
+# Image Model Configuration
+IMAGE_EMBED_BATCH_SIZE: int = int(os.getenv("IMAGE_EMBED_BATCH_SIZE", "16"))
+CAPTION_BATCH_SIZE: int = int(os.getenv("CAPTION_BATCH_SIZE", "4"))
+
+# Caption Cache Configuration (empty path keeps the cache in memory only)
+CAPTION_CACHE_SIZE: int = int(os.getenv("CAPTION_CACHE_SIZE", "2048"))
+CAPTION_CACHE_PATH: str = os.getenv("CAPTION_CACHE_PATH", "")
+
+# Query Embedding Cache Configuration (TTL of 0 keeps entries until evicted)
+QUERY_CACHE_SIZE: int = int(os.getenv("QUERY_CACHE_SIZE", "4096"))
+QUERY_CACHE_TTL_SECONDS: float = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "3600"))
+
+# Document Extraction Configuration (timeout of 0 disables it)
+EXTRACT_WORKERS: int = int(os.getenv("EXTRACT_WORKERS", "2"))
+EXTRACT_MAX_CONCURRENT: int = int(os.getenv("EXTRACT_MAX_CONCURRENT", "2"))
+EXTRACT_TIMEOUT_SECONDS: float = float(os.getenv("EXTRACT_TIMEOUT_SECONDS", "300"))
+
+# PDF Extraction Configuration (backends in order of preference; large PDFs are split
+# into page ranges parsed in parallel worker processes)
+PDF_EXTRACTOR_ORDER: List[str] = [
+    name.strip() for name in
+    os.getenv("PDF_EXTRACTOR_ORDER", "pymupdf,pypdf,pdfminer,pdfplumber,pypdf2").split(",")
+    if name.strip()
+]
+PDF_PARALLEL_MIN_PAGES: int = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))
+PDF_PAGES_PER_TASK: int = int(os.getenv("PDF_PAGES_PER_TASK", "32"))
+
+# Ingestion Job Queue Configuration (jobs persist in MongoDB, or in a local SQLite file
+# with INGEST_JOB_STORE=sqlite; uploads are refused while INGEST_MAX_PENDING_JOBS wait)
+INGEST_JOB_STORE: str = os.getenv("INGEST_JOB_STORE", "mongo").lower()
+INGEST_JOB_SQLITE_PATH: str = os.getenv("INGEST_JOB_SQLITE_PATH", "ingest_jobs.sqlite3")
+INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_MAX_PENDING_JOBS: int = int(os.getenv("INGEST_MAX_PENDING_JOBS", "100"))
+INGEST_MAX_ATTEMPTS: int = int(os.getenv("INGEST_MAX_ATTEMPTS", "5"))
+# Retry delay doubles from the base up to the maximum
+INGEST_RETRY_BASE_SECONDS: float = float(os.getenv("INGEST_RETRY_BASE_SECONDS", "5"))
+INGEST_RETRY_MAX_SECONDS: float = float(os.getenv("INGEST_RETRY_MAX_SECONDS", "300"))
+# A running job whose lease is not renewed in time (server died) is picked up again
+INGEST_LEASE_SECONDS: float = float(os.getenv("INGEST_LEASE_SECONDS", "120"))
+INGEST_POLL_SECONDS: float = float(os.getenv("INGEST_POLL_SECONDS", "1"))
+
+# Summarization Configuration (documents of one upload summarized at once)
+SUMMARY_MAX_CONCURRENT: int = int(os.getenv("SUMMARY_MAX_CONCURRENT", "4"))
+# "auto" map-reduces documents longer than SUMMARY_DIRECT_MAX_CHARS, "direct" always
+# uses one prompt (truncating long documents), "map_reduce" always splits into sections
+SUMMARY_MODE: str = os.getenv("SUMMARY_MODE", "auto").lower()
+SUMMARY_DIRECT_MAX_CHARS: int = int(os.getenv("SUMMARY_DIRECT_MAX_CHARS", "9000"))
+# Map step: section size in tokens and sections of one document summarized at once
+SUMMARY_SECTION_TOKENS: int = int(os.getenv("SUMMARY_SECTION_TOKENS", "1500"))
+SUMMARY_MAP_CONCURRENCY: int = int(os.getenv("SUMMARY_MAP_CONCURRENCY", "4"))
+# Reduce step: section summaries combined per prompt (by count and by characters)
+SUMMARY_REDUCE_FAN_IN: int = int(os.getenv("SUMMARY_REDUCE_FAN_IN", "8"))
+SUMMARY_REDUCE_MAX_CHARS: int = int(os.getenv("SUMMARY_REDUCE_MAX_CHARS", "8000"))
+# ROUGE of stored summaries: "background" scores them in worker processes once stored,
+# "on_demand" only when a document's scores are requested
+ROUGE_MODE: str = os.getenv("ROUGE_MODE", "background")
+ROUGE_WORKERS: int = int(os.getenv("ROUGE_WORKERS", "1"))
+# Documents whose tokenization each scoring process keeps
+ROUGE_TOKEN_CACHE_DOCS: int = int(os.getenv("ROUGE_TOKEN_CACHE_DOCS", "32"))
 
 # Text Processing Configuration
 CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "25"))
 CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "4"))
+# Chunks embedded and bulk-indexed together while a document streams through ingestion
+INGEST_BATCH_CHUNKS: int = int(os.getenv("INGEST_BATCH_CHUNKS", "128"))
+# Token budget and overlap of the embedding chunker (the granite embedder reads 512 tokens)
+CHUNK_MAX_TOKENS: int = int(os.getenv("CHUNK_MAX_TOKENS", "384"))
+CHUNK_OVERLAP_TOKENS: int = int(os.getenv("CHUNK_OVERLAP_TOKENS", "48"))
+# Chunk PDF pages (and DOCX sections) separately, so editing a page only changes that page's chunks on re-ingestion
+CHUNK_PAGE_ALIGNED: bool = os.getenv("CHUNK_PAGE_ALIGNED", "true").lower() == "true"
+# DOCX files have no pages; their blocks are grouped into sections of about this many characters
+DOCX_SECTION_CHARS: int = int(os.getenv("DOCX_SECTION_CHARS", "4000"))
 
 # MongoDB Configuration
 MONGO_DB_HOST: str = os.getenv("MONGO_DB_HOST", "mongodb://mongodb:27017/")
@@ -0,0 +1,167 @@
+"""
+Dynamic micro-batching for concurrent encode requests.
+
+This module provides functionality for:
+- Collecting encode requests from many threads or coroutines for a short window
+- Running them through the model as one batched forward pass
+- Resolving each caller's future with its own result
+- Reporting queue depth and batch size histograms
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Sequence
+
+from config import EMBED_BATCH_WINDOW_MS, EMBED_BATCH_MAX_SIZE
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Every batcher created in the process, for introspection
+_batchers: List["MicroBatcher"] = []
+
+
+def _bucket(n: int) -> str:
+    """Return a power-of-two histogram bucket label for `n` (0, 1, 2-3, 4-7, ...)."""
+    if n <= 1:
+        return str(n)
+    low = 1 << (n.bit_length() - 1)
+    return f"{low}-{2 * low - 1}"
+
+
+class MicroBatcher:
+    """
+    Coalesce single-item encode requests into batched calls on a worker thread.
+
+    The worker waits for a first request, then keeps collecting requests until
+    `max_batch_size` items are pending or `max_wait_ms` has passed, and runs
+    `batch_fn` once for all of them.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int = EMBED_BATCH_MAX_SIZE,
+        max_wait_ms: float = EMBED_BATCH_WINDOW_MS
+    ) -> None:
+        """
+        Args:
+            name: Label used in logs and stats
+            batch_fn: Encodes a list of inputs and returns one result per input, in order
+            max_batch_size: Maximum number of requests per batch
+            max_wait_ms: How long to wait for more requests after the first one arrives
+        """
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_seconds = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+
+        self.batches = 0
+        self.items = 0
+        self.batch_size_histogram: Dict[int, int] = {}
+        self.queue_depth_histogram: Dict[str, int] = {}
+
+        _batchers.append(self)
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name=f"batcher-{self.name}", daemon=True
+                )
+                self._worker.start()
+
+    def submit(self, item: Any) -> Future:
+        """
+        Queue one input for encoding.
+
+        Args:
+            item: Input to encode
+
+        Returns:
+            Future: Resolves to the encoded result for this input
+        """
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def encode(self, item: Any) -> Any:
+        """Encode one input, blocking until its batch has run."""
+        return self.submit(item).result()
+
+    async def encode_async(self, item: Any) -> Any:
+        """Encode one input without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(item))
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait_seconds
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # Requests still waiting behind this batch
+            depth_bucket = _bucket(self._queue.qsize())
+            self.queue_depth_histogram[depth_bucket] = self.queue_depth_histogram.get(depth_bucket, 0) + 1
+            self.batch_size_histogram[len(batch)] = self.batch_size_histogram.get(len(batch), 0) + 1
+            self.batches += 1
+            self.items += len(batch)
+
+            # Skip requests whose callers already gave up
+            live = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not live:
+                continue
+
+            try:
+                results = self.batch_fn([item for item, _ in live])
+                for (_, future), result in zip(live, results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"Batcher '{self.name}' failed on a batch of {len(live)}: {e}")
+                for _, future in live:
+                    future.set_exception(e)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, batch counts and histograms."""
+        return {
+            "name": self.name,
+            "queue_depth": self._queue.qsize(),
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else None,
+            "max_batch_size": self.max_batch_size,
+            "window_ms": self.max_wait_seconds * 1000.0,
+            "batch_size_histogram": dict(sorted(self.batch_size_histogram.items())),
+            "queue_depth_histogram": dict(self.queue_depth_histogram),
+        }
+
+
+def batcher_stats() -> List[Dict[str, Any]]:
+    """Return stats for every batcher in the process."""
+    return [batcher.stats() for batcher in _batchers]
+
+
+# Export public API
+__all__ = [
+    "MicroBatcher",
+    "batcher_stats",
+]
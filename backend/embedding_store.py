@@ -0,0 +1,282 @@
+"""
+Persistent content-addressed store for chunk embeddings.
+
+This module provides functionality for:
+- Storing chunk vectors keyed by (model id, chunk SHA-256)
+- Memory-mapped NumPy matrices (one per model) with a SQLite offset index
+- Size-bounded storage with least-recently-used row eviction
+- Reporting hit ratios so ingestion can show how much work was reused
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config import EMBEDDING_STORE_DIR, EMBEDDING_STORE_MAX_MB
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH = 500
+
+
+def chunk_hash(text: str) -> str:
+    """Return the SHA-256 hex digest identifying a chunk's content."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ChunkEmbeddingStore:
+    """
+    Persistent embedding store keyed by (model id, chunk SHA-256).
+
+    Each model gets a preallocated float32 matrix on disk, opened with
+    `np.memmap`, whose row count is derived from `max_bytes`. A SQLite index
+    maps every (model id, chunk hash) to its row and tracks when the row was
+    last used; once a matrix is full, the least recently used rows are reused.
+    """
+
+    def __init__(
+        self,
+        directory: str = EMBEDDING_STORE_DIR,
+        max_bytes: int = EMBEDDING_STORE_MAX_MB * 1024 * 1024
+    ) -> None:
+        """
+        Args:
+            directory: Directory holding the matrices and the index
+            max_bytes: Size limit of each model's matrix file
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._matrices: Dict[str, np.memmap] = {}
+
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite"), check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS models (
+                model_id TEXT PRIMARY KEY,
+                dim INTEGER NOT NULL,
+                capacity INTEGER NOT NULL,
+                filename TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS entries (
+                model_id TEXT NOT NULL,
+                chunk_hash TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model_id, chunk_hash)
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS entries_row ON entries (model_id, row);
+            CREATE INDEX IF NOT EXISTS entries_lru ON entries (model_id, last_used);
+            """
+        )
+        self._conn.commit()
+
+    def _matrix(self, model_id: str, dim: Optional[int] = None) -> Optional[np.memmap]:
+        """Open (or create, when `dim` is given) the memory-mapped matrix for a model."""
+        matrix = self._matrices.get(model_id)
+        if matrix is not None:
+            return matrix
+
+        row = self._conn.execute(
+            "SELECT dim, capacity, filename FROM models WHERE model_id = ?", (model_id,)
+        ).fetchone()
+
+        if row is None:
+            if dim is None:
+                return None
+            capacity = max(1, self.max_bytes // (dim * 4))
+            filename = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_id) + ".f32"
+            self._conn.execute(
+                "INSERT INTO models (model_id, dim, capacity, filename) VALUES (?, ?, ?, ?)",
+                (model_id, dim, capacity, filename)
+            )
+            self._conn.commit()
+        else:
+            dim, capacity, filename = row
+
+        path = os.path.join(self.directory, filename)
+        mode = "r+" if os.path.exists(path) else "w+"
+        matrix = np.memmap(path, dtype=np.float32, mode=mode, shape=(capacity, dim))
+        self._matrices[model_id] = matrix
+        logger.info(f"Opened embedding store for '{model_id}' ({capacity} rows x {dim})")
+        return matrix
+
+    def get_many(self, model_id: str, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up stored vectors for a set of chunk hashes.
+
+        Args:
+            model_id: Embedding model identifier
+            hashes: Chunk SHA-256 digests
+
+        Returns:
+            Dict[str, np.ndarray]: Copies of the stored vectors for the hashes that were found
+        """
+        unique_hashes = list(dict.fromkeys(hashes))
+        if not unique_hashes:
+            return {}
+
+        with self._lock:
+            matrix = self._matrix(model_id)
+            if matrix is None:
+                return {}
+
+            found: Dict[str, int] = {}
+            for start in range(0, len(unique_hashes), _SQL_BATCH):
+                batch = unique_hashes[start:start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT chunk_hash, row FROM entries WHERE model_id = ? AND chunk_hash IN ({placeholders})",
+                    (model_id, *batch)
+                ).fetchall()
+                found.update(rows)
+
+            if not found:
+                return {}
+
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE entries SET last_used = ? WHERE model_id = ? AND chunk_hash = ?",
+                [(now, model_id, h) for h in found]
+            )
+            self._conn.commit()
+            return {h: np.array(matrix[row]) for h, row in found.items()}
+
+    def put_many(self, model_id: str, hashes: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """
+        Store vectors for chunk hashes, evicting least recently used rows when full.
+
+        Args:
+            model_id: Embedding model identifier
+            hashes: Chunk SHA-256 digests
+            vectors: One vector per hash
+        """
+        if len(hashes) == 0:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+
+        with self._lock:
+            matrix = self._matrix(model_id, dim=vectors.shape[1])
+            if matrix.shape[1] != vectors.shape[1]:
+                logger.error(
+                    f"Embedding store for '{model_id}' has dim {matrix.shape[1]}, got {vectors.shape[1]}; not storing"
+                )
+                return
+
+            # Drop hashes that are already stored and duplicates within this call
+            pending: Dict[str, np.ndarray] = {}
+            for h, vector in zip(hashes, vectors):
+                pending.setdefault(h, vector)
+            existing = set()
+            pending_hashes = list(pending)
+            for start in range(0, len(pending_hashes), _SQL_BATCH):
+                batch = pending_hashes[start:start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                existing.update(h for (h,) in self._conn.execute(
+                    f"SELECT chunk_hash FROM entries WHERE model_id = ? AND chunk_hash IN ({placeholders})",
+                    (model_id, *batch)
+                ))
+            new_items = [(h, v) for h, v in pending.items() if h not in existing]
+            # Never evict more rows than the matrix holds
+            new_items = new_items[-matrix.shape[0]:]
+            if not new_items:
+                return
+
+            used = self._conn.execute(
+                "SELECT COUNT(*) FROM entries WHERE model_id = ?", (model_id,)
+            ).fetchone()[0]
+            free_rows = list(range(used, min(matrix.shape[0], used + len(new_items))))
+
+            evicted = 0
+            shortfall = len(new_items) - len(free_rows)
+            if shortfall > 0:
+                victims = self._conn.execute(
+                    "SELECT chunk_hash, row FROM entries WHERE model_id = ? ORDER BY last_used LIMIT ?",
+                    (model_id, shortfall)
+                ).fetchall()
+                self._conn.executemany(
+                    "DELETE FROM entries WHERE model_id = ? AND chunk_hash = ?",
+                    [(model_id, h) for h, _ in victims]
+                )
+                free_rows.extend(row for _, row in victims)
+                evicted = len(victims)
+
+            for (_, vector), row in zip(new_items, free_rows):
+                matrix[row] = vector
+            # Make the vectors durable before the index points at them
+            matrix.flush()
+
+            now = time.time()
+            self._conn.executemany(
+                "INSERT INTO entries (model_id, chunk_hash, row, last_used) VALUES (?, ?, ?, ?)",
+                [(model_id, h, row, now) for (h, _), row in zip(new_items, free_rows)]
+            )
+            self._conn.commit()
+
+            if evicted:
+                logger.info(f"Embedding store for '{model_id}' evicted {evicted} least recently used vectors")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Return per-model occupancy of the store.
+
+        Returns:
+            List[Dict]: Model id, dimension, capacity, used rows and file size
+        """
+        with self._lock:
+            models = self._conn.execute("SELECT model_id, dim, capacity, filename FROM models").fetchall()
+            report = []
+            for model_id, dim, capacity, filename in models:
+                used = self._conn.execute(
+                    "SELECT COUNT(*) FROM entries WHERE model_id = ?", (model_id,)
+                ).fetchone()[0]
+                report.append({
+                    "model_id": model_id,
+                    "dim": dim,
+                    "capacity": capacity,
+                    "used": used,
+                    "file_bytes": capacity * dim * 4,
+                })
+            return report
+
+
+_store: Optional[ChunkEmbeddingStore] = None
+_store_lock = threading.Lock()
+
+
+def get_embedding_store() -> Optional[ChunkEmbeddingStore]:
+    """
+    Return the process-wide chunk embedding store.
+
+    Returns:
+        Optional[ChunkEmbeddingStore]: Shared store, or None when EMBEDDING_STORE_DIR is empty
+            or the store cannot be opened
+    """
+    global _store
+    if _store is None and EMBEDDING_STORE_DIR:
+        with _store_lock:
+            if _store is None:
+                try:
+                    _store = ChunkEmbeddingStore()
+                except (OSError, sqlite3.Error) as e:
+                    logger.error(f"Could not open embedding store at '{EMBEDDING_STORE_DIR}': {e}")
+                    return None
+    return _store
+
+
+# Export public API
+__all__ = [
+    "chunk_hash",
+    "ChunkEmbeddingStore",
+    "get_embedding_store",
+]
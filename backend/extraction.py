@@ -0,0 +1,234 @@
+"""
+Document text extraction stage running in worker processes.
+
+This module provides functionality for:
+- Parsing PDF and DOCX uploads in a process pool, off the event loop
+- Splitting large PDFs into page ranges parsed in parallel
+- Bounding the number of files parsed at once
+- Per-file timeouts, with hung workers terminated and the pool replaced
+- Reporting queue wait time and parse time per file
+"""
+
+import asyncio
+import io
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import (
+    EXTRACT_WORKERS,
+    EXTRACT_MAX_CONCURRENT,
+    EXTRACT_TIMEOUT_SECONDS,
+    PDF_PARALLEL_MIN_PAGES,
+    PDF_PAGES_PER_TASK
+)
+from pdf_extractors import count_pdf_pages, extract_pdf_page_range
+from utils import iter_docx_sections, join_indexed_pages, join_pages, page_index
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class ExtractionTimeout(Exception):
+    """Raised when a file takes longer than the extraction timeout to parse."""
+
+
+def _count_pdf_in_worker(data: bytes) -> Tuple[int, str]:
+    """Count a PDF's pages in a worker process; returns the count and the backend used."""
+    return count_pdf_pages(data)
+
+
+def _extract_pdf_range_in_worker(
+    data: bytes,
+    first: int,
+    last: int,
+    backend: str
+) -> Tuple[List[Tuple[int, str]], str]:
+    """Extract pages first..last of a PDF in a worker process."""
+    return extract_pdf_page_range(data, first, last, preferred=backend)
+
+
+def _extract_docx_in_worker(data: bytes) -> Tuple[str, List[Tuple[Optional[int], int]]]:
+    """Extract the text of a DOCX document and its section index in a worker process."""
+    return join_indexed_pages(iter_docx_sections(io.BytesIO(data)))
+
+
+class ExtractionStage:
+    """
+    Process-pool backed extraction with bounded concurrency and timeouts.
+
+    At most `max_concurrent` files are handed to the pool at once; the rest
+    wait on a semaphore, and that wait is reported as queue time. PDFs of at
+    least PDF_PARALLEL_MIN_PAGES pages are split into ranges of
+    PDF_PAGES_PER_TASK pages that run as separate pool tasks. A file that
+    exceeds `timeout_seconds` is cancelled; if it is already running, the
+    pool's processes are terminated and a fresh pool is started, and tasks
+    that were running alongside it are retried once.
+    """
+
+    def __init__(
+        self,
+        workers: int = EXTRACT_WORKERS,
+        max_concurrent: int = EXTRACT_MAX_CONCURRENT,
+        timeout_seconds: float = EXTRACT_TIMEOUT_SECONDS
+    ) -> None:
+        """
+        Args:
+            workers: Worker processes in the pool
+            max_concurrent: Files parsed at once
+            timeout_seconds: Per-file parse timeout; 0 disables it
+        """
+        self.workers = max(1, workers)
+        self.max_concurrent = max(1, max_concurrent)
+        self.timeout_seconds = timeout_seconds or None
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._semaphores: Dict[Any, asyncio.Semaphore] = {}
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # Spawned workers don't inherit model threads or open connections
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _reset_pool(self, pool: ProcessPoolExecutor) -> None:
+        """Terminate a pool's workers and let the next submit start a new pool."""
+        with self._pool_lock:
+            if self._pool is not pool:
+                return  # already replaced
+            self._pool = None
+
+        # The executor has no public way to stop a running task; terminating its
+        # workers fails every other task of this pool with BrokenProcessPool
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False)
+        logger.warning("Extraction pool restarted after a stuck worker")
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrent)
+        return semaphore
+
+    async def _run(self, filename: str, deadline: Optional[float], fn: Any, *args: Any) -> Any:
+        """Run one task in the pool within the file's deadline, retrying once on a pool restart."""
+        loop = asyncio.get_running_loop()
+        for attempt in (1, 2):
+            pool = self._get_pool()
+            future = pool.submit(fn, *args)
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+            except asyncio.TimeoutError:
+                if not future.cancel():
+                    self._reset_pool(pool)
+                raise ExtractionTimeout(
+                    f"Parsing '{filename}' took longer than {self.timeout_seconds:.0f}s"
+                )
+            except BrokenProcessPool:
+                # Another file's timeout restarted the pool under us
+                self._reset_pool(pool)
+                if attempt == 2:
+                    raise
+
+    async def _extract_pdf(self, filename: str, data: bytes, deadline: Optional[float]) -> Dict[str, Any]:
+        page_count, backend = await self._run(filename, deadline, _count_pdf_in_worker, data)
+
+        # A PDF without pages gets no ranges, and so empty text
+        step = max(1, page_count if page_count < PDF_PARALLEL_MIN_PAGES else PDF_PAGES_PER_TASK)
+        ranges = [(first, min(first + step - 1, page_count)) for first in range(1, page_count + 1, step)]
+        tasks = [
+            asyncio.ensure_future(self._run(filename, deadline, _extract_pdf_range_in_worker, data, first, last, backend))
+            for first, last in ranges
+        ]
+        try:
+            results = await asyncio.gather(*tasks)
+        finally:
+            # If one range failed, stop the others
+            for task in tasks:
+                task.cancel()
+
+        pages = [page for range_pages, _ in results for page in range_pages]
+        backends = sorted({range_backend for _, range_backend in results}) or [backend]
+        # The joined text and its page offsets replace the page list
+        return {
+            "text": join_pages(pages),
+            "page_index": page_index(pages),
+            "backend": ",".join(backends),
+            "page_ranges": len(ranges)
+        }
+
+    async def extract(self, filename: str, kind: str, data: bytes) -> Dict[str, Any]:
+        """
+        Parse one uploaded document in the process pool.
+
+        Args:
+            filename: File name, for logs and the report
+            kind: "pdf" or "docx"
+            data: Raw file bytes
+
+        Returns:
+            Dict: "text", "page_index" (PDF pages or DOCX sections, see
+                `utils.page_index`), "backend", "page_ranges",
+                "queue_wait_seconds" and "parse_seconds"
+
+        Raises:
+            ExtractionTimeout: If parsing takes longer than the timeout
+        """
+        if kind not in ("pdf", "docx"):
+            raise ValueError(f"Unsupported document kind '{kind}'")
+
+        loop = asyncio.get_running_loop()
+        queued_at = time.perf_counter()
+        async with self._semaphore():
+            started = time.perf_counter()
+            queue_wait = started - queued_at
+            deadline = loop.time() + self.timeout_seconds if self.timeout_seconds else None
+
+            if kind == "pdf":
+                result = await self._extract_pdf(filename, data, deadline)
+            else:
+                text, index = await self._run(filename, deadline, _extract_docx_in_worker, data)
+                result = {"text": text, "page_index": index, "backend": "docx-stream", "page_ranges": 0}
+
+            parse_seconds = time.perf_counter() - started
+
+        logger.info(
+            f"Extracted '{filename}' ({kind}, {result['backend']}, {result['page_ranges']} page ranges): "
+            f"waited {queue_wait:.2f}s, parsed in {parse_seconds:.2f}s"
+        )
+        result.update({
+            "queue_wait_seconds": round(queue_wait, 3),
+            "parse_seconds": round(parse_seconds, 3),
+        })
+        return result
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Shared stage used by the upload endpoint
+extraction_stage = ExtractionStage()
+
+
+# Export public API
+__all__ = [
+    "ExtractionStage",
+    "ExtractionTimeout",
+    "extraction_stage",
+]
@@ -0,0 +1,730 @@
+"""
+Durable background ingestion jobs.
+
+This module provides functionality for:
+- Persisting ingestion jobs in MongoDB (payloads in GridFS), or in a local
+  SQLite file standing in for it
+- Job keys derived from the user and the uploaded content, so an upload
+  is not queued again while it is pending
+- A pool of async workers claiming jobs under renewable leases, so the jobs
+  of a server that died are picked up again
+- Retries with exponential backoff
+- Per-file stage, progress and stage timings, served by the /jobs/{id} endpoint
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from config import (
+    MONGO_DB_HOST,
+    INGEST_JOB_STORE,
+    INGEST_JOB_SQLITE_PATH,
+    INGEST_WORKERS,
+    INGEST_MAX_PENDING_JOBS,
+    INGEST_MAX_ATTEMPTS,
+    INGEST_RETRY_BASE_SECONDS,
+    INGEST_RETRY_MAX_SECONDS,
+    INGEST_LEASE_SECONDS,
+    INGEST_POLL_SECONDS
+)
+from mongo_utils import (
+    ingest_documents_to_mongodb_and_opensearch,
+    ingest_images_to_mongodb_and_opensearch,
+    store_document_summaries
+)
+from quality import quality_stage
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+RETRYING = "retrying"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+PENDING_STATES = (QUEUED, RUNNING, RETRYING)
+
+# Error recorded for a job whose worker stopped renewing its lease on the last attempt
+_LEASE_EXPIRED = "LeaseExpired: the worker stopped before finishing the last attempt"
+
+
+class QueueFull(Exception):
+    """Raised when too many ingestion jobs are waiting to run."""
+
+
+# ----------------------------
+# PAYLOADS
+# ----------------------------
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (bytes, bytearray)):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    if hasattr(value, "tolist"):
+        # numpy arrays (image embeddings)
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _json_object_hook(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and "__bytes__" in obj:
+        return base64.b64decode(obj["__bytes__"])
+    return obj
+
+
+def encode_payload(payload: Dict[str, Any]) -> bytes:
+    """Serialize a job payload to compressed JSON; bytes are base64 encoded."""
+    return zlib.compress(json.dumps(payload, default=_json_default).encode("utf-8"))
+
+
+def decode_payload(data: bytes) -> Dict[str, Any]:
+    """Inverse of `encode_payload`."""
+    return json.loads(zlib.decompress(data).decode("utf-8"), object_hook=_json_object_hook)
+
+
+def job_key(kind: str, user_id: str, files: List[List[str]]) -> str:
+    """Idempotent job id from the job kind, the user and each file's name and content hash."""
+    material = json.dumps([kind, user_id, sorted(files)])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _set_path(record: Dict[str, Any], path: str, value: Any) -> None:
+    """Set a dotted path such as "files.2.stage" in a job record."""
+    *parents, last = path.split(".")
+    target: Any = record
+    for part in parents:
+        target = target[int(part)] if isinstance(target, list) else target[part]
+    if isinstance(target, list):
+        target[int(last)] = value
+    else:
+        target[last] = value
+
+
+# ----------------------------
+# STORES
+# ----------------------------
+
+class MongoJobStore:
+    """
+    Jobs in the `ingest_jobs` collection, payloads in GridFS.
+
+    GridFS keeps large uploads clear of MongoDB's 16 MB document limit.
+    """
+
+    def __init__(self, host: str = MONGO_DB_HOST, db_name: str = "document_store") -> None:
+        import gridfs
+        from pymongo import MongoClient
+
+        # One client for the queue; it pools connections across worker threads
+        self.client = MongoClient(host)
+        db = self.client[db_name]
+        self.jobs = db["ingest_jobs"]
+        self.payloads = gridfs.GridFS(db, collection="ingest_job_payloads")
+        self.jobs.create_index([("status", 1), ("next_run_at", 1)])
+
+    def _put_payload(self, job_id: str, payload: bytes) -> str:
+        """Store a payload under an id of its own; concurrent submits of one job never share it."""
+        payload_id = f"{job_id}:{uuid.uuid4().hex}"
+        self.payloads.put(payload, _id=payload_id)
+        return payload_id
+
+    def insert(self, job: Dict[str, Any], payload: bytes) -> Optional[Dict[str, Any]]:
+        """Insert a job; return the existing job instead if its id is taken."""
+        from pymongo.errors import DuplicateKeyError
+
+        existing = self.get(job["_id"])
+        if existing is not None:
+            return existing
+        # The job is claimable as soon as it is inserted, so its payload goes first
+        payload_id = self._put_payload(job["_id"], payload)
+        try:
+            self.jobs.insert_one({**job, "payload_id": payload_id})
+        except DuplicateKeyError:
+            # A concurrent submit of the same upload won; its payload stays
+            self.payloads.delete(payload_id)
+            return self.get(job["_id"])
+        return None
+
+    def requeue(self, job_id: str, payload: bytes, fields: Dict[str, Any]) -> bool:
+        """Reset a finished job with a new payload; False if it is pending again already."""
+        payload_id = self._put_payload(job_id, payload)
+        previous = self.jobs.find_one_and_update(
+            {"_id": job_id, "status": {"$nin": list(PENDING_STATES)}},
+            {"$set": {**fields, "payload_id": payload_id}}
+        )
+        if previous is None:
+            self.payloads.delete(payload_id)
+            return False
+        if previous.get("payload_id"):
+            self.payloads.delete(previous["payload_id"])
+        return True
+
+    def claim(self, worker: str, now: float, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """Atomically take the next due job, or one whose worker's lease ran out."""
+        from pymongo import ReturnDocument
+
+        # A job whose worker died on its last attempt (e.g. killed while parsing) is not run again
+        expired = self.jobs.update_many(
+            {"status": RUNNING, "lease_until": {"$lt": now}, "$expr": {"$gte": ["$attempts", "$max_attempts"]}},
+            {"$set": {"status": FAILED, "lease_until": None, "updated_at": now, "error": _LEASE_EXPIRED}}
+        )
+        if expired.modified_count:
+            logger.error(f"Failed {expired.modified_count} ingestion jobs whose last attempt did not finish")
+
+        return self.jobs.find_one_and_update(
+            {"$or": [
+                {"status": {"$in": [QUEUED, RETRYING]}, "next_run_at": {"$lte": now}},
+                {"status": RUNNING, "lease_until": {"$lt": now}, "$expr": {"$lt": ["$attempts", "$max_attempts"]}},
+            ]},
+            {
+                "$set": {"status": RUNNING, "worker": worker, "lease_until": now + lease_seconds, "updated_at": now},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("next_run_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def update(self, job_id: str, fields: Dict[str, Any], worker: Optional[str] = None) -> bool:
+        """Set (dotted) fields; with `worker`, only while that worker holds the job."""
+        query = {"_id": job_id}
+        if worker is not None:
+            query["worker"] = worker
+        return self.jobs.update_one(query, {"$set": fields}).matched_count > 0
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.jobs.find_one({"_id": job_id})
+
+    def load_payload(self, job_id: str) -> bytes:
+        job = self.jobs.find_one({"_id": job_id}, {"payload_id": 1})
+        if job is None:
+            raise KeyError(f"No payload for job {job_id}")
+        return self.payloads.get(job["payload_id"]).read()
+
+    def delete_payload(self, job_id: str) -> None:
+        job = self.jobs.find_one({"_id": job_id}, {"payload_id": 1})
+        if job is not None and job.get("payload_id"):
+            self.payloads.delete(job["payload_id"])
+
+    def count_pending(self) -> int:
+        return self.jobs.count_documents({"status": {"$in": list(PENDING_STATES)}})
+
+
+class SQLiteJobStore:
+    """
+    Jobs in a local SQLite file, for running without MongoDB.
+
+    The job record is kept as JSON, with the fields the queue filters on
+    copied into columns.
+    """
+
+    def __init__(self, path: str = INGEST_JOB_SQLITE_PATH) -> None:
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ingest_jobs ("
+            " id TEXT PRIMARY KEY, status TEXT, next_run_at REAL, lease_until REAL,"
+            " worker TEXT, record TEXT, payload BLOB)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ingest_jobs_due ON ingest_jobs (status, next_run_at)")
+
+    def _write(self, record: Dict[str, Any], payload: Optional[bytes] = None) -> None:
+        columns = "status = ?, next_run_at = ?, lease_until = ?, worker = ?, record = ?"
+        values = [record["status"], record["next_run_at"], record["lease_until"], record["worker"], json.dumps(record)]
+        if payload is not None:
+            columns += ", payload = ?"
+            values.append(payload)
+        self._conn.execute(f"UPDATE ingest_jobs SET {columns} WHERE id = ?", values + [record["_id"]])
+
+    def _read(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute("SELECT record FROM ingest_jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def insert(self, job: Dict[str, Any], payload: bytes) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO ingest_jobs (id, status, next_run_at, lease_until, worker, record, payload)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job["_id"], job["status"], job["next_run_at"], job["lease_until"], job["worker"],
+                 json.dumps(job), payload)
+            )
+            return None if cursor.rowcount else self._read(job["_id"])
+
+    def requeue(self, job_id: str, payload: bytes, fields: Dict[str, Any]) -> bool:
+        with self._lock:
+            record = self._read(job_id)
+            if record["status"] in PENDING_STATES:
+                return False
+            record.update(fields)
+            self._write(record, payload)
+            return True
+
+    def claim(self, worker: str, now: float, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            # IMMEDIATE takes the write lock, so other processes can't claim the same job
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # A job whose worker died on its last attempt (e.g. killed while parsing) is not run again
+                expired = self._conn.execute(
+                    "SELECT id FROM ingest_jobs WHERE status = ? AND lease_until < ?"
+                    " AND json_extract(record, '$.attempts') >= json_extract(record, '$.max_attempts')",
+                    (RUNNING, now)
+                ).fetchall()
+                for (job_id,) in expired:
+                    record = self._read(job_id)
+                    record.update({"status": FAILED, "lease_until": None, "updated_at": now, "error": _LEASE_EXPIRED})
+                    self._write(record)
+                if expired:
+                    logger.error(f"Failed {len(expired)} ingestion jobs whose last attempt did not finish")
+
+                row = self._conn.execute(
+                    "SELECT id FROM ingest_jobs WHERE (status IN (?, ?) AND next_run_at <= ?)"
+                    " OR (status = ? AND lease_until < ?"
+                    " AND json_extract(record, '$.attempts') < json_extract(record, '$.max_attempts'))"
+                    " ORDER BY next_run_at LIMIT 1",
+                    (QUEUED, RETRYING, now, RUNNING, now)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                record = self._read(row[0])
+                record.update({
+                    "status": RUNNING,
+                    "worker": worker,
+                    "lease_until": now + lease_seconds,
+                    "updated_at": now,
+                    "attempts": record["attempts"] + 1,
+                })
+                self._write(record)
+                self._conn.execute("COMMIT")
+                return record
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def update(self, job_id: str, fields: Dict[str, Any], worker: Optional[str] = None) -> bool:
+        with self._lock:
+            record = self._read(job_id)
+            if record is None or (worker is not None and record["worker"] != worker):
+                return False
+            for path, value in fields.items():
+                _set_path(record, path, value)
+            self._write(record)
+            return True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._read(job_id)
+
+    def load_payload(self, job_id: str) -> bytes:
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM ingest_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or row[0] is None:
+            raise KeyError(f"No payload for job {job_id}")
+        return row[0]
+
+    def delete_payload(self, job_id: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE ingest_jobs SET payload = NULL WHERE id = ?", (job_id,))
+
+    def count_pending(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM ingest_jobs WHERE status IN (?, ?, ?)", PENDING_STATES
+            ).fetchone()[0]
+
+
+# ----------------------------
+# JOB HANDLERS
+# ----------------------------
+
+def _run_documents(
+    payload: Dict[str, Any],
+    user_id: str,
+    progress: Callable[[str, str, float], None],
+    reingest: bool = False
+) -> Dict:
+    docs = payload["documents"]
+    report = ingest_documents_to_mongodb_and_opensearch(docs, user_id, on_progress=progress, reingest=reingest)
+    
+    # Summaries stored with their documents are scored in the background
+    written = ("inserted", "reingested", "resumed")
+    quality_stage.schedule(user_id, [
+        doc["filename"] for doc in docs
+        if doc.get("summary_clean", doc.get("summary")) is not None
+        and report.get("documents", {}).get(doc.get("filename")) in written
+    ])
+    return report
+
+
+def _run_reingest(payload: Dict[str, Any], user_id: str, progress: Callable[[str, str, float], None]) -> Dict:
+    return _run_documents(payload, user_id, progress, reingest=True)
+
+
+def _run_images(payload: Dict[str, Any], user_id: str, progress: Callable[[str, str, float], None]) -> Dict:
+    return ingest_images_to_mongodb_and_opensearch(payload["images"], user_id, on_progress=progress)
+
+
+def _run_summaries(payload: Dict[str, Any], user_id: str, progress: Callable[[str, str, float], None]) -> Dict:
+    result = store_document_summaries(payload["summaries"], user_id, on_progress=progress)
+    quality_stage.schedule(user_id, result["documents"])
+    return result
+
+
+# kind -> fn(payload, user_id, progress) -> result
+_HANDLERS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "documents": _run_documents,
+    "reingest": _run_reingest,
+    "images": _run_images,
+    "summaries": _run_summaries,
+}
+
+
+class _ProgressReporter:
+    """
+    Writes per-file stage and progress of a running job, skipping tiny progress steps.
+
+    When a file moves on from a stage, the seconds it spent there are recorded
+    under its "timings"; "queued" counts from the job's creation.
+    """
+
+    def __init__(self, store: Any, job: Dict[str, Any], worker: str) -> None:
+        self.store = store
+        self.job_id = job["_id"]
+        self.worker = worker
+        self.index = {f["filename"]: i for i, f in enumerate(job["files"])}
+        self.last = {f["filename"]: (f["stage"], f["progress"]) for f in job["files"]}
+        self.stage_started = {
+            f["filename"]: job["created_at"] if f["stage"] == "queued" else time.time()
+            for f in job["files"]
+        }
+
+    def __call__(self, filename: str, stage: str, progress: float) -> None:
+        i = self.index.get(filename)
+        if i is None:
+            return
+        last_stage, last_progress = self.last[filename]
+        if stage == last_stage and progress - last_progress < 0.05:
+            return
+        self.last[filename] = (stage, progress)
+        now = time.time()
+        fields = {
+            f"files.{i}.stage": stage,
+            f"files.{i}.progress": round(progress, 3),
+            "updated_at": now,
+        }
+        if stage != last_stage:
+            fields[f"files.{i}.timings.{last_stage}"] = round(now - self.stage_started[filename], 3)
+            self.stage_started[filename] = now
+        try:
+            self.store.update(self.job_id, fields, worker=self.worker)
+        except Exception as e:
+            # Progress is informational; never fail the ingestion over it
+            logger.warning(f"Could not record progress of job {self.job_id}: {e}")
+
+
+# ----------------------------
+# QUEUE
+# ----------------------------
+
+class IngestQueue:
+    """
+    Persistent ingestion queue with a pool of async workers.
+
+    Each worker claims a due job, runs its handler in a thread and renews the
+    job's lease while it runs. A failed job is retried with exponential
+    backoff until `max_attempts`; a job whose lease expires (the server
+    stopped) is claimed again.
+    """
+
+    def __init__(
+        self,
+        store: Any = None,
+        workers: int = INGEST_WORKERS,
+        max_pending: int = INGEST_MAX_PENDING_JOBS,
+        max_attempts: int = INGEST_MAX_ATTEMPTS,
+        lease_seconds: float = INGEST_LEASE_SECONDS
+    ) -> None:
+        """
+        Args:
+            store: MongoJobStore or SQLiteJobStore; created from INGEST_JOB_STORE on first use
+            workers: Jobs run at once
+            max_pending: Waiting or running jobs above which uploads are refused
+            max_attempts: Runs of a job before it is marked failed
+            lease_seconds: How long a worker may go without renewing its claim
+        """
+        self._store = store
+        self._store_lock = threading.Lock()
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.max_attempts = max(1, max_attempts)
+        self.lease_seconds = lease_seconds
+
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def store(self) -> Any:
+        with self._store_lock:
+            if self._store is None:
+                self._store = SQLiteJobStore() if INGEST_JOB_STORE == "sqlite" else MongoJobStore()
+            return self._store
+
+    # ---- submitting ----
+
+    def check_capacity(self) -> None:
+        """
+        Raises:
+            QueueFull: If `max_pending` jobs are already waiting or running
+        """
+        pending = self.store.count_pending()
+        if self.max_pending and pending >= self.max_pending:
+            raise QueueFull(f"{pending} ingestion jobs are pending; try again later")
+
+    def submit_documents(self, docs: List[Dict[str, Any]], user_id: str, reingest: bool = False) -> Dict[str, Any]:
+        """
+        Queue ingestion of documents; returns the (possibly existing) job.
+
+        Documents without a "summary" are stored with an empty one, to be
+        filled in by a job from `submit_summaries`. With `reingest`, stored
+        documents whose content changed are updated incrementally instead of
+        skipped.
+        """
+        documents, files = [], []
+        for doc in docs:
+            item = {
+                "filename": doc["filename"],
+                "content_hash": doc.get("content_hash"),
+                "is_image": False,
+            }
+            if "summary" in doc:
+                item["summary"] = doc["summary"]
+                item["summary_clean"] = doc.get("summary_clean", doc["summary"])
+            item["content"] = doc.get("content", "")
+            if doc.get("page_index"):
+                item["page_index"] = doc["page_index"]
+            documents.append(item)
+            files.append([doc["filename"], hashlib.sha256(doc.get("content", "").encode("utf-8")).hexdigest()])
+        return self._submit("reingest" if reingest else "documents", user_id, files, {"documents": documents})
+
+    def submit_summaries(self, docs: List[Dict[str, Any]], user_id: str) -> Dict[str, Any]:
+        """Queue storing the summaries of documents submitted without one."""
+        summaries, files = [], []
+        for doc in docs:
+            summary = doc.get("summary_clean", doc.get("summary", ""))
+            summaries.append({
+                "filename": doc["filename"],
+                "content_hash": doc["content_hash"],
+                "summary_clean": summary,
+            })
+            material = f"{doc['content_hash']}\n{summary}"
+            files.append([doc["filename"], hashlib.sha256(material.encode("utf-8")).hexdigest()])
+        return self._submit("summaries", user_id, files, {"summaries": summaries})
+
+    def submit_images(self, images: List[Dict[str, Any]], user_id: str) -> Dict[str, Any]:
+        """Queue ingestion of captioned images; the raw bytes are stored, not decoded images."""
+        payload_images, files = [], []
+        for img_data in images:
+            image_data = {k: v for k, v in img_data.get("image_data", {}).items() if k != "rgb_image"}
+            payload_images.append({
+                "filename": img_data["filename"],
+                "image_data": image_data,
+                "embedding": img_data.get("embedding"),
+                "caption": img_data.get("caption", ""),
+            })
+            files.append([img_data["filename"], image_data.get("content_hash", "")])
+        return self._submit("images", user_id, files, {"images": payload_images})
+
+    def _submit(self, kind: str, user_id: str, files: List[List[str]], payload: Dict[str, Any]) -> Dict[str, Any]:
+        now = time.time()
+        key = job_key(kind, user_id, files)
+        fresh = {
+            "status": QUEUED,
+            "attempts": 0,
+            "max_attempts": self.max_attempts,
+            "created_at": now,
+            "updated_at": now,
+            "next_run_at": now,
+            "lease_until": None,
+            "worker": None,
+            "error": None,
+            "result": None,
+            "files": [{"filename": name, "stage": "queued", "progress": 0.0, "timings": {}} for name, _ in files],
+        }
+        job = {"_id": key, "kind": kind, "user_id": user_id, **fresh}
+
+        existing = self.store.insert(job, encode_payload(payload))
+        if existing is None:
+            logger.info(f"Queued {kind} ingestion job {key} ({len(files)} files) for user {user_id}")
+        elif existing["status"] not in PENDING_STATES and self.store.requeue(key, encode_payload(payload), fresh):
+            # Submitting a finished upload again starts it over: the file may
+            # have been deleted since, and a failed one may succeed this time
+            logger.info(f"Re-queued {existing['status']} {kind} ingestion job {key} for user {user_id}")
+        else:
+            # Pending, or re-queued by a concurrent submit of the same upload
+            existing = self.store.get(key) if existing["status"] not in PENDING_STATES else existing
+            logger.info(f"Ingestion job {key} already {existing['status']}; not queued again")
+            return existing
+
+        self._wake()
+        return job
+
+    def _wake(self) -> None:
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    # ---- status ----
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the public status of a job, or None if it does not exist."""
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+
+        def iso(timestamp: Optional[float]) -> Optional[str]:
+            return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+        files = job.get("files", [])
+        return {
+            "job_id": job["_id"],
+            "kind": job["kind"],
+            "user_id": job["user_id"],
+            "status": job["status"],
+            "attempts": job["attempts"],
+            "max_attempts": job["max_attempts"],
+            "created_at": iso(job["created_at"]),
+            "updated_at": iso(job["updated_at"]),
+            "next_attempt_at": iso(job["next_run_at"]) if job["status"] == RETRYING else None,
+            "progress": round(sum(f["progress"] for f in files) / len(files), 3) if files else 1.0,
+            "files": files,
+            "error": job.get("error"),
+            "result": job.get("result"),
+        }
+
+    # ---- workers ----
+
+    def start(self) -> None:
+        """Start the worker pool on the running event loop."""
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(f"ingest-{id(self):x}-{i}"))
+            for i in range(self.workers)
+        ]
+        logger.info(f"Started {self.workers} ingestion workers")
+
+    async def stop(self) -> None:
+        """Stop the workers; jobs they were running are claimed again after their lease."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, name: str) -> None:
+        while True:
+            try:
+                job = await asyncio.to_thread(self.store.claim, name, time.time(), self.lease_seconds)
+            except Exception as e:
+                logger.error(f"Ingestion worker {name} could not claim a job: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), INGEST_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(job, name)
+
+    async def _heartbeat(self, job_id: str, worker: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                renewed = await asyncio.to_thread(
+                    self.store.update, job_id, {"lease_until": time.time() + self.lease_seconds}, worker
+                )
+                if not renewed:
+                    logger.warning(f"Ingestion job {job_id} was taken over by another worker")
+            except Exception as e:
+                logger.warning(f"Could not renew the lease of job {job_id}: {e}")
+
+    async def _run(self, job: Dict[str, Any], worker: str) -> None:
+        job_id = job["_id"]
+        logger.info(f"Running {job['kind']} ingestion job {job_id}, attempt {job['attempts']}/{job['max_attempts']}")
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, worker))
+        start = time.time()
+        try:
+            handler = _HANDLERS[job["kind"]]
+            payload = decode_payload(await asyncio.to_thread(self.store.load_payload, job_id))
+            progress = _ProgressReporter(self.store, job, worker)
+            result = await asyncio.to_thread(handler, payload, job["user_id"], progress)
+        except Exception as e:
+            await asyncio.to_thread(self._record_failure, job, worker, e)
+        else:
+            # Files the handler did not report on are done with the job
+            for filename, (stage, _) in list(progress.last.items()):
+                if stage not in ("done", "skipped", "failed"):
+                    await asyncio.to_thread(progress, filename, "done", 1.0)
+            await asyncio.to_thread(self._record_success, job, worker, result, time.time() - start)
+        finally:
+            heartbeat.cancel()
+
+    def _record_success(self, job: Dict[str, Any], worker: str, result: Any, seconds: float) -> None:
+        now = time.time()
+        self.store.update(job["_id"], {
+            "status": SUCCEEDED,
+            "updated_at": now,
+            "lease_until": None,
+            "error": None,
+            "result": json.loads(json.dumps(result or {}, default=_json_default)),
+        }, worker=worker)
+        self.store.delete_payload(job["_id"])
+        logger.info(f"Ingestion job {job['_id']} succeeded in {seconds:.2f}s")
+
+    def _record_failure(self, job: Dict[str, Any], worker: str, error: Exception) -> None:
+        now = time.time()
+        attempts = job["attempts"]
+        fields = {"updated_at": now, "lease_until": None, "error": f"{type(error).__name__}: {error}"}
+        if attempts >= job["max_attempts"]:
+            fields["status"] = FAILED
+            logger.error(f"Ingestion job {job['_id']} failed after {attempts} attempts: {error}")
+        else:
+            # Exponential backoff with jitter, so retries of a shared outage spread out
+            delay = min(INGEST_RETRY_MAX_SECONDS, INGEST_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+            delay *= random.uniform(0.8, 1.2)
+            fields.update({"status": RETRYING, "next_run_at": now + delay})
+            logger.warning(f"Ingestion job {job['_id']} attempt {attempts} failed, retrying in {delay:.1f}s: {error}")
+        self.store.update(job["_id"], fields, worker=worker)
+
+
+# Shared queue used by the upload endpoint
+ingest_queue = IngestQueue()
+
+
+# Export public API
+__all__ = [
+    "QueueFull",
+    "MongoJobStore",
+    "SQLiteJobStore",
+    "IngestQueue",
+    "ingest_queue",
+    "job_key",
+    "encode_payload",
+    "decode_payload",
+]
@@ -0,0 +1,135 @@
+"""
+Remove the full-document copy from chunk metadata in existing user indices.
+
+Chunks ingested before this change carry `metadata.doc_content`, the whole
+source document, on every chunk. This command rewrites every `user_*` chunk
+index in place with `_update_by_query`:
+- drops `metadata.doc_content`
+- adds `metadata.start_char` / `metadata.end_char` by locating the chunk in
+  the document text it is about to drop
+then expunges the old document versions with a force merge and reports the
+store size of each index before and after.
+
+Image indices (`user_*_images`) have no chunk metadata and are skipped.
+
+Usage (from the backend directory):
+    python migrations/strip_chunk_doc_content.py
+    python migrations/strip_chunk_doc_content.py --index user_alice --dry-run
+"""
+
+import argparse
+import os
+import sys
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from opensearch_utils import get_os_connection  # noqa: E402
+
+STRIP_SCRIPT = """
+Map meta = ctx._source.metadata;
+String content = meta.remove('doc_content');
+if (content != null && ctx._source.text != null && !meta.containsKey('start_char')) {
+    int start = content.indexOf(ctx._source.text);
+    if (start >= 0) {
+        meta.start_char = start;
+        meta.end_char = start + ctx._source.text.length();
+    }
+}
+"""
+
+
+def chunk_indices(client, pattern: str) -> List[str]:
+    """Return the chunk indices matching `pattern`, excluding image indices."""
+    indices = client.indices.get(index=pattern, expand_wildcards="open")
+    return sorted(name for name in indices if not name.endswith("_images"))
+
+
+def index_size(client, index: str) -> Dict[str, int]:
+    """Return the primary store size and document counts of an index."""
+    primaries = client.indices.stats(index=index, metric="store,docs")["indices"][index]["primaries"]
+    return {
+        "bytes": primaries["store"]["size_in_bytes"],
+        "docs": primaries["docs"]["count"],
+        "deleted": primaries["docs"]["deleted"],
+    }
+
+
+def stale_chunk_count(client, index: str) -> int:
+    """Count chunks that still carry a copy of the document text."""
+    return client.count(
+        index=index, body={"query": {"exists": {"field": "metadata.doc_content"}}}
+    )["count"]
+
+
+def migrate_index(client, index: str) -> Dict[str, int]:
+    """Strip `doc_content` from every chunk of one index and compact it."""
+    response = client.update_by_query(
+        index=index,
+        body={
+            "query": {"exists": {"field": "metadata.doc_content"}},
+            "script": {"source": STRIP_SCRIPT, "lang": "painless"},
+        },
+        conflicts="proceed",
+        refresh=True,
+        slices="auto",
+        request_timeout=3600,
+    )
+    if response.get("failures"):
+        print(f"  {len(response['failures'])} failures, first: {response['failures'][0]}")
+
+    # Updated documents leave their old versions behind until segments merge
+    client.indices.forcemerge(index=index, only_expunge_deletes=True, request_timeout=3600)
+    client.indices.refresh(index=index)
+    return {"updated": response.get("updated", 0), "failures": len(response.get("failures", []))}
+
+
+def format_mb(size: int) -> str:
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", default="user_*", help="Index name or pattern to migrate")
+    parser.add_argument("--dry-run", action="store_true", help="Only report indices and stale chunk counts")
+    args = parser.parse_args()
+
+    client = get_os_connection()
+    indices = chunk_indices(client, args.index)
+    if not indices:
+        sys.exit(f"No chunk indices match '{args.index}'")
+
+    total_before = total_after = 0
+    for index in indices:
+        stale = stale_chunk_count(client, index)
+        before = index_size(client, index)
+        print(f"{index}: {before['docs']} chunks, {stale} with doc_content, {format_mb(before['bytes'])}")
+
+        if args.dry_run or not stale:
+            total_before += before["bytes"]
+            total_after += before["bytes"]
+            continue
+
+        result = migrate_index(client, index)
+        after = index_size(client, index)
+        total_before += before["bytes"]
+        total_after += after["bytes"]
+
+        saved = before["bytes"] - after["bytes"]
+        ratio = saved / before["bytes"] if before["bytes"] else 0.0
+        print(
+            f"  updated {result['updated']} chunks: {format_mb(before['bytes'])} -> "
+            f"{format_mb(after['bytes'])} ({ratio:.0%} smaller)"
+        )
+
+    if not args.dry_run:
+        saved = total_before - total_after
+        ratio = saved / total_before if total_before else 0.0
+        print(
+            f"\nTotal: {format_mb(total_before)} -> {format_mb(total_after)}, "
+            f"saved {format_mb(saved)} ({ratio:.0%})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""
+Process-wide registry for embedding models.
+
+This module provides functionality for:
+- Loading each embedding model once per (model name, device, quantization)
+- Optional dynamic int8 quantization of the linear layers for CPU inference
+- Warming models up at application startup
+- Reporting load time and memory use of the loaded models
+- Caching and micro-batching query embeddings in front of the shared models
+"""
+
+import logging
+import resource
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.embeddings import HuggingFaceEmbeddings
+from langchain.embeddings.base import Embeddings
+
+from cache_utils import query_cache_key, query_embedding_cache
+from config import EMBEDDING_MODEL, EMBEDDING_DEVICE, EMBEDDING_QUANTIZATION
+from embedding_batcher import MicroBatcher
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def _current_rss_bytes() -> int:
+    """
+    Return the resident set size of the current process in bytes.
+
+    Reads /proc/self/statm where available and falls back to the peak RSS
+    reported by getrusage on other platforms.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _parameter_bytes(model: Any) -> int:
+    """
+    Return the number of bytes held by a torch module's weights.
+
+    Uses the state dict so packed int8 weights of quantized layers are counted too.
+    """
+    def tensor_bytes(value: Any) -> int:
+        if isinstance(value, (tuple, list)):
+            return sum(tensor_bytes(v) for v in value)
+        if hasattr(value, "numel") and hasattr(value, "element_size"):
+            return value.numel() * value.element_size()
+        return 0
+
+    try:
+        return sum(tensor_bytes(value) for value in model.state_dict().values())
+    except Exception:
+        return 0
+
+
+def quantize_embedding_model(embedder: HuggingFaceEmbeddings, quantization: str) -> bool:
+    """
+    Apply dynamic quantization to the linear layers of a loaded embedding model.
+
+    Args:
+        embedder: Loaded HuggingFace embedding model
+        quantization: "int8" to quantize; anything else leaves the model untouched
+
+    Returns:
+        bool: True if the model was quantized
+    """
+    if quantization in ("", "none"):
+        return False
+    if quantization != "int8":
+        logger.warning(f"Unsupported embedding quantization '{quantization}', using fp32")
+        return False
+
+    import torch
+
+    device = str(getattr(embedder.client, "device", "cpu"))
+    if not device.startswith("cpu"):
+        logger.warning(f"int8 dynamic quantization only runs on CPU, keeping fp32 on {device}")
+        return False
+
+    torch.quantization.quantize_dynamic(
+        embedder.client, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+    )
+    return True
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves repeated queries from the query embedding cache.
+
+    Document embedding is delegated unchanged. Query cache misses go through
+    the model's micro-batcher so concurrent queries share one forward pass.
+    """
+
+    def __init__(self, embedder: Embeddings, model_id: str, batcher: Optional[MicroBatcher] = None) -> None:
+        self.embedder = embedder
+        self.model_id = model_id
+        self.batcher = batcher
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embedder.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = query_cache_key(self.model_id, text)
+        cached = query_embedding_cache.get(key)
+        if cached is not None:
+            return list(cached)
+
+        if self.batcher is not None:
+            vector = list(self.batcher.encode(text))
+        else:
+            vector = self.embedder.embed_query(text)
+        query_embedding_cache.put(key, tuple(vector))
+        return vector
+
+
+class EmbeddingModelRegistry:
+    """
+    Thread-safe cache of HuggingFace embedding models keyed by model name,
+    device and quantization mode.
+    """
+
+    def __init__(self) -> None:
+        self._models: Dict[Tuple[str, str, str], HuggingFaceEmbeddings] = {}
+        self._stats: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._batchers: Dict[Tuple[str, str, str], MicroBatcher] = {}
+        # Quantization actually applied to each loaded model; "none" when it fell back to fp32
+        self._applied: Dict[Tuple[str, str, str], str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(model_name: str, device: Optional[str], quantization: str) -> Tuple[str, str, str]:
+        return (model_name, device or "auto", quantization or "none")
+
+    def get(
+        self,
+        model_name: str = EMBEDDING_MODEL,
+        device: Optional[str] = EMBEDDING_DEVICE,
+        quantization: str = EMBEDDING_QUANTIZATION
+    ) -> HuggingFaceEmbeddings:
+        """
+        Return the shared embedding model, loading it on first use.
+
+        Args:
+            model_name: HuggingFace model name for embeddings
+            device: Torch device to load the model on (None lets the library decide)
+            quantization: "none" for fp32 or "int8" for dynamic int8 linear layers
+
+        Returns:
+            HuggingFaceEmbeddings: Shared embedding model instance
+        """
+        key = self._key(model_name, device, quantization)
+        embedder = self._models.get(key)
+        if embedder is not None:
+            return embedder
+
+        with self._lock:
+            # Another thread may have loaded it while we were waiting
+            embedder = self._models.get(key)
+            if embedder is not None:
+                return embedder
+
+            logger.info(f"Loading embedding model '{model_name}' (device={key[1]}, quantization={key[2]})")
+            rss_before = _current_rss_bytes()
+            start = time.time()
+
+            model_kwargs = {"device": device} if device else {}
+            embedder = HuggingFaceEmbeddings(model_name=model_name, model_kwargs=model_kwargs)
+            quantized = quantize_embedding_model(embedder, key[2])
+
+            load_time = time.time() - start
+            self._applied[key] = key[2] if quantized else "none"
+            self._models[key] = embedder
+            self._stats[key] = {
+                "model_name": model_name,
+                "device": str(getattr(embedder.client, "device", key[1])),
+                "quantization": self._applied[key],
+                "load_time_seconds": round(load_time, 3),
+                "parameter_bytes": _parameter_bytes(embedder.client),
+                "rss_delta_bytes": max(0, _current_rss_bytes() - rss_before),
+                "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "warmup_time_seconds": None,
+            }
+            logger.info(f"Loaded embedding model '{model_name}' in {load_time:.2f}s")
+            return embedder
+
+    def model_id(
+        self,
+        model_name: str = EMBEDDING_MODEL,
+        device: Optional[str] = EMBEDDING_DEVICE,
+        quantization: str = EMBEDDING_QUANTIZATION
+    ) -> str:
+        """
+        Return the identifier vectors from a model are cached and stored under.
+
+        Quantized models produce slightly different vectors, so they get their
+        own id. The id follows the quantization actually applied when the model
+        was loaded, so a model that fell back to fp32 shares the fp32 vectors.
+
+        Args:
+            model_name: HuggingFace model name for embeddings
+            device: Torch device to load the model on
+            quantization: Requested quantization
+
+        Returns:
+            str: The model name, suffixed with "@<quantization>" if quantized
+        """
+        self.get(model_name, device, quantization)
+        applied = self._applied[self._key(model_name, device, quantization)]
+        return model_name if applied == "none" else f"{model_name}@{applied}"
+
+    def warm_up(
+        self,
+        model_name: str = EMBEDDING_MODEL,
+        device: Optional[str] = EMBEDDING_DEVICE,
+        quantization: str = EMBEDDING_QUANTIZATION
+    ) -> None:
+        """
+        Load a model and run a dummy encode so the first real request is not slowed down.
+
+        Args:
+            model_name: HuggingFace model name for embeddings
+            device: Torch device to load the model on
+            quantization: "none" for fp32 or "int8" for dynamic int8 linear layers
+        """
+        embedder = self.get(model_name, device, quantization)
+
+        start = time.time()
+        embedder.embed_query("warm-up")
+        warmup_time = time.time() - start
+
+        self._stats[self._key(model_name, device, quantization)]["warmup_time_seconds"] = round(warmup_time, 3)
+        logger.info(f"Warmed up embedding model '{model_name}' in {warmup_time:.2f}s")
+
+    def get_query_embedder(
+        self,
+        model_name: str = EMBEDDING_MODEL,
+        device: Optional[str] = EMBEDDING_DEVICE,
+        quantization: str = EMBEDDING_QUANTIZATION
+    ) -> CachedQueryEmbeddings:
+        """
+        Return the shared model wrapped with the query embedding cache.
+
+        Args:
+            model_name: HuggingFace model name for embeddings
+            device: Torch device to load the model on
+            quantization: "none" for fp32 or "int8" for dynamic int8 linear layers
+
+        Returns:
+            CachedQueryEmbeddings: Wrapper whose `embed_query` consults the cache first
+                and batches misses with concurrent queries
+        """
+        embedder = self.get(model_name, device, quantization)
+        key = self._key(model_name, device, quantization)
+        model_id = self.model_id(model_name, device, quantization)
+
+        batcher = self._batchers.get(key)
+        if batcher is None:
+            with self._lock:
+                batcher = self._batchers.get(key)
+                if batcher is None:
+                    batcher = MicroBatcher(f"text:{model_id}", embedder.embed_documents)
+                    self._batchers[key] = batcher
+
+        return CachedQueryEmbeddings(embedder, model_id, batcher)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Return load time and memory statistics for every loaded model.
+
+        Returns:
+            List[Dict]: One entry per loaded (model name, device, quantization)
+        """
+        return [dict(stats) for stats in self._stats.values()]
+
+
+# Shared registry used by every call site in the process
+embedding_registry = EmbeddingModelRegistry()
+
+
+def get_embedding_model(
+    model_name: str = EMBEDDING_MODEL,
+    device: Optional[str] = EMBEDDING_DEVICE,
+    quantization: str = EMBEDDING_QUANTIZATION
+) -> HuggingFaceEmbeddings:
+    """
+    Return the process-wide embedding model for the given name, device and quantization.
+
+    Args:
+        model_name: HuggingFace model name for embeddings
+        device: Torch device to load the model on
+        quantization: "none" for fp32 or "int8" for dynamic int8 linear layers
+
+    Returns:
+        HuggingFaceEmbeddings: Shared embedding model instance
+    """
+    return embedding_registry.get(model_name, device, quantization)
+
+
+def embedding_model_id(
+    model_name: str = EMBEDDING_MODEL,
+    device: Optional[str] = EMBEDDING_DEVICE,
+    quantization: str = EMBEDDING_QUANTIZATION
+) -> str:
+    """
+    Return the identifier vectors from the shared model are cached and stored under.
+
+    See `EmbeddingModelRegistry.model_id`.
+    """
+    return embedding_registry.model_id(model_name, device, quantization)
+
+
+def get_query_embedder(
+    model_name: str = EMBEDDING_MODEL,
+    device: Optional[str] = EMBEDDING_DEVICE,
+    quantization: str = EMBEDDING_QUANTIZATION
+) -> CachedQueryEmbeddings:
+    """
+    Return the process-wide embedding model wrapped with the query embedding cache.
+
+    Args:
+        model_name: HuggingFace model name for embeddings
+        device: Torch device to load the model on
+        quantization: "none" for fp32 or "int8" for dynamic int8 linear layers
+
+    Returns:
+        CachedQueryEmbeddings: Cached query embedder
+    """
+    return embedding_registry.get_query_embedder(model_name, device, quantization)
+
+
+# Export public API
+__all__ = [
+    "CachedQueryEmbeddings",
+    "EmbeddingModelRegistry",
+    "embedding_model_id",
+    "quantize_embedding_model",
+    "embedding_registry",
+    "get_embedding_model",
+    "get_query_embedder",
+]
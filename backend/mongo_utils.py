@@ -7,26 +7,28 @@ handling user-specific collections, and managing document lifecycle.
 
 import asyncio
 import logging
+import threading
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional, Any, Tuple
-import base64
 from io import BytesIO
-import os
+from typing import Callable, Dict, List, Optional, Any, Tuple
 
+import numpy as np
 from bson import ObjectId
-from pymongo import MongoClient
-from rouge_score import rouge_scorer
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
 from tqdm import tqdm
-from PIL import Image
 
+from bulk_indexer import BulkIndexer
+from cache_utils import content_fingerprint
 from config import EMBEDDING_MODEL, MONGO_DB_HOST
 from opensearch_utils import (
     ingest_code_to_os,
     get_os_connection,
     create_os_vectorstore,
-    ImageRAG
+    get_image_rag
 )
+from utils import iter_text_pages
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -34,8 +36,9 @@ logger = logging.getLogger(__name__)
 # Create thread pool for CPU-bound operations
 executor = ThreadPoolExecutor(max_workers=4)
 
-# Initialize ROUGE scorer
-ROUGE_SCORER = rouge_scorer.RougeScorer(['rouge1', 'rouge2', 'rougeL'], use_stemmer=True)
+# User collections whose indexes were ensured by this process
+_indexed_collections = set()
+_indexed_collections_lock = threading.Lock()
 
 
 def mongo_db_connection() -> MongoClient:
@@ -112,7 +115,7 @@ def get_or_create_user_collection(mongo_db: MongoClient, user_id: str) -> Any:
         user_id: User identifier
         
     Returns:
-        MongoDB collection for the user
+        MongoDB collection for the user, with its indexes (see `ensure_collection_indexes`)
     """
     collection_name = user_id.lower()
     os_index_name = user_id.lower()
@@ -130,6 +133,7 @@ def get_or_create_user_collection(mongo_db: MongoClient, user_id: str) -> Any:
     if not mongo_exists and not os_exists:
         logger.info(f"Creating NEW MongoDB collection + OpenSearch index for '{user_id}'")
         mongo_collection = mongo_db[collection_name]
+        ensure_collection_indexes(mongo_collection)
         create_os_vectorstore(index_name=os_index_name, drop_old=False)
         return mongo_collection
     
@@ -140,7 +144,7 @@ def get_or_create_user_collection(mongo_db: MongoClient, user_id: str) -> Any:
         )
         logger.info("Creating missing OpenSearch index...")
         create_os_vectorstore(index_name=os_index_name, drop_old=False)
-        return mongo_db[collection_name]
+        return ensure_collection_indexes(mongo_db[collection_name])
     
     # Case 3: OS exists but Mongo missing
     if not mongo_exists and os_exists:
@@ -149,69 +153,122 @@ def get_or_create_user_collection(mongo_db: MongoClient, user_id: str) -> Any:
         )
         logger.info("Creating MongoDB collection to align state...")
         mongo_collection = mongo_db[collection_name]
-        return mongo_collection
+        return ensure_collection_indexes(mongo_collection)
     
     # Case 4: both exist → normal path
     logger.info(f"User '{user_id}' exists in both Mongo and OpenSearch.")
-    return mongo_db[collection_name]
+    return ensure_collection_indexes(mongo_db[collection_name])
 
 
-async def ingest_documents_with_summaries_in_background(
-    docs_with_summaries: List[Dict], 
-    user_id: str
-) -> Optional[Any]:
+def ensure_collection_indexes(collection: Any) -> Any:
     """
-    Background task to ingest documents with their summaries.
+    Create the indexes of a user document collection, once per process.
+    
+    `doc_name` is unique, so concurrent uploads of a name can't both insert
+    it; `content_hash` serves duplicate lookups. A collection that already
+    holds duplicate names gets a non-unique `doc_name` index instead.
     
     Args:
-        docs_with_summaries: List of documents with summaries
-        user_id: User identifier
+        collection: User collection
         
     Returns:
-        Result of ingestion process
+        The collection
     """
+    with _indexed_collections_lock:
+        if collection.name in _indexed_collections:
+            return collection
+    
+    # Creating an index that exists is a no-op, so racing callers are harmless
     try:
-        logger.info(f"Starting background ingestion for user {user_id}")
-        logger.debug(f"Received {len(docs_with_summaries) if docs_with_summaries else 0} documents")
+        collection.create_index("doc_name", unique=True, name="doc_name_unique")
+    except OperationFailure as e:
+        logger.error(f"Collection '{collection.name}' has duplicate document names, doc_name is not unique: {e}")
+        collection.create_index("doc_name", name="doc_name")
+    collection.create_index("content_hash", name="content_hash")
+    
+    with _indexed_collections_lock:
+        _indexed_collections.add(collection.name)
+    return collection
+
+
+def bulk_write_documents(collection: Any, writes: Dict[str, UpdateOne]) -> Dict[str, Dict[str, Any]]:
+    """
+    Run one write per document as a single unordered bulk write.
+    
+    Args:
+        collection: User collection
+        writes: doc_name -> UpdateOne
         
-        if not docs_with_summaries:
-            logger.warning("No documents to process")
-            return None
-            
-        # Validate document structure
-        if docs_with_summaries and isinstance(docs_with_summaries[0], dict):
-            logger.debug(f"First document structure: {list(docs_with_summaries[0].keys())}")
+    Returns:
+        Dict: doc_name -> {"status": "upserted" (with "_id"), "written", or
+            "failed" (with "error")}; a duplicate key error means another
+            upload inserted the name first and counts as "written"
+    """
+    if not writes:
+        return {}
+    
+    names = list(writes)
+    try:
+        details = collection.bulk_write([writes[name] for name in names], ordered=False).bulk_api_result
+    except BulkWriteError as e:
+        # Unordered: the other writes went through
+        details = e.details
+    
+    upserted = {item["index"]: item["_id"] for item in details.get("upserted", [])}
+    errors = {item["index"]: item for item in details.get("writeErrors", [])}
+    
+    results = {}
+    for i, name in enumerate(names):
+        if i in upserted:
+            results[name] = {"status": "upserted", "_id": upserted[i]}
+        elif i in errors and errors[i].get("code") != 11000:
+            results[name] = {"status": "failed", "error": errors[i].get("errmsg", "write failed")}
         else:
-            logger.error(f"Unexpected document structure: {type(docs_with_summaries[0])}")
-            return None
-        
-        # Run in thread pool to avoid blocking the event loop
-        result = await asyncio.get_event_loop().run_in_executor(
-            executor,
-            lambda: ingest_documents_to_mongodb_and_opensearch(docs_with_summaries, user_id)
-        )
-        
-        logger.info(f"Background ingestion completed for user {user_id}")
-        return result
-        
-    except Exception as e:
-        logger.error(f"Error in background ingestion setup: {e}")
-        import traceback
-        traceback.print_exc()
-        raise
+            results[name] = {"status": "written"}
+    return results
+
+
+class IngestError(Exception):
+    """Raised when some files of an ingestion could not be stored or indexed."""
 
 
 def ingest_documents_to_mongodb_and_opensearch(
     docs_with_summaries: List[Dict], 
-    user_id: str
-) -> None:
+    user_id: str,
+    on_progress: Optional[Callable[[str, str, float], None]] = None,
+    reingest: bool = False
+) -> Dict[str, Any]:
     """
-    Ingest documents with pre-computed summaries to MongoDB and OpenSearch.
+    Ingest documents to MongoDB and OpenSearch.
+    
+    All documents are stored before any is indexed. A document without a
+    "summary" gets an empty one, filled in by `store_document_summaries`.
+    
+    A document whose name is already stored is skipped, unless `reingest` is
+    set and its content changed: then its record is replaced, its
+    "doc_version" incremented, and only its new chunks are embedded and
+    indexed, while chunks no longer in it are deleted.
+    
+    Safe to run again after a failure: documents stored but not fully indexed
+    are indexed again under the same chunk ids, and finished ones are skipped.
     
     Args:
-        docs_with_summaries: List of documents with summaries
+        docs_with_summaries: List of documents, with summaries if already generated
         user_id: User identifier
+        on_progress: Called with (filename, stage, progress from 0 to 1)
+        reingest: Update stored documents whose content changed
+        
+    Returns:
+        Dict: Chunk count, embedding store hit ratio, chunks kept and deleted
+            by re-ingestion, and the outcome of each document ("documents")
+        
+    Raises:
+        IngestError: If any document failed; the others are ingested
     """
+    def progress(filename: str, stage: str, fraction: float) -> None:
+        if on_progress is not None:
+            on_progress(filename, stage, fraction)
+    
     try:
         logger.info(f"Starting MongoDB/OpenSearch ingestion for {len(docs_with_summaries)} documents")
         
@@ -222,8 +279,33 @@ def ingest_documents_to_mongodb_and_opensearch(
         collection_name = f"user_{user_id}".lower()
         collection = get_or_create_user_collection(mongo_db, collection_name)
         
-        # Process documents with progress bar
-        for i, doc_data in enumerate(tqdm(docs_with_summaries, desc="Ingesting documents")):
+        # Embedding store reuse across every document in this upload
+        upload_report = {
+            "chunks": 0, "embedding_store_lookups": 0, "embedding_cache_hits": 0,
+            "chunks_kept": 0, "chunks_deleted": 0
+        }
+        # doc_name -> inserted, reingested, resumed, skipped or failed
+        outcomes: Dict[str, str] = {}
+        failures = {}
+        
+        # Store every record first, so summaries finishing meanwhile find them.
+        # The whole batch is looked up with one query and written with one bulk write.
+        names = [
+            doc_data.get("filename", f"unknown_{i}")
+            for i, doc_data in enumerate(docs_with_summaries) if isinstance(doc_data, dict)
+        ]
+        existing_docs = {
+            doc["doc_name"]: doc
+            for doc in collection.find(
+                {"doc_name": {"$in": names}},
+                {"doc_name": 1, "indexed": 1, "content_hash": 1, "doc_version": 1}
+            )
+        }
+        
+        writes: Dict[str, UpdateOne] = {}
+        # doc_name -> (document data, content, existing record, content changed)
+        prepared: Dict[str, Tuple[Dict, str, Optional[Dict], bool]] = {}
+        for i, doc_data in enumerate(docs_with_summaries):
             # Validate document data
             if not isinstance(doc_data, dict):
                 logger.error(f"Document {i} is not a dict: {type(doc_data)}")
@@ -231,67 +313,159 @@ def ingest_documents_to_mongodb_and_opensearch(
                 
             doc_name = doc_data.get("filename", f"unknown_{i}")
             doc_content = doc_data.get("content", "")
-            doc_summary = doc_data.get("summary_clean", doc_data.get("summary", ""))
+            # None while the summary is still being generated
+            doc_summary = doc_data.get("summary_clean", doc_data.get("summary"))
             
             if not doc_content:
                 logger.warning(f"Skipping document {doc_name}: No content")
+                outcomes[doc_name] = "skipped"
+                progress(doc_name, "skipped", 1.0)
                 continue
-                
-            logger.debug(f"Processing document {i+1}/{len(docs_with_summaries)}: {doc_name}")
             
-            # Check for existing document
-            existing = collection.find_one({"doc_name": doc_name})
-            if existing:
-                logger.info(f"Skipping duplicate document '{doc_name}' for user '{user_id}'")
+            if doc_name in writes:
+                logger.warning(f"Skipping second copy of '{doc_name}' in the same upload")
                 continue
             
-            # Calculate ROUGE scores
-            try:
-                if doc_summary:
-                    scores = ROUGE_SCORER.score(doc_content, doc_summary)
-                    logger.debug(f"Scores for {doc_name}: {scores}")
-                else:
-                    scores = {"rouge1": 0, "rouge2": 0, "rougeL": 0}
-                    logger.debug(f"No summary available for {doc_name}, using default scores")
-            except Exception as e:
-                logger.error(f"Error calculating scores for {doc_name}: {e}")
-                scores = {"rouge1": 0, "rouge2": 0, "rougeL": 0}
+            content_hash = doc_data.get("content_hash") or content_fingerprint(doc_content)
             
-            # Create document entry
+            # Check for existing document; one left unindexed by an earlier attempt is resumed
+            existing = existing_docs.get(doc_name)
+            changed = False
+            if existing and existing.get("indexed", True):
+                if not reingest or existing.get("content_hash") == content_hash:
+                    logger.info(f"Skipping duplicate document '{doc_name}' for user '{user_id}'")
+                    outcomes[doc_name] = "skipped"
+                    progress(doc_name, "skipped", 1.0)
+                    continue
+                changed = True
+            
+            progress(doc_name, "storing", 0.0)
+            
+            # Create document entry; "indexed" is set once its chunks are in OpenSearch
             document = {
                 "doc_name": doc_name,
                 "doc_content": doc_content,
-                "doc_summary": doc_summary,
                 "uploaded_at": datetime.now().isoformat(),
-                "Rouge_Score": scores,
-                "is_image": doc_data.get("is_image", False)
+                "is_image": doc_data.get("is_image", False),
+                "content_hash": content_hash,
+                "indexed": False
             }
+            if doc_summary is not None:
+                # Scored off the ingestion path, see quality.py
+                document.update({"doc_summary": doc_summary, "Rouge_Score": None})
+            elif changed:
+                # The old version's summary no longer applies; the new one is stored when done
+                document.update({"doc_summary": "", "Rouge_Score": None})
             
-            # Insert into MongoDB
-            try:
-                result = collection.insert_one(document)
-                logger.debug(f"Added document '{doc_name}' to MongoDB with ID: {result.inserted_id}")
-            except Exception as e:
-                logger.error(f"Error inserting into MongoDB: {e}")
+            if existing:
+                if changed:
+                    document["doc_version"] = existing.get("doc_version", 1) + 1
+                # Keep a summary stored by `store_document_summaries` in the meantime
+                writes[doc_name] = UpdateOne({"_id": existing["_id"]}, {"$set": document})
+            else:
+                document.setdefault("doc_summary", "")
+                document.setdefault("Rouge_Score", None)
+                document["doc_version"] = 1
+                # Inserts only if no upload stored the name since the lookup
+                writes[doc_name] = UpdateOne({"doc_name": doc_name}, {"$setOnInsert": document}, upsert=True)
+            prepared[doc_name] = (doc_data, doc_content, existing, changed)
+        
+        results = bulk_write_documents(collection, writes)
+        
+        stored = []
+        for doc_name, (doc_data, doc_content, existing, changed) in prepared.items():
+            result = results[doc_name]
+            if result["status"] == "failed":
+                logger.error(f"Error writing '{doc_name}' to MongoDB: {result['error']}")
+                failures[doc_name] = f"MongoDB write failed: {result['error']}"
+                outcomes[doc_name] = "failed"
+                progress(doc_name, "failed", 0.0)
                 continue
             
+            if existing is None and result["status"] != "upserted":
+                # A concurrent upload stored it between the lookup and the write; it indexes it
+                logger.info(f"Skipping document '{doc_name}' stored by a concurrent upload for user '{user_id}'")
+                outcomes[doc_name] = "skipped"
+                progress(doc_name, "skipped", 1.0)
+                continue
+            
+            if changed:
+                doc_id = existing["_id"]
+                outcomes[doc_name] = "reingested"
+                logger.info(f"Re-ingesting '{doc_name}' for user '{user_id}'")
+            elif existing:
+                doc_id = existing["_id"]
+                outcomes[doc_name] = "resumed"
+                logger.info(f"Resuming ingestion of '{doc_name}' for user '{user_id}'")
+            else:
+                doc_id = result["_id"]
+                outcomes[doc_name] = "inserted"
+                logger.debug(f"Added document '{doc_name}' to MongoDB with ID: {doc_id}")
+            
+            progress(doc_name, "stored", 1.0)
+            # Chunks already indexed for an existing record are diffed, not rewritten
+            stored.append((doc_data, doc_name, doc_content, doc_id, existing is not None))
+        
+        # Then chunk, embed and index them
+        for doc_data, doc_name, doc_content, doc_id, incremental in tqdm(stored, desc="Indexing documents"):
             # Ingest to OpenSearch (only for non-image documents)
             if not doc_data.get("is_image", False):
+                progress(doc_name, "indexing", 0.0)
                 try:
+                    index = doc_data.get("page_index")
                     os_doc = [{
                         "filename": doc_name,
-                        "text": doc_content
+                        "text": doc_content,
+                        # Pages are sliced from the text as the chunker reads them
+                        "pages": iter_text_pages(doc_content, index) if index else None,
+                        "doc_id": str(doc_id)
                     }]
                     
                     logger.debug(f"Preparing to ingest to OpenSearch: {doc_name} (content length: {len(doc_content)})")
-                    ingest_code_to_os(os_doc, EMBEDDING_MODEL, collection_name)
+                    report = ingest_code_to_os(
+                        os_doc,
+                        EMBEDDING_MODEL,
+                        collection_name,
+                        on_progress=lambda name, chars: progress(name, "indexing", min(chars / len(doc_content), 1.0)),
+                        incremental=incremental
+                    )
+                    upload_report["chunks"] += report["chunks"]
+                    upload_report["embedding_store_lookups"] += report["embedding_store_lookups"]
+                    upload_report["embedding_cache_hits"] += report["embedding_cache_hits"]
+                    upload_report["chunks_kept"] += report["reused"]
+                    upload_report["chunks_deleted"] += report["deleted"]
+                    if report["failed"]:
+                        raise RuntimeError(f"{report['failed']} chunks failed to index")
                     logger.debug(f"Ingested '{doc_name}' to OpenSearch")
                 except Exception as e:
                     logger.error(f"Error ingesting to OpenSearch: {e}")
-                    # Continue even if OpenSearch fails
+                    # Continue with the other documents; this one is retried
+                    failures[doc_name] = f"OpenSearch ingest failed: {e}"
+                    outcomes[doc_name] = "failed"
+                    progress(doc_name, "failed", 0.0)
                     continue
+            
+            collection.update_one({"_id": doc_id}, {"$set": {"indexed": True}})
+            progress(doc_name, "done", 1.0)
+        
+        # Chunks kept by re-ingestion never reach the store; they are reported as chunks_kept
+        if upload_report["embedding_store_lookups"]:
+            upload_report["hit_ratio"] = round(
+                upload_report["embedding_cache_hits"] / upload_report["embedding_store_lookups"], 4
+            )
+            logger.info(
+                f"Embedding store reuse for upload: {upload_report['embedding_cache_hits']}/"
+                f"{upload_report['embedding_store_lookups']} chunks looked up ({upload_report['hit_ratio']:.0%}), "
+                f"{upload_report['chunks_kept']} chunks kept"
+            )
+        
+        upload_report["documents"] = outcomes
+        
+        if failures:
+            raise IngestError(f"{len(failures)} of {len(docs_with_summaries)} documents failed: {failures}")
         
         logger.info(f"Completed ingestion of {len(docs_with_summaries)} documents for user {user_id}")
+        return upload_report
         
     except Exception as e:
         logger.error(f"Critical error in ingestion: {e}")
@@ -300,48 +474,150 @@ def ingest_documents_to_mongodb_and_opensearch(
         raise
 
 
-async def ingest_images_to_mongodb_and_opensearch(
-    images_data: List[Dict], 
-    user_id: str
-) -> Optional[Any]:
+def store_document_summaries(
+    summaries: List[Dict],
+    user_id: str,
+    on_progress: Optional[Callable[[str, str, float], None]] = None
+) -> Dict[str, Any]:
     """
-    Background task to ingest images to MongoDB and OpenSearch ImageRAG index.
+    Store summaries of documents ingested without one.
+    
+    Uploads are indexed while their summaries are still streaming; each
+    summary is written to its document (matched by name and content hash)
+    when it is done. Its ROUGE scores are reset until it is scored again.
     
     Args:
-        images_data: List of image data dictionaries
+        summaries: Dicts with "filename", "content_hash" and "summary_clean"
         user_id: User identifier
+        on_progress: Called with (filename, stage, progress from 0 to 1)
         
     Returns:
-        Result of ingestion process
-    """
-    try:
-        logger.info(f"Starting background image ingestion for user {user_id}")
-        logger.debug(f"Received {len(images_data) if images_data else 0} images")
+        Dict: Count and names of documents whose summary was stored
         
-        if not images_data:
-            logger.warning("No images to process")
-            return None
+    Raises:
+        IngestError: If a document is not stored yet; the job is retried
+    """
+    def progress(filename: str, stage: str, fraction: float) -> None:
+        if on_progress is not None:
+            on_progress(filename, stage, fraction)
+    
+    collection = mongo_db_connection()[f"user_{user_id}".lower()]
+    stored = []
+    not_stored = []
+    
+    for item in summaries:
+        doc_name = item["filename"]
+        doc_summary = item.get("summary_clean", item.get("summary", ""))
         
-        # Run in thread pool to avoid blocking the event loop
-        result = await asyncio.get_event_loop().run_in_executor(
-            executor,
-            lambda: _ingest_images_sync(images_data, user_id)
+        document = collection.find_one(
+            {"doc_name": doc_name, "content_hash": item["content_hash"]},
+            {"doc_content": 1}
         )
+        if document is None:
+            if collection.find_one({"doc_name": doc_name}, {"_id": 1}) is not None:
+                # The name belongs to a different, earlier upload, which keeps its summary
+                logger.info(f"Not storing summary of '{doc_name}': stored with other content")
+                progress(doc_name, "skipped", 1.0)
+            else:
+                not_stored.append(doc_name)
+            continue
         
-        logger.info(f"Background image ingestion completed for user {user_id}")
-        return result
+        progress(doc_name, "storing", 0.0)
+        collection.update_one(
+            {"_id": document["_id"]},
+            {"$set": {"doc_summary": doc_summary, "Rouge_Score": None}}
+        )
+        stored.append(doc_name)
+        progress(doc_name, "done", 1.0)
+    
+    if not_stored:
+        raise IngestError(f"Documents not stored yet: {not_stored}")
+    
+    logger.info(f"Stored {len(stored)} summaries for user {user_id}")
+    return {"summaries": len(stored), "documents": stored}
+
+
+def store_duplicate_documents(duplicates: List[Dict], user_id: str) -> List[str]:
+    """
+    Store records for uploads whose content is stored under another name.
+    
+    The record holds the stored document's summary and content hash and
+    points at it ("duplicate_of"); its content and chunks stay with the
+    stored document, so nothing is embedded or indexed again. A name that is
+    already stored keeps its record.
+    
+    Args:
+        duplicates: Dicts with "filename", "content_hash" and "stored_document"
+            (as returned by `find_documents_by_fingerprint`)
+        user_id: User identifier
         
-    except Exception as e:
-        logger.error(f"Error in background image ingestion setup: {e}")
-        import traceback
-        traceback.print_exc()
-        raise
+    Returns:
+        List[str]: Names whose record was stored
+    """
+    collection = get_or_create_user_collection(mongo_db_connection(), f"user_{user_id}".lower())
+    
+    writes: Dict[str, UpdateOne] = {}
+    for item in duplicates:
+        stored = item["stored_document"]
+        doc_name = item["filename"]
+        if doc_name == stored["doc_name"] or doc_name in writes:
+            continue
+        record = {
+            "doc_name": doc_name,
+            "duplicate_of": stored["doc_name"],
+            "uploaded_at": datetime.now().isoformat(),
+            "is_image": False,
+            "content_hash": item["content_hash"],
+            "doc_summary": stored.get("doc_summary", ""),
+            "Rouge_Score": None,
+            "doc_version": 1,
+            "indexed": True
+        }
+        writes[doc_name] = UpdateOne({"doc_name": doc_name}, {"$setOnInsert": record}, upsert=True)
+    
+    stored_names = []
+    for doc_name, result in bulk_write_documents(collection, writes).items():
+        if result["status"] == "upserted":
+            stored_names.append(doc_name)
+        elif result["status"] == "failed":
+            logger.error(f"Error writing duplicate record '{doc_name}' to MongoDB: {result['error']}")
+    
+    logger.info(f"Stored {len(stored_names)} duplicate records for user {user_id}")
+    return stored_names
+
+
+def _decode_rgb_image(image_bytes: bytes) -> Any:
+    """Decode image bytes into an RGB PIL image."""
+    from PIL import Image
+    
+    image = Image.open(BytesIO(image_bytes))
+    image.load()
+    return image if image.mode == "RGB" else image.convert("RGB")
 
 
-def _ingest_images_sync(images_data: List[Dict], user_id: str) -> Dict[str, Any]:
+def ingest_images_to_mongodb_and_opensearch(
+    images_data: List[Dict],
+    user_id: str,
+    on_progress: Optional[Callable[[str, str, float], None]] = None
+) -> Dict[str, Any]:
     """
-    Synchronous function to ingest images to MongoDB and OpenSearch.
+    Ingest images to MongoDB and the OpenSearch image and document indexes.
+    
+    Images are embedded and captioned here only if the upload did not already
+    do it. Index writes use stable ids, so running this again is safe.
+    
+    Args:
+        images_data: List of image data dictionaries
+        user_id: User identifier
+        on_progress: Called with (filename, stage, progress from 0 to 1)
+        
+    Returns:
+        Dict: Counts of successful and failed images, and per-image errors
     """
+    def progress(filename: str, stage: str, fraction: float) -> None:
+        if on_progress is not None:
+            on_progress(filename, stage, fraction)
+    
     try:
         logger.info(f"Starting MongoDB/OpenSearch image ingestion for {len(images_data)} images")
         
@@ -353,8 +629,8 @@ def _ingest_images_sync(images_data: List[Dict], user_id: str) -> Dict[str, Any]
         document_index_name = collection_name  # This is the regular document index
         collection = get_or_create_user_collection(mongo_db, collection_name)
         
-        # Initialize ImageRAG
-        image_rag = ImageRAG()
+        # Get shared ImageRAG service
+        image_rag = get_image_rag()
         image_index_name = f"user_{user_id}_images".lower()
         
         # Create image-specific index if it doesn't exist
@@ -365,118 +641,115 @@ def _ingest_images_sync(images_data: List[Dict], user_id: str) -> Dict[str, Any]
             "failed": 0,
             "errors": []
         }
+        # Failures worth running the ingestion again for (index or database writes)
+        retryable = []
+        
+        # Queued jobs carry the raw bytes; decode only images the models still have to see
+        for img_data in images_data:
+            image_data = img_data.get("image_data", {})
+            needs_model = img_data.get("embedding") is None or not img_data.get("caption")
+            if needs_model and image_data.get("rgb_image") is None and image_data.get("image_bytes"):
+                try:
+                    image_data["rgb_image"] = _decode_rgb_image(image_data["image_bytes"])
+                except Exception as e:
+                    logger.error(f"Could not decode image '{img_data.get('filename')}': {e}")
+            if needs_model:
+                progress(img_data.get("filename", ""), "embedding", 0.0)
         
-        # Process images with progress bar
-        for i, img_data in enumerate(tqdm(images_data, desc="Ingesting images")):
+        # Embed and caption every image still missing an upload-time result, in batched calls
+        to_embed = [
+            img_data for img_data in images_data
+            if img_data.get("embedding") is None and img_data.get("image_data", {}).get("rgb_image") is not None
+        ]
+        if to_embed:
+            embeddings = image_rag.extract_image_embeddings(
+                [img_data["image_data"]["rgb_image"] for img_data in to_embed]
+            )
+            for img_data, embedding in zip(to_embed, embeddings):
+                img_data["embedding"] = embedding
+
+        to_caption = [
+            img_data for img_data in images_data
+            if not img_data.get("caption") and img_data.get("image_data", {}).get("rgb_image") is not None
+        ]
+        if to_caption:
+            caption_results = image_rag.generate_image_captions(
+                [img_data["image_data"]["rgb_image"] for img_data in to_caption],
+                content_hashes=[img_data["image_data"].get("content_hash") for img_data in to_caption]
+            )
+            for img_data, caption_result in zip(to_caption, caption_results):
+                img_data["caption"] = caption_result["caption"]
+        
+        # Build the index and MongoDB documents for every image first
+        image_docs = []
+        caption_docs = []
+        mongo_docs = {}
+        for i, img_data in enumerate(tqdm(images_data, desc="Preparing images")):
             filename = img_data.get("filename", f"unknown_image_{i}")
             image_data = img_data.get("image_data", {})
-            caption = img_data.get("caption")  # Get pre-generated caption
+            caption = img_data.get("caption", "")
+            
+            # Work on the decoded in-memory image; nothing is written to disk
+            if img_data.get("embedding") is None:
+                error_msg = f"No image content for '{filename}'"
+                logger.error(error_msg)
+                results["failed"] += 1
+                results["errors"].append({
+                    "filename": filename,
+                    "error": error_msg
+                })
+                progress(filename, "failed", 0.0)
+                continue
+            
+            progress(filename, "indexing", 0.0)
             
             try:
-                # First, save image temporarily to process with ImageRAG
-                temp_image_path = f"/tmp/{filename}"
+                # Embedding computed at upload time or in the batch above
+                embedding = np.asarray(img_data["embedding"])
                 
-                # Decode base64 and save to temp file
-                base64_content = image_data.get("base64_content", "")
-                if base64_content:
-                    image_bytes = base64.b64decode(base64_content)
-                    with open(temp_image_path, "wb") as f:
-                        f.write(image_bytes)
-                    
-                    # If we don't have a caption from streaming, generate one
-                    if not caption:
-                        caption = image_rag.generate_image_caption(temp_image_path)
-                    
-                    # Extract embedding
-                    embedding = image_rag.extract_image_embedding(temp_image_path)
-                    
-                    # Prepare image document for image index
-                    image = Image.open(temp_image_path)
-                    image_doc = {
+                # Prepare image document for image index
+                image_docs.append({
+                    "_id": f"{user_id}_{filename}",
+                    "_source": {
                         "image_vector": embedding.tolist(),
-                        "image_path": temp_image_path,
+                        "image_path": filename,
                         "filename": filename,
                         "caption": caption,
                         "metadata": {
-                            "width": image.width,
-                            "height": image.height,
-                            "format": image.format,
-                            "size_bytes": os.path.getsize(temp_image_path),
-                        },
-                        "timestamp": datetime.now().isoformat(),
-                        "user_id": user_id
-                    }
-                    
-                    # Index in OpenSearch image index
-                    doc_id = f"{user_id}_{filename}"
-                    es_client = get_os_connection()
-                    response = es_client.index(
-                        index=image_index_name,
-                        body=image_doc,
-                        id=doc_id,
-                        refresh=True
-                    )
-                    
-                    # Also index the caption in the regular document index
-                    try:
-                        # Create a document-like entry for the image
-                        doc_entry = [{
-                            "filename": filename,
-                            "text": f"Image description: {caption}"
-                        }]
-                        
-                        from opensearch_utils import ingest_code_to_os
-                        ingest_code_to_os(
-                            docs=doc_entry,
-                            model_name=EMBEDDING_MODEL,
-                            index_name=document_index_name
-                        )
-                    except Exception as e:
-                        logger.warning(f"Failed to index image description in document index: {e}")
-                    
-                    # Create MongoDB document for the image
-                    document = {
-                        "doc_name": filename,
-                        "doc_content": caption,
-                        "doc_summary": caption,
-                        "uploaded_at": datetime.now().isoformat(),
-                        "Rouge_Score": {"rouge1": 0, "rouge2": 0, "rougeL": 0},
-                        "is_image": True,
-                        "image_metadata": {
                             "width": image_data.get("width", 0),
                             "height": image_data.get("height", 0),
                             "format": image_data.get("format", "unknown"),
-                            "content_type": image_data.get("content_type", "image/unknown"),
-                            "size_bytes": image_data.get("size_bytes", 0)
+                            "size_bytes": image_data.get("size_bytes", 0),
                         },
-                        "caption": caption
+                        "timestamp": datetime.now().isoformat(),
+                        "user_id": user_id
                     }
-                    
-                    # Check for existing document
-                    existing = collection.find_one({"doc_name": filename})
-                    if existing:
-                        logger.info(f"Skipping duplicate image '{filename}' for user '{user_id}'")
-                    else:
-                        # Insert into MongoDB
-                        result = collection.insert_one(document)
-                        logger.debug(f"Added image '{filename}' to MongoDB with ID: {result.inserted_id}")
-                        results["successful"] += 1
-                    
-                    # Clean up temp file
-                    try:
-                        os.remove(temp_image_path)
-                    except:
-                        pass
-                    
-                else:
-                    error_msg = f"No image content for '{filename}'"
-                    logger.error(error_msg)
-                    results["failed"] += 1
-                    results["errors"].append({
-                        "filename": filename,
-                        "error": error_msg
-                    })
-                    
+                })
+                
+                # Document-like entry so the caption is retrievable with text documents
+                caption_docs.append({
+                    "filename": filename,
+                    "text": f"Image description: {caption}",
+                    "chunk_id_prefix": f"{user_id}_{filename}_caption"
+                })
+                
+                # MongoDB document for the image
+                mongo_docs[f"{user_id}_{filename}"] = {
+                    "doc_name": filename,
+                    "doc_content": caption,
+                    "doc_summary": caption,
+                    "uploaded_at": datetime.now().isoformat(),
+                    "Rouge_Score": {"rouge1": 0, "rouge2": 0, "rougeL": 0},
+                    "is_image": True,
+                    "image_metadata": {
+                        "width": image_data.get("width", 0),
+                        "height": image_data.get("height", 0),
+                        "format": image_data.get("format", "unknown"),
+                        "content_type": image_data.get("content_type", "image/unknown"),
+                        "size_bytes": image_data.get("size_bytes", 0)
+                    },
+                    "caption": caption
+                }
             except Exception as e:
                 error_msg = f"Error processing image '{filename}': {str(e)}"
                 logger.error(error_msg)
@@ -485,8 +758,69 @@ def _ingest_images_sync(images_data: List[Dict], user_id: str) -> Dict[str, Any]
                     "filename": filename,
                     "error": error_msg
                 })
+                progress(filename, "failed", 0.0)
+        
+        if not image_docs:
+            logger.info(f"Completed image ingestion: {results['successful']} successful, {results['failed']} failed")
+            return results
+        
+        # Index every image document in one bulk stream
+        bulk_report = BulkIndexer(get_os_connection()).index_documents(image_index_name, image_docs)
+        for error in bulk_report["errors"]:
+            mongo_docs.pop(error["id"], None)
+            filename = error["id"][len(user_id) + 1:]
+            results["failed"] += 1
+            results["errors"].append({
+                "filename": filename,
+                "error": f"Image index write failed: {error['error']}"
+            })
+            retryable.append(filename)
+            progress(filename, "failed", 0.0)
+        
+        # Also index the captions in the regular document index
+        try:
+            ingest_code_to_os(
+                docs=caption_docs,
+                model_name=EMBEDDING_MODEL,
+                index_name=document_index_name
+            )
+        except Exception as e:
+            logger.warning(f"Failed to index image descriptions in document index: {e}")
+        
+        # Insert the images not stored yet, in one bulk write
+        writes = {}
+        for document in mongo_docs.values():
+            progress(document["doc_name"], "storing", 0.5)
+            writes[document["doc_name"]] = UpdateOne(
+                {"doc_name": document["doc_name"]}, {"$setOnInsert": document}, upsert=True
+            )
+        try:
+            write_results = bulk_write_documents(collection, writes)
+        except Exception as e:
+            write_results = {filename: {"status": "failed", "error": str(e)} for filename in writes}
+        
+        for filename, result in write_results.items():
+            if result["status"] == "failed":
+                error_msg = f"Error storing image '{filename}': {result['error']}"
+                logger.error(error_msg)
+                results["failed"] += 1
+                results["errors"].append({
+                    "filename": filename,
+                    "error": error_msg
+                })
+                retryable.append(filename)
+                progress(filename, "failed", 0.0)
+            elif result["status"] == "upserted":
+                logger.debug(f"Added image '{filename}' to MongoDB with ID: {result['_id']}")
+                results["successful"] += 1
+                progress(filename, "done", 1.0)
+            else:
+                logger.info(f"Skipping duplicate image '{filename}' for user '{user_id}'")
+                progress(filename, "skipped", 1.0)
         
         logger.info(f"Completed image ingestion: {results['successful']} successful, {results['failed']} failed")
+        if retryable:
+            raise IngestError(f"{len(retryable)} images failed to store: {results['errors']}")
         return results
         
     except Exception as e:
@@ -496,6 +830,78 @@ def _ingest_images_sync(images_data: List[Dict], user_id: str) -> Dict[str, Any]
         raise
 
 
+def get_document_text(
+    user_id: str,
+    doc_name: str,
+    start_char: Optional[int] = None,
+    end_char: Optional[int] = None
+) -> Optional[str]:
+    """
+    Fetch the full text of a stored document, or a slice of it.
+    
+    Chunks in OpenSearch only carry `doc_name` and their character offsets;
+    this is the way back to the surrounding text when a caller needs it.
+    
+    Args:
+        user_id: User identifier
+        doc_name: Document name, as stored in chunk metadata
+        start_char: Optional start offset of the slice
+        end_char: Optional end offset of the slice
+        
+    Returns:
+        Optional[str]: Document text (or slice), or None if the document is not found
+    """
+    collection = mongo_db_connection()[f"user_{user_id}".lower()]
+    doc = collection.find_one({"doc_name": doc_name}, {"doc_content": 1, "duplicate_of": 1})
+    if doc is not None and doc.get("duplicate_of"):
+        # Duplicate records hold no content of their own
+        doc = collection.find_one({"doc_name": doc["duplicate_of"]}, {"doc_content": 1})
+    if doc is None:
+        logger.warning(f"Document '{doc_name}' not found for user '{user_id}'")
+        return None
+    
+    text = doc.get("doc_content", "")
+    if start_char is not None or end_char is not None:
+        return text[start_char:end_char]
+    return text
+
+
+def find_documents_by_fingerprint(user_id: str, fingerprints: List[str]) -> Dict[str, Dict]:
+    """
+    Look up a user's stored documents by content fingerprint.
+    
+    Args:
+        user_id: User identifier
+        fingerprints: `content_fingerprint` values of uploaded documents
+        
+    Returns:
+        Dict: Fingerprint -> stored document (name, summary, upload time) for the ones found
+    """
+    if not fingerprints:
+        return {}
+    
+    mongo_db = mongo_db_connection()
+    collection_name = f"user_{user_id}".lower()
+    if collection_name not in mongo_db.list_collection_names():
+        return {}
+    
+    found = {}
+    cursor = mongo_db[collection_name].find(
+        {
+            "content_hash": {"$in": list(fingerprints)},
+            "indexed": {"$ne": False},
+            # Duplicate records point at the document holding the content
+            "duplicate_of": {"$exists": False},
+            # Documents whose summary failed, or is still being stored, are summarized again
+            "doc_summary": {"$nin": ["", None]}
+        },
+        {"doc_name": 1, "doc_summary": 1, "uploaded_at": 1, "content_hash": 1}
+    )
+    for doc in cursor:
+        found.setdefault(doc["content_hash"], convert_mongo_doc(doc))
+    return found
+
+
 async def delete_from_mongodb(user_id: str, filename: str) -> bool:
     """
     Delete a single document from MongoDB.
@@ -542,8 +948,14 @@ __all__ = [
     "convert_mongo_doc",
     "check_user_exist",
     "get_or_create_user_collection",
-    "ingest_documents_with_summaries_in_background",
+    "ensure_collection_indexes",
+    "bulk_write_documents",
+    "IngestError",
     "ingest_documents_to_mongodb_and_opensearch",
-    "ingest_images_to_mongodb_and_opensearch",  # NEW
+    "store_document_summaries",
+    "store_duplicate_documents",
+    "ingest_images_to_mongodb_and_opensearch",
+    "get_document_text",
+    "find_documents_by_fingerprint",
     "delete_from_mongodb",
 ]
\ No newline at end of file
@@ -10,20 +10,36 @@ This module provides functionality for:
 
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional, Any, Union, Tuple
+from io import BytesIO
+from typing import Callable, Dict, List, Optional, Any, Sequence, Union, Tuple
 from PIL import Image
 import torch
 import numpy as np
 import os
+import threading
+import time
+import uuid
 
-from langchain.embeddings import HuggingFaceEmbeddings
 from langchain.schema import Document
 from langchain.vectorstores import OpenSearchVectorSearch
-from opensearchpy import OpenSearch
+from opensearchpy import OpenSearch, helpers
 from tqdm import tqdm
 
-from config import OS_HOST, EMBEDDING_MODEL
-from utils import chunk_code
+from bulk_indexer import BulkIndexer
+from config import (
+    OS_HOST,
+    EMBEDDING_MODEL,
+    IMAGE_EMBED_BATCH_SIZE,
+    CAPTION_BATCH_SIZE,
+    INGEST_BATCH_CHUNKS,
+    CHUNK_PAGE_ALIGNED
+)
+from cache_utils import CaptionCache, sha256_bytes, query_cache_key, query_embedding_cache
+from chunking import get_chunker
+from embedding_batcher import MicroBatcher
+from embedding_store import chunk_hash, get_embedding_store
+from model_registry import embedding_model_id, get_embedding_model, get_query_embedder
+from utils import prefetch
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -85,8 +101,8 @@ def create_os_vectorstore(
         logger.info(f"Dropped old index '{index_name}'")
         index_exists = False
     
-    # Initialize embedding model
-    embedder = HuggingFaceEmbeddings(model_name=model_name)
+    # Get shared embedding model
+    embedder = get_embedding_model(model_name)
     
     # Create vector store
     vectorstore = OpenSearchVectorSearch(
@@ -104,6 +120,64 @@ def create_os_vectorstore(
     return vectorstore
 
 
+def ensure_chunk_index(
+    index_name: str,
+    dim: int,
+    es_client: Optional[OpenSearch] = None
+) -> None:
+    """
+    Create a chunk index with the k-NN mapping LangChain's vector store expects.
+    
+    Bulk ingestion bypasses the vector store, so the index has to exist
+    before the first bulk request. Existing indices are left untouched.
+    
+    Args:
+        index_name: Name of the OpenSearch index
+        dim: Embedding dimension
+        es_client: Optional existing OpenSearch client
+    """
+    if es_client is None:
+        es_client = get_os_connection()
+    
+    if es_client.indices.exists(index=index_name):
+        return
+    
+    index_body = {
+        "settings": {
+            "index": {
+                "knn": True,
+                "knn.algo_param.ef_search": 512
+            }
+        },
+        "mappings": {
+            "properties": {
+                "embedding": {
+                    "type": "knn_vector",
+                    "dimension": dim,
+                    "method": {
+                        "name": "hnsw",
+                        "space_type": "cosinesimil",
+                        "engine": "nmslib",
+                        "parameters": {
+                            "ef_construction": 512,
+                            "m": 16
+                        }
+                    }
+                }
+            }
+        }
+    }
+    
+    try:
+        es_client.indices.create(index=index_name, body=index_body)
+        logger.info(f"Created chunk index '{index_name}' (dim={dim})")
+    except Exception as e:
+        # Another ingest may have created it first
+        if not es_client.indices.exists(index=index_name):
+            logger.error(f"Failed to create index '{index_name}': {e}")
+            raise
+
+
 def get_retriever_os(
     collection_name: str,
     model_name: str = EMBEDDING_MODEL,
@@ -148,77 +222,272 @@ def get_retriever_os(
     )
 
 
+# Chunk metadata that follows from the chunk's position in its document
+_POSITION_FIELDS = ("doc_id", "chunk_index", "start_char", "end_char", "token_count", "page_start", "page_end")
+
+
+def _indexed_chunks(es_client: OpenSearch, index_name: str, doc_name: str) -> Dict[str, Dict[str, Any]]:
+    """Return the id and metadata of every chunk of a document in an index."""
+    if not es_client.indices.exists(index=index_name):
+        return {}
+    query = {
+        "query": {"term": {"metadata.doc_name.keyword": doc_name}},
+        "_source": ["metadata"]
+    }
+    return {
+        hit["_id"]: hit["_source"].get("metadata", {})
+        for hit in helpers.scan(es_client, index=index_name, query=query)
+    }
+
+
 def ingest_code_to_os(
     docs: List[Dict[str, str]],
     model_name: str = EMBEDDING_MODEL,
-    index_name: str = "default_index"
-) -> None:
+    index_name: str = "default_index",
+    on_progress: Optional[Callable[[str, int], None]] = None,
+    incremental: bool = False
+) -> Dict[str, Any]:
     """
     Incrementally embed and ingest code snippets into OpenSearch.
     
+    Chunk vectors are looked up in the persistent chunk embedding store by
+    content hash first; only chunks that were never embedded before go
+    through the model. Chunks are embedded and bulk-indexed in batches of
+    INGEST_BATCH_CHUNKS as the chunker produces them.
+    
+    Chunks of a document with an id are stored under ids derived from their
+    content. With `incremental`, the new chunks are diffed against the ones
+    already indexed for the document: only new chunks are embedded and
+    indexed, chunks that moved get their position metadata updated, and
+    chunks that are gone are deleted.
+    
     Args:
         docs: List of dictionaries with keys:
             - "filename": str, file name or unique document identifier
             - "text": str, raw source code content
+            - "pages": optional iterable of (page_number, page_text); used instead
+              of "text" so chunks record their pages
+            - "doc_id": str, optional MongoDB id of the full document; chunks of a
+              document with an id get stable ids, so re-ingesting it overwrites them
+            - "chunk_id_prefix": str, optional stable chunk id prefix used instead of "doc_id"
         model_name: Hugging Face model for embedding
         index_name: OpenSearch index name
+        on_progress: Called with (filename, characters indexed) after every bulk batch
+        incremental: Diff against the document's indexed chunks (documents with an id only)
+        
+    Returns:
+        Dict: Ingestion report with chunk count, embedding store lookups and
+            hits (chunks kept by the diff are not looked up), chunks reused,
+            updated and deleted by the diff, and bulk indexing failures
     """
+    report = {
+        "chunks": 0, "embedding_store_lookups": 0, "embedding_cache_hits": 0, "embedded": 0, "hit_ratio": None,
+        "reused": 0, "updated": 0, "deleted": 0, "failed": 0, "errors": []
+    }
+    
     if not docs:
         logger.warning("No documents provided for ingestion")
-        return
+        return report
     
     logger.info(f"Starting ingestion of {len(docs)} documents into index '{index_name}'")
     
-    # Initialize embedding model
-    embedder = HuggingFaceEmbeddings(model_name=model_name)
+    # Get shared embedding model and its tokenizer-aware chunker
+    embedder = get_embedding_model(model_name)
+    chunker = get_chunker(model_name)
+    model_id = embedding_model_id(model_name)
     
-    # Create vector store
-    vectorstore = OpenSearchVectorSearch(
-        index_name=index_name,
-        embedding_function=embedder,
-        opensearch_url=OS_HOST,
-        vector_field="embedding",
-        space_type="cosinesimil",
-    )
+    es_client = get_os_connection()
+    indexer = BulkIndexer(es_client)
+    index_ready = False
+    # (text, metadata, chunk id or None)
+    pending: List[Tuple[str, Dict[str, Any], Optional[str]]] = []
+    # Metadata updates of chunks kept by the diff
+    updates: List[Dict[str, Any]] = []
     
-    all_chunks = []
-    all_metadata = []
+    def record(bulk_report: Dict[str, Any]) -> None:
+        report["failed"] += bulk_report["failed"]
+        report["errors"].extend(bulk_report["errors"])
     
-    # Process documents
-    for item in tqdm(docs, desc="Processing documents"):
-        doc_name = item.get("filename", "unknown")
-        doc_content = item.get("text", "")
+    def flush() -> None:
+        """Embed and bulk-index the pending batch of chunks."""
+        nonlocal index_ready
+        if not pending:
+            return
         
-        if not doc_content:
-            logger.warning(f"Empty content for document '{doc_name}', skipping")
-            continue
+        # Reuse stored vectors and embed only unseen chunks
+        hashes = [metadata["chunk_hash"] for _, metadata, _ in pending]
+        vectors, embedded, store_hits = embed_chunks_with_store(
+            [text for text, _, _ in pending], hashes, embedder, model_id
+        )
+        report["embedded"] += embedded
+        report["embedding_store_lookups"] += len(hashes)
+        report["embedding_cache_hits"] += store_hits
         
-        # Chunk the content
-        chunks = chunk_code(doc_content)
+        if not index_ready:
+            ensure_chunk_index(index_name, len(vectors[hashes[0]]), es_client)
+            index_ready = True
         
-        # Create metadata for each chunk
-        for chunk in chunks:
-            all_chunks.append(chunk)
-            all_metadata.append({
-                "doc_name": doc_name,
-                "doc_content": doc_content,
-                "timestamp": datetime.now().isoformat(),
-                "chunk_index": len(all_chunks) - 1,
-                "total_chunks": len(chunks)
-            })
+        # Vector store document layout; the single refresh happens after the last batch
+        documents = [
+            {
+                "_id": chunk_id or str(uuid.uuid4()),
+                "_source": {"embedding": vectors[h], "text": text, "metadata": metadata}
+            }
+            for (text, metadata, chunk_id), h in zip(pending, hashes)
+        ]
+        record(indexer.index_documents(index_name, documents, suspend_refresh=False, refresh=False))
         
-        logger.debug(f"Document '{doc_name}' split into {len(chunks)} chunks")
+        if on_progress is not None:
+            last = pending[-1][1]
+            on_progress(last["doc_name"], last["end_char"])
+        pending.clear()
+    
+    def flush_updates() -> None:
+        if updates:
+            record(indexer.update_documents(index_name, updates, refresh=False))
+            report["updated"] += len(updates)
+            updates.clear()
     
-    # Ingest all chunks
-    if all_chunks:
+    # Process documents
+    try:
+        for item in tqdm(docs, desc="Processing documents"):
+            doc_name = item.get("filename", "unknown")
+            pages = item.get("pages")
+            
+            if pages is None:
+                doc_content = item.get("text", "")
+                if not doc_content:
+                    logger.warning(f"Empty content for document '{doc_name}', skipping")
+                    continue
+                pages = [(None, doc_content)]
+            
+            id_prefix = item.get("chunk_id_prefix") or item.get("doc_id")
+            indexed = _indexed_chunks(es_client, index_name, doc_name) if incremental and id_prefix else {}
+            # Repeats of a chunk within the document, for unique ids
+            occurrences: Dict[str, int] = {}
+            
+            # Chunk on a background thread while this one embeds and indexes,
+            # so memory holds at most a couple of batches of a large document
+            doc_chunks = 0
+            chunks = chunker.iter_page_chunks(pages, align_pages=CHUNK_PAGE_ALIGNED)
+            for chunk in prefetch(chunks, INGEST_BATCH_CHUNKS):
+                # Chunks reference the full text in MongoDB instead of carrying a copy of it
+                metadata = {
+                    "doc_name": doc_name,
+                    "doc_id": item.get("doc_id"),
+                    "timestamp": datetime.now().isoformat(),
+                    "chunk_index": doc_chunks,
+                    "start_char": chunk["start_char"],
+                    "end_char": chunk["end_char"],
+                    "token_count": chunk["tokens"],
+                    "chunk_hash": chunk_hash(chunk["text"])
+                }
+                if chunk["page_start"] is not None:
+                    metadata["page_start"] = chunk["page_start"]
+                    metadata["page_end"] = chunk["page_end"]
+                doc_chunks += 1
+                
+                chunk_id = None
+                if id_prefix:
+                    # Same content, same id: an unchanged chunk keeps its id across versions
+                    h = metadata["chunk_hash"]
+                    repeat = occurrences.get(h, 0)
+                    occurrences[h] = repeat + 1
+                    chunk_id = f"{id_prefix}_{h[:32]}" + (f"_{repeat}" if repeat else "")
+                
+                previous = indexed.pop(chunk_id, None) if chunk_id else None
+                if previous is not None:
+                    report["reused"] += 1
+                    moved = {k: metadata.get(k) for k in _POSITION_FIELDS if previous.get(k) != metadata.get(k)}
+                    if moved:
+                        updates.append({"_id": chunk_id, "doc": {"metadata": moved}})
+                        if len(updates) >= INGEST_BATCH_CHUNKS:
+                            flush_updates()
+                    continue
+                
+                pending.append((chunk["text"], metadata, chunk_id))
+                if len(pending) >= INGEST_BATCH_CHUNKS:
+                    flush()
+            
+            # Chunks of the old version that are gone
+            if indexed:
+                flush_updates()
+                delete_report = indexer.delete_ids(index_name, list(indexed), refresh=False)
+                record(delete_report)
+                report["deleted"] += delete_report["succeeded"]
+            
+            report["chunks"] += doc_chunks
+            logger.debug(f"Document '{doc_name}' split into {doc_chunks} chunks")
+        
+        flush()
+        flush_updates()
+    except Exception as e:
+        logger.error(f"Failed to ingest chunks: {e}")
+        raise
+    
+    if not report["chunks"]:
+        logger.warning("No chunks generated for ingestion")
+        return report
+    
+    es_client.indices.refresh(index=index_name)
+    
+    lookups = report["embedding_store_lookups"]
+    if lookups:
+        report["hit_ratio"] = round(report["embedding_cache_hits"] / lookups, 4)
+    logger.info(
+        f"Ingested {report['chunks'] - report['failed']}/{report['chunks']} chunks into index '{index_name}' "
+        f"({report['embedding_cache_hits']}/{lookups} vectors from the embedding store; "
+        f"{report['reused']} chunks kept, {report['updated']} moved, {report['deleted']} deleted)"
+    )
+    return report
+
+
+def embed_chunks_with_store(
+    chunks: List[str],
+    hashes: List[str],
+    embedder: Any,
+    model_id: str
+) -> Tuple[Dict[str, List[float]], int]:
+    """
+    Embed chunks, reusing vectors from the persistent chunk embedding store.
+    
+    Args:
+        chunks: Chunk texts
+        hashes: Content hash of each chunk
+        embedder: Embedding model with an `embed_documents` method
+        model_id: Identifier the vectors are stored under
+        
+    Returns:
+        Tuple[Dict[str, List[float]], int, int]: Vector per chunk hash, the number of
+            chunks that had to be embedded, and the number found in the store
+    """
+    store = get_embedding_store()
+    vectors: Dict[str, Any] = {}
+    
+    if store is not None:
         try:
-            vectorstore.add_texts(texts=all_chunks, metadatas=all_metadata)
-            logger.info(f"Ingested {len(all_chunks)} chunks into index '{index_name}'")
+            vectors.update(store.get_many(model_id, hashes))
         except Exception as e:
-            logger.error(f"Failed to ingest chunks: {e}")
-            raise
-    else:
-        logger.warning("No chunks generated for ingestion")
+            logger.warning(f"Embedding store lookup failed, embedding everything: {e}")
+    
+    # Embed each distinct unseen chunk once
+    missing = {}
+    for chunk, h in zip(chunks, hashes):
+        if h not in vectors:
+            missing.setdefault(h, chunk)
+    
+    if missing:
+        new_vectors = embedder.embed_documents(list(missing.values()))
+        vectors.update(zip(missing.keys(), new_vectors))
+        
+        if store is not None:
+            try:
+                store.put_many(model_id, list(missing.keys()), new_vectors)
+            except Exception as e:
+                logger.warning(f"Failed to save vectors to embedding store: {e}")
+    
+    embedded = sum(1 for h in hashes if h in missing)
+    return {h: list(map(float, v)) for h, v in vectors.items()}, embedded, len(hashes) - embedded
 
 
 async def delete_from_opensearch(user_id: str, filename: str) -> bool:
@@ -243,7 +512,7 @@ async def delete_from_opensearch(user_id: str, filename: str) -> bool:
             logger.warning(f"Index '{index_name}' does not exist in OpenSearch")
             return False
         
-        # Search for the document by filename
+        # Collect the ids of every chunk of the document
         search_query = {
             "query": {
                 "term": {
@@ -252,37 +521,18 @@ async def delete_from_opensearch(user_id: str, filename: str) -> bool:
             },
             "_source": False  # We only need the document IDs
         }
-        
-        # Search for matching documents
-        search_response = client.search(
-            index=index_name,
-            body=search_query,
-            size=100  # Limit results to avoid huge responses
-        )
-        
-        deleted_count = 0
-        total_hits = search_response['hits']['total']['value']
+        chunk_ids = [hit["_id"] for hit in helpers.scan(client, index=index_name, query=search_query)]
+        total_hits = len(chunk_ids)
         
         if total_hits == 0:
             logger.info(f"Document '{filename}' not found in OpenSearch index '{index_name}'")
             return False
         
-        # Delete each matching document
-        for hit in search_response['hits']['hits']:
-            doc_id = hit['_id']
-            try:
-                delete_response = client.delete(
-                    index=index_name,
-                    id=doc_id,
-                    refresh=True  # Make deletion immediately visible
-                )
-                
-                if delete_response['result'] == 'deleted':
-                    deleted_count += 1
-                    logger.debug(f"Deleted chunk (ID: {doc_id}) for document '{filename}'")
-                    
-            except Exception as e:
-                logger.error(f"Error deleting chunk {doc_id}: {e}")
+        # Delete them in one bulk request, refreshed once at the end
+        bulk_report = BulkIndexer(client).delete_ids(index_name, chunk_ids)
+        deleted_count = bulk_report["succeeded"]
+        for error in bulk_report["errors"]:
+            logger.error(f"Error deleting chunk {error['id']}: {error['error']}")
         
         logger.info(
             f"Deleted {deleted_count}/{total_hits} chunks for document "
@@ -376,8 +626,8 @@ def retrieve_with_smart_fallback(
                 logger.info(f"Filtered to {len(existing_docs)} existing documents")
             document_names = existing_docs
     
-    # Initialize vector store and retriever
-    embedder = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    # Initialize vector store and retriever; repeated queries skip model inference
+    embedder = get_query_embedder(EMBEDDING_MODEL)
     
     vectorstore = OpenSearchVectorSearch(
         index_name=collection_name,
@@ -502,6 +752,10 @@ def ingest_image_description_to_os(
 class ImageRAG:
     """
     Image Retrieval-Augmented Generation using OpenSearch and Granite Vision 3.3-2b, CLIP/BLIP models.
+
+    Models are loaded lazily and independently: the CLIP text tower is only
+    loaded for text queries, the CLIP vision tower for image embeddings and the
+    captioner for caption generation. Index and delete operations load no model.
     """
 
     def __init__(
@@ -509,70 +763,162 @@ class ImageRAG:
         clip_model_name: str = "openai/clip-vit-base-patch32",
         caption_model_name: str = "Salesforce/blip-image-captioning-base",
         granite_model_name: str = "ibm-granite/granite-vision-3.3-2b",
-        device: Optional[str] = None
+        device: Optional[str] = None,
+        caption_cache: Optional[CaptionCache] = None
     ):
         """
-        Initialize Image RAG with CLIP for embeddings.
-        Tries Granite Vision for captioning, falls back to BLIP.
+        Configure Image RAG without loading any model.
+        Captioning tries Granite Vision first and falls back to BLIP.
         """
-        import torch
-        from transformers import (
-            CLIPProcessor, CLIPModel
-        )
-
+        self.clip_model_name = clip_model_name
+        self.caption_model_name = caption_model_name
+        self.granite_model_name = granite_model_name
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
 
-        # Load CLIP for embeddings (always works)
-        logger.info(f"Loading CLIP model: {clip_model_name}")
-        self.clip_model = CLIPModel.from_pretrained(clip_model_name).to(self.device)
-        self.clip_processor = CLIPProcessor.from_pretrained(clip_model_name)
-
-        # Try to load Granite Vision first
-        self.caption_model = None
-        self.caption_processor = None
-        granite_loaded = False
-
-        try:
-            logger.info("Attempting to load Granite Vision model...")
-
-            # Try with trust_remote_code for Granite
-            from transformers import AutoModelForCausalLM, AutoProcessor
-
-            self.caption_model = AutoModelForCausalLM.from_pretrained(
-                granite_model_name,
-                trust_remote_code=True,
-                torch_dtype=torch.float16 if self.device == "cuda" else torch.float32
-            ).to(self.device)
-
-            self.caption_processor = AutoProcessor.from_pretrained(
-                granite_model_name,
-                trust_remote_code=True
-            )
-
-            granite_loaded = True
-            logger.info("Successfully loaded Granite Vision model")
+        self._clip_tokenizer = None
+        self._clip_text_model = None
+        self._clip_image_processor = None
+        self._clip_vision_model = None
+        self._caption_model = None
+        self._caption_processor = None
+        self._caption_model_id: Optional[str] = None
+        self._embedding_dim = None
+        self.caption_cache = caption_cache or CaptionCache()
+
+        # One lock per component so loading the captioner never blocks text search
+        self._text_lock = threading.Lock()
+        self._vision_lock = threading.Lock()
+        self._caption_lock = threading.Lock()
+        # Held while the shared caption tokenizer is switched to left padding
+        self._padding_lock = threading.Lock()
+        self._load_times: Dict[str, float] = {}
+
+        # Concurrent text queries share CLIP text forward passes
+        self._clip_text_batcher = MicroBatcher(
+            f"clip_text:{clip_model_name}", self._encode_clip_texts
+        )
 
-        except Exception:
-            # Silently fall back to BLIP (original model)
-            logger.info("Granite Vision not available, using BLIP model")
+    @property
+    def embedding_dim(self) -> int:
+        """CLIP projection dimension, read from the model config without loading weights."""
+        if self._embedding_dim is None:
+            from transformers import CLIPConfig
+
+            config = CLIPConfig.from_pretrained(self.clip_model_name)
+            self._embedding_dim = config.projection_dim
+            logger.info(f"Image embedding dimension: {self._embedding_dim}")
+        return self._embedding_dim
+
+    def _ensure_clip_text(self) -> None:
+        """Load the CLIP text tower and tokenizer on first use."""
+        if self._clip_text_model is not None:
+            return
+        with self._text_lock:
+            if self._clip_text_model is not None:
+                return
+            from transformers import CLIPTextModelWithProjection, CLIPTokenizerFast
+
+            logger.info(f"Loading CLIP text tower: {self.clip_model_name}")
+            start = time.time()
+            self._clip_tokenizer = CLIPTokenizerFast.from_pretrained(self.clip_model_name)
+            model = CLIPTextModelWithProjection.from_pretrained(self.clip_model_name).to(self.device)
+            model.eval()
+            self._clip_text_model = model
+            self._load_times["clip_text"] = round(time.time() - start, 3)
+
+    def _ensure_clip_vision(self) -> None:
+        """Load the CLIP vision tower and image processor on first use."""
+        if self._clip_vision_model is not None:
+            return
+        with self._vision_lock:
+            if self._clip_vision_model is not None:
+                return
+            from transformers import CLIPImageProcessor, CLIPVisionModelWithProjection
+
+            logger.info(f"Loading CLIP vision tower: {self.clip_model_name}")
+            start = time.time()
+            self._clip_image_processor = CLIPImageProcessor.from_pretrained(self.clip_model_name)
+            model = CLIPVisionModelWithProjection.from_pretrained(self.clip_model_name).to(self.device)
+            model.eval()
+            self._clip_vision_model = model
+            self._load_times["clip_vision"] = round(time.time() - start, 3)
+
+    def _ensure_captioner(self) -> None:
+        """Load Granite Vision, or BLIP if Granite is unavailable, on first use."""
+        if self._caption_model is not None:
+            return
+        with self._caption_lock:
+            if self._caption_model is not None:
+                return
+            start = time.time()
+            granite_loaded = False
 
-        # If Granite failed, load BLIP (the original model)
-        if not granite_loaded:
             try:
-                from transformers import BlipProcessor, BlipForConditionalGeneration
+                logger.info("Attempting to load Granite Vision model...")
 
-                self.caption_processor = BlipProcessor.from_pretrained(caption_model_name)
-                self.caption_model = BlipForConditionalGeneration.from_pretrained(
-                    caption_model_name
+                # Try with trust_remote_code for Granite
+                from transformers import AutoModelForCausalLM, AutoProcessor
+
+                caption_model = AutoModelForCausalLM.from_pretrained(
+                    self.granite_model_name,
+                    trust_remote_code=True,
+                    torch_dtype=torch.float16 if self.device == "cuda" else torch.float32
                 ).to(self.device)
 
-            except Exception as e:
-                logger.error(f"Failed to load BLIP model: {e}")
-                raise
+                caption_processor = AutoProcessor.from_pretrained(
+                    self.granite_model_name,
+                    trust_remote_code=True
+                )
 
-        # Get embedding dimension from CLIP model
-        self.embedding_dim = self.clip_model.config.projection_dim
-        logger.info(f"Image embedding dimension: {self.embedding_dim}")
+                granite_loaded = True
+                logger.info("Successfully loaded Granite Vision model")
+
+            except Exception:
+                # Silently fall back to BLIP (original model)
+                logger.info("Granite Vision not available, using BLIP model")
+
+            # If Granite failed, load BLIP (the original model)
+            if not granite_loaded:
+                try:
+                    from transformers import BlipProcessor, BlipForConditionalGeneration
+
+                    caption_processor = BlipProcessor.from_pretrained(self.caption_model_name)
+                    caption_model = BlipForConditionalGeneration.from_pretrained(
+                        self.caption_model_name
+                    ).to(self.device)
+
+                except Exception as e:
+                    logger.error(f"Failed to load BLIP model: {e}")
+                    raise
+
+            self._caption_processor = caption_processor
+            self._caption_model = caption_model
+            self._caption_model_id = self.granite_model_name if granite_loaded else self.caption_model_name
+            self._load_times["captioner"] = round(time.time() - start, 3)
+
+    @property
+    def caption_model(self) -> Any:
+        """Captioning model (Granite Vision or BLIP), loaded on first access."""
+        self._ensure_captioner()
+        return self._caption_model
+
+    @property
+    def caption_processor(self) -> Any:
+        """Processor matching `caption_model`, loaded on first access."""
+        self._ensure_captioner()
+        return self._caption_processor
+
+    def loaded_components(self) -> Dict[str, Any]:
+        """
+        Report which model components are loaded and how long each took to load.
+
+        Returns:
+            Dict: Component name mapped to its load time in seconds (None if not loaded)
+        """
+        return {
+            component: self._load_times.get(component)
+            for component in ("clip_text", "clip_vision", "captioner")
+        }
 
     def extract_image_embedding(self, image_path: str) -> np.ndarray:
         """
@@ -586,18 +932,60 @@ class ImageRAG:
         """
         try:
             image = Image.open(image_path).convert("RGB")
-            inputs = self.clip_processor(images=image, return_tensors="pt").to(self.device)
+            return self.extract_image_embeddings([image])[0]
 
+        except Exception as e:
+            logger.error(f"Error extracting embedding from {image_path}: {e}")
+            raise
+
+    def extract_image_embeddings(
+        self,
+        images: Sequence[Union[Image.Image, bytes]],
+        batch_size: int = IMAGE_EMBED_BATCH_SIZE
+    ) -> np.ndarray:
+        """
+        Extract CLIP embeddings for many in-memory images.
+
+        All images are preprocessed in a single processor call, then run
+        through the vision tower in micro-batches of `batch_size`.
+
+        Args:
+            images: Decoded PIL images or raw encoded image bytes
+            batch_size: Maximum number of images per forward pass
+
+        Returns:
+            np.ndarray: C-contiguous float32 matrix of shape (len(images), embedding_dim)
+                with L2-normalized rows, in input order
+        """
+        if len(images) == 0:
+            return np.empty((0, self.embedding_dim), dtype=np.float32)
+
+        try:
+            self._ensure_clip_vision()
+            rgb_images = [
+                Image.open(BytesIO(img)).convert("RGB") if isinstance(img, (bytes, bytearray))
+                else img.convert("RGB")
+                for img in images
+            ]
+            pixel_values = self._clip_image_processor(
+                images=rgb_images, return_tensors="pt"
+            )["pixel_values"]
+
+            batch_size = max(1, batch_size)
+            embeddings = np.empty((len(rgb_images), self.embedding_dim), dtype=np.float32)
             with torch.no_grad():
-                image_features = self.clip_model.get_image_features(**inputs)
+                for start in range(0, len(rgb_images), batch_size):
+                    batch = pixel_values[start:start + batch_size].to(self.device)
+                    image_features = self._clip_vision_model(pixel_values=batch).image_embeds
+                    embeddings[start:start + batch.shape[0]] = image_features.float().cpu().numpy()
 
-            # Normalize the embedding
-            embedding = image_features.cpu().numpy().flatten()
-            embedding = embedding / np.linalg.norm(embedding)
-            return embedding
+            # Normalize each row in place
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.maximum(norms, 1e-12)
+            return embeddings
 
         except Exception as e:
-            logger.error(f"Error extracting embedding from {image_path}: {e}")
+            logger.error(f"Error extracting embeddings for {len(images)} images: {e}")
             raise
 
     def extract_text_embedding(self, text: str) -> np.ndarray:
@@ -610,21 +998,44 @@ class ImageRAG:
         Returns:
             np.ndarray: Text embedding vector
         """
-        try:
-            inputs = self.clip_processor(text=[text], return_tensors="pt", padding=True).to(self.device)
+        key = query_cache_key(f"clip:{self.clip_model_name}", text)
+        cached = query_embedding_cache.get(key)
+        if cached is not None:
+            return cached.copy()
 
-            with torch.no_grad():
-                text_features = self.clip_model.get_text_features(**inputs)
-
-            # Normalize the embedding
-            embedding = text_features.cpu().numpy().flatten()
-            embedding = embedding / np.linalg.norm(embedding)
+        try:
+            # Cache misses are batched with concurrent queries
+            embedding = self._clip_text_batcher.encode(text)
+            query_embedding_cache.put(key, embedding.copy())
             return embedding
 
         except Exception as e:
             logger.error(f"Error extracting text embedding: {e}")
             raise
 
+    def _encode_clip_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode a batch of texts with the CLIP text tower.
+
+        Args:
+            texts: Input texts
+
+        Returns:
+            np.ndarray: One L2-normalized row per text, in input order
+        """
+        self._ensure_clip_text()
+        inputs = self._clip_tokenizer(
+            texts, return_tensors="pt", padding=True, truncation=True
+        ).to(self.device)
+
+        with torch.no_grad():
+            text_features = self._clip_text_model(**inputs).text_embeds
+
+        # Normalize the embeddings
+        embeddings = text_features.float().cpu().numpy()
+        embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings
+
     def generate_image_caption(self, image_path: str) -> str:
         """
         Generate descriptive caption for an image.
@@ -638,21 +1049,23 @@ class ImageRAG:
         """
         try:
             image = Image.open(image_path).convert("RGB")
+            caption_model = self.caption_model
+            caption_processor = self.caption_processor
 
             # Check if we're using Granite Vision (has trust_remote_code attribute)
-            if hasattr(self.caption_model.config, 'model_type') and 'granite' in self.caption_model.config.model_type.lower():
+            if hasattr(caption_model.config, 'model_type') and 'granite' in caption_model.config.model_type.lower():
                 # Granite Vision processing
                 prompt = "<image>\nDescribe this image in detail:"
-                inputs = self.caption_processor(
+                inputs = caption_processor(
                     text=prompt,
                     images=image,
                     return_tensors="pt"
                 ).to(self.device)
 
                 with torch.no_grad():
-                    out = self.caption_model.generate(**inputs, max_new_tokens=100)
+                    out = caption_model.generate(**inputs, max_new_tokens=100)
 
-                caption = self.caption_processor.decode(out[0], skip_special_tokens=True)
+                caption = caption_processor.decode(out[0], skip_special_tokens=True)
 
                 # Clean up the prompt from the response
                 if prompt in caption:
@@ -660,12 +1073,12 @@ class ImageRAG:
 
             else:
                 # BLIP processing (original code)
-                inputs = self.caption_processor(image, return_tensors="pt").to(self.device)
+                inputs = caption_processor(image, return_tensors="pt").to(self.device)
 
                 with torch.no_grad():
-                    out = self.caption_model.generate(**inputs, max_length=50)
+                    out = caption_model.generate(**inputs, max_length=50)
 
-                caption = self.caption_processor.decode(out[0], skip_special_tokens=True)
+                caption = caption_processor.decode(out[0], skip_special_tokens=True)
 
             return caption
 
@@ -673,6 +1086,137 @@ class ImageRAG:
             logger.error(f"Error generating caption for {image_path}: {e}")
             return ""
 
+    def _captioner_candidates(self) -> List[str]:
+        """Captioner model ids a cached caption may be stored under, in order of preference."""
+        if self._caption_model_id is not None:
+            return [self._caption_model_id]
+        # Not loaded yet: Granite is preferred and BLIP is the fallback
+        return [self.granite_model_name, self.caption_model_name]
+
+    def generate_image_captions(
+        self,
+        images: Sequence[Union[Image.Image, bytes]],
+        batch_size: int = CAPTION_BATCH_SIZE,
+        content_hashes: Optional[Sequence[Optional[str]]] = None
+    ) -> List[Dict[str, Optional[str]]]:
+        """
+        Generate captions for many images with batched `generate` calls.
+
+        Images whose content hash is in the caption cache are answered from it
+        without running (or loading) the captioner. The rest are padded into
+        batches of at most `batch_size`. If a batch fails, its images are
+        retried one by one so that a single bad image only fails its own entry.
+
+        Args:
+            images: Decoded PIL images or raw encoded image bytes
+            batch_size: Maximum number of images per `generate` call
+            content_hashes: Optional SHA-256 of each image's original bytes; computed
+                automatically for raw bytes inputs
+
+        Returns:
+            List[Dict]: One {"caption": str, "error": Optional[str]} entry per image, in input order
+        """
+        results: List[Dict[str, Optional[str]]] = [
+            {"caption": "", "error": None} for _ in images
+        ]
+
+        hashes: List[Optional[str]] = list(content_hashes) if content_hashes else [None] * len(images)
+        for i, img in enumerate(images):
+            if hashes[i] is None and isinstance(img, (bytes, bytearray)):
+                hashes[i] = sha256_bytes(img)
+
+        # Decode first so undecodable inputs fail individually
+        decoded: List[Tuple[int, Image.Image]] = []
+        for i, img in enumerate(images):
+            if hashes[i] is not None:
+                cached = self.caption_cache.get(hashes[i], self._captioner_candidates())
+                if cached is not None:
+                    results[i]["caption"] = cached
+                    continue
+            try:
+                if isinstance(img, (bytes, bytearray)):
+                    img = Image.open(BytesIO(img))
+                decoded.append((i, img.convert("RGB")))
+            except Exception as e:
+                results[i]["error"] = f"Could not decode image: {e}"
+
+        batch_size = max(1, batch_size)
+        for start in range(0, len(decoded), batch_size):
+            batch = decoded[start:start + batch_size]
+            try:
+                captions = self._caption_batch([image for _, image in batch])
+                for (i, _), caption in zip(batch, captions):
+                    results[i]["caption"] = caption
+            except Exception as e:
+                if len(batch) == 1:
+                    logger.error(f"Error generating caption for image {batch[0][0]}: {e}")
+                    results[batch[0][0]]["error"] = str(e)
+                    continue
+
+                logger.warning(f"Batched captioning failed ({e}), retrying {len(batch)} images individually")
+                for i, image in batch:
+                    try:
+                        results[i]["caption"] = self._caption_batch([image])[0]
+                    except Exception as single_error:
+                        logger.error(f"Error generating caption for image {i}: {single_error}")
+                        results[i]["error"] = str(single_error)
+
+        # Remember new captions so re-uploads of the same image are free
+        for i, _ in decoded:
+            if hashes[i] is not None and results[i]["caption"] and not results[i]["error"]:
+                self.caption_cache.put(hashes[i], self._caption_model_id, results[i]["caption"])
+
+        return results
+
+    def _caption_batch(self, images: List[Image.Image]) -> List[str]:
+        """
+        Caption a list of RGB images with a single padded `generate` call.
+
+        Args:
+            images: Decoded RGB images
+
+        Returns:
+            List[str]: Captions in input order
+        """
+        caption_model = self.caption_model
+        caption_processor = self.caption_processor
+
+        if hasattr(caption_model.config, 'model_type') and 'granite' in caption_model.config.model_type.lower():
+            # Decoder-only generation needs left padding so every prompt ends at the same position;
+            # the shared processor's own setting is restored for other callers
+            prompt = "<image>\nDescribe this image in detail:"
+            tokenizer = caption_processor.tokenizer
+            with self._padding_lock:
+                padding_side = tokenizer.padding_side
+                tokenizer.padding_side = "left"
+                try:
+                    inputs = caption_processor(
+                        text=[prompt] * len(images),
+                        images=images,
+                        padding=True,
+                        return_tensors="pt"
+                    )
+                finally:
+                    tokenizer.padding_side = padding_side
+            inputs = inputs.to(self.device)
+
+            with torch.no_grad():
+                out = caption_model.generate(**inputs, max_new_tokens=100)
+
+            # Keep only the newly generated tokens
+            new_tokens = out[:, inputs["input_ids"].shape[1]:]
+            captions = caption_processor.batch_decode(new_tokens, skip_special_tokens=True)
+
+        else:
+            inputs = caption_processor(images=images, return_tensors="pt").to(self.device)
+
+            with torch.no_grad():
+                out = caption_model.generate(**inputs, max_length=50)
+
+            captions = caption_processor.batch_decode(out, skip_special_tokens=True)
+
+        return [caption.strip() for caption in captions]
+
     def create_image_index(
         self,
         index_name: str,
@@ -967,23 +1511,15 @@ class ImageRAG:
                         }
                     }
 
-                # Search and delete
-                search_response = es_client.search(
-                    index=index_name,
-                    body=query,
-                    size=100
-                )
+                # Search and delete in one bulk request
+                query["_source"] = False
+                hit_ids = [hit["_id"] for hit in helpers.scan(es_client, index=index_name, query=query)]
 
                 deleted = False
-                for hit in search_response["hits"]["hits"]:
-                    delete_response = es_client.delete(
-                        index=index_name,
-                        id=hit["_id"],
-                        refresh=True
-                    )
-                    if delete_response.get("result") == "deleted":
-                        deleted = True
-                        logger.debug(f"Deleted image document: {hit['_id']}")
+                if hit_ids:
+                    bulk_report = BulkIndexer(es_client).delete_ids(index_name, hit_ids)
+                    deleted = bulk_report["succeeded"] > 0
+                    logger.debug(f"Deleted image documents: {hit_ids}")
             
             else:
                 logger.error("Either doc_id or image_path must be provided")
@@ -1001,15 +1537,37 @@ class ImageRAG:
             return False
 
 
+_image_rag: Optional[ImageRAG] = None
+_image_rag_lock = threading.Lock()
+
+
+def get_image_rag() -> ImageRAG:
+    """
+    Return the process-wide ImageRAG service shared by endpoints and background tasks.
+
+    Returns:
+        ImageRAG: Shared instance; its models load lazily on first use
+    """
+    global _image_rag
+    if _image_rag is None:
+        with _image_rag_lock:
+            if _image_rag is None:
+                _image_rag = ImageRAG()
+    return _image_rag
+
+
 # Export public API - added ImageRAG and answer_question_about_image
 __all__ = [
     "get_os_connection",
     "create_os_vectorstore",
     "get_retriever_os",
     "ingest_code_to_os",
+    "embed_chunks_with_store",
+    "ensure_chunk_index",
     "ingest_image_description_to_os",
     "delete_from_opensearch",
     "retrieve_with_smart_fallback",
     "ImageRAG",
+    "get_image_rag",
     "answer_question_about_image",
 ]
\ No newline at end of file
@@ -0,0 +1,217 @@
+"""
+Pluggable PDF text extraction backends.
+
+This module provides functionality for:
+- A registry of PDF backends (PyMuPDF, pypdf, pdfminer.six, pdfplumber, PyPDF2)
+- Picking the fastest installed backend, in PDF_EXTRACTOR_ORDER
+- Falling back to the next backend when one fails on a file
+- Extracting page ranges, so large documents can be split across processes
+"""
+
+import importlib.util
+import io
+import logging
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import PDF_EXTRACTOR_ORDER
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# name -> {"module": import name used to detect it, "count": fn(data) -> pages,
+#          "extract": fn(data, first, last) -> [(page_number, text)]}
+_BACKENDS: Dict[str, Dict[str, Callable]] = {}
+
+
+def register_pdf_backend(name: str, module: str, count: Callable, extract: Callable) -> None:
+    """
+    Register a PDF backend.
+
+    Args:
+        name: Backend name used in PDF_EXTRACTOR_ORDER
+        module: Import name whose presence makes the backend available
+        count: Returns the number of pages of a PDF given as bytes
+        extract: Returns [(page_number, text)] for 1-based pages first..last (inclusive)
+    """
+    _BACKENDS[name] = {"module": module, "count": count, "extract": extract}
+
+
+def available_pdf_backends(order: Sequence[str] = PDF_EXTRACTOR_ORDER) -> List[str]:
+    """Return the registered, installed backends in order of preference."""
+    names = [name for name in order if name in _BACKENDS]
+    return [name for name in names if importlib.util.find_spec(_BACKENDS[name]["module"]) is not None]
+
+
+# ----------------------------
+# BACKENDS
+# ----------------------------
+
+def _open_pymupdf(data: bytes):
+    try:
+        import pymupdf
+    except ImportError:
+        # Releases before 1.24 only ship the legacy module name
+        import fitz as pymupdf
+    return pymupdf.open(stream=data, filetype="pdf")
+
+
+def _pymupdf_count(data: bytes) -> int:
+    with _open_pymupdf(data) as doc:
+        return doc.page_count
+
+
+def _pymupdf_extract(data: bytes, first: int, last: int) -> List[Tuple[int, str]]:
+    with _open_pymupdf(data) as doc:
+        return [(number, doc[number - 1].get_text()) for number in range(first, last + 1)]
+
+
+def _pypdf_count(data: bytes) -> int:
+    from pypdf import PdfReader
+
+    return len(PdfReader(io.BytesIO(data)).pages)
+
+
+def _pypdf_extract(data: bytes, first: int, last: int) -> List[Tuple[int, str]]:
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(data))
+    return [(number, reader.pages[number - 1].extract_text() or "") for number in range(first, last + 1)]
+
+
+def _pdfminer_count(data: bytes) -> int:
+    from pdfminer.pdfpage import PDFPage
+
+    return sum(1 for _ in PDFPage.get_pages(io.BytesIO(data)))
+
+
+def _pdfminer_extract(data: bytes, first: int, last: int) -> List[Tuple[int, str]]:
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+
+    pages = []
+    layouts = extract_pages(io.BytesIO(data), page_numbers=range(first - 1, last))
+    for number, layout in zip(range(first, last + 1), layouts):
+        text = "".join(element.get_text() for element in layout if isinstance(element, LTTextContainer))
+        pages.append((number, text))
+    return pages
+
+
+def _pdfplumber_count(data: bytes) -> int:
+    import pdfplumber
+
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        return len(pdf.pages)
+
+
+def _pdfplumber_extract(data: bytes, first: int, last: int) -> List[Tuple[int, str]]:
+    import pdfplumber
+
+    with pdfplumber.open(io.BytesIO(data), pages=list(range(first, last + 1))) as pdf:
+        return [(page.page_number, page.extract_text() or "") for page in pdf.pages]
+
+
+def _pypdf2_count(data: bytes) -> int:
+    from PyPDF2 import PdfReader
+
+    return len(PdfReader(io.BytesIO(data)).pages)
+
+
+def _pypdf2_extract(data: bytes, first: int, last: int) -> List[Tuple[int, str]]:
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(io.BytesIO(data))
+    return [(number, reader.pages[number - 1].extract_text() or "") for number in range(first, last + 1)]
+
+
+register_pdf_backend("pymupdf", "fitz", _pymupdf_count, _pymupdf_extract)
+register_pdf_backend("pypdf", "pypdf", _pypdf_count, _pypdf_extract)
+register_pdf_backend("pdfminer", "pdfminer", _pdfminer_count, _pdfminer_extract)
+register_pdf_backend("pdfplumber", "pdfplumber", _pdfplumber_count, _pdfplumber_extract)
+# Pure Python and always installed; works on s390x without C extensions
+register_pdf_backend("pypdf2", "PyPDF2", _pypdf2_count, _pypdf2_extract)
+
+
+# ----------------------------
+# EXTRACTION WITH FALLBACK
+# ----------------------------
+
+def _candidates(preferred: Optional[str]) -> List[str]:
+    names = available_pdf_backends()
+    if preferred in names:
+        names.remove(preferred)
+        names.insert(0, preferred)
+    if not names:
+        raise RuntimeError("No PDF extraction backend is installed")
+    return names
+
+
+def count_pdf_pages(data: bytes, preferred: Optional[str] = None) -> Tuple[int, str]:
+    """
+    Count the pages of a PDF with the first backend that can open it.
+
+    Args:
+        data: PDF bytes
+        preferred: Backend to try first
+
+    Returns:
+        Tuple[int, str]: Page count and the backend that read it
+    """
+    errors = []
+    for name in _candidates(preferred):
+        try:
+            return _BACKENDS[name]["count"](data), name
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+            logger.warning(f"PDF backend '{name}' could not open the file, trying the next one: {e}")
+    raise RuntimeError(f"No PDF backend could open the file ({'; '.join(errors)})")
+
+
+def extract_pdf_page_range(
+    data: bytes,
+    first: int,
+    last: int,
+    preferred: Optional[str] = None
+) -> Tuple[List[Tuple[int, str]], str]:
+    """
+    Extract the text of pages first..last (1-based, inclusive), falling back across backends.
+
+    Args:
+        data: PDF bytes
+        first: First page number
+        last: Last page number
+        preferred: Backend to try first
+
+    Returns:
+        Tuple: [(page_number, text)] and the backend that produced it
+    """
+    errors = []
+    for name in _candidates(preferred):
+        try:
+            return _BACKENDS[name]["extract"](data, first, last), name
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+            logger.warning(f"PDF backend '{name}' failed on pages {first}-{last}, trying the next one: {e}")
+    raise RuntimeError(f"No PDF backend could extract pages {first}-{last} ({'; '.join(errors)})")
+
+
+def extract_pdf_pages(data: bytes, preferred: Optional[str] = None) -> Tuple[List[Tuple[int, str]], str]:
+    """
+    Extract every page of a PDF with the fastest backend that can read it.
+
+    Returns:
+        Tuple: [(page_number, text)] and the backend that produced it
+    """
+    page_count, backend = count_pdf_pages(data, preferred)
+    if page_count == 0:
+        return [], backend
+    return extract_pdf_page_range(data, 1, page_count, backend)
+
+
+# Export public API
+__all__ = [
+    "register_pdf_backend",
+    "available_pdf_backends",
+    "count_pdf_pages",
+    "extract_pdf_page_range",
+    "extract_pdf_pages",
+]
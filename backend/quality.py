@@ -0,0 +1,155 @@
+"""
+Summary quality stage: ROUGE scores of stored summaries.
+
+This module provides functionality for:
+- Scoring summaries in worker processes, off the ingestion path, once they
+  are stored (ROUGE_MODE "background")
+- Scoring on demand when a document's scores are requested and missing
+- Writing scores only to the document version and summary they were computed for
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from config import ROUGE_MODE, ROUGE_WORKERS
+from mongo_utils import mongo_db_connection
+from rouge import score_in_worker
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Stored when there is no summary to score
+_ZERO_SCORES = {"rouge1": 0, "rouge2": 0, "rougeL": 0}
+
+
+class QualityStage:
+    """
+    Process-pool backed ROUGE scoring of stored summaries.
+
+    Documents store `Rouge_Score: None` until scored. Scoring reads the
+    document's content and summary, scores them in the pool, and writes the
+    scores back only if neither changed meanwhile.
+    """
+
+    def __init__(self, workers: int = ROUGE_WORKERS, mode: str = ROUGE_MODE) -> None:
+        """
+        Args:
+            workers: Worker processes in the pool
+            mode: "background" or "on_demand"
+        """
+        self.workers = max(1, workers)
+        self.mode = mode
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # Spawned workers don't inherit model threads or open connections
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _submit(self, collection: Any, document: Dict[str, Any]) -> Future:
+        """Score a document in the pool; its scores are stored when done."""
+        content = document.get("doc_content", "")
+        summary = document.get("doc_summary", "")
+
+        if not content or not summary:
+            future: Future = Future()
+            future.set_result(dict(_ZERO_SCORES))
+        else:
+            # The worker function lives in rouge.py, so workers don't import this module's ML stack
+            future = self._get_pool().submit(score_in_worker, content, summary)
+
+        def store(done: Future) -> None:
+            try:
+                scores = done.result()
+                collection.update_one(
+                    {
+                        "_id": document["_id"],
+                        "content_hash": document.get("content_hash"),
+                        "doc_summary": summary
+                    },
+                    {"$set": {"Rouge_Score": scores}}
+                )
+            except Exception as e:
+                logger.error(f"Could not score the summary of '{document.get('doc_name')}': {e}")
+
+        future.add_done_callback(store)
+        return future
+
+    def schedule(self, user_id: str, doc_names: List[str]) -> None:
+        """
+        Score the stored summaries of documents in the background.
+
+        Does nothing in "on_demand" mode; never raises, scores are informational.
+
+        Args:
+            user_id: User identifier
+            doc_names: Documents whose summary was just stored
+        """
+        if self.mode != "background" or not doc_names:
+            return
+        try:
+            collection = mongo_db_connection()[f"user_{user_id}".lower()]
+            documents = collection.find(
+                {"doc_name": {"$in": list(doc_names)}},
+                {"doc_name": 1, "doc_content": 1, "doc_summary": 1, "content_hash": 1}
+            )
+            for document in documents:
+                self._submit(collection, document)
+        except Exception as e:
+            logger.error(f"Could not schedule summary scoring for user {user_id}: {e}")
+
+    async def get_scores(self, user_id: str, doc_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Return a document's ROUGE scores, computing them if they are missing.
+
+        Args:
+            user_id: User identifier
+            doc_name: Document name
+
+        Returns:
+            Dict: Scores per ROUGE type as [precision, recall, fmeasure], or
+                None if the document does not exist
+        """
+        collection = mongo_db_connection()[f"user_{user_id}".lower()]
+        document = await asyncio.to_thread(
+            collection.find_one,
+            {"doc_name": doc_name},
+            {"doc_name": 1, "doc_content": 1, "doc_summary": 1, "content_hash": 1, "Rouge_Score": 1, "duplicate_of": 1}
+        )
+        if document is None:
+            return None
+        if document.get("duplicate_of"):
+            # Same content and summary as the document it points at
+            return await self.get_scores(user_id, document["duplicate_of"])
+        if document.get("Rouge_Score") is not None:
+            return document["Rouge_Score"]
+        return await asyncio.wrap_future(self._submit(collection, document))
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Shared stage used by ingestion jobs and the scores endpoint
+quality_stage = QualityStage()
+
+
+# Export public API
+__all__ = [
+    "QualityStage",
+    "quality_stage",
+]
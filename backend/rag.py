@@ -276,6 +276,74 @@ def build_summarize_prompt(doc):
     return prompt
 
 
+def build_section_summary_prompt(section: str, index: int, total: int) -> str:
+    """
+    Build a prompt summarizing one section of a long document (map step).
+    
+    Args:
+        section: Section text
+        index: 1-based position of the section in the document
+        total: Number of sections
+    
+    Returns:
+        str: Formatted prompt string
+    """
+    system_instruction = (
+        "You are a smart document analyzer.\n"
+        f"Summarize part {index} of {total} of a longer document.\n"
+        "Keep the key facts, names, figures and conclusions of this part.\n"
+        "Do not add information that is not present in the text.\n"
+        "Write the summary in the language of the text."
+    )
+
+    prompt = f"""{system_instruction}
+
+Text:
+{section}
+
+Summary:"""
+
+    return prompt.strip()
+
+
+def build_reduce_summary_prompt(summaries: List[str], final: bool = True) -> str:
+    """
+    Build a prompt combining summaries of consecutive sections (reduce step).
+    
+    Args:
+        summaries: Section summaries, in document order
+        final: Whether this produces the summary of the whole document, rather
+               than an intermediate summary of some of its sections
+    
+    Returns:
+        str: Formatted prompt string
+    """
+    if not summaries:
+        raise ValueError("No summaries to combine")
+
+    if final:
+        task = "Combine them into one clear and concise summary of the whole document."
+    else:
+        task = "Combine them into one summary of these parts, keeping their key facts, names and figures."
+
+    system_instruction = (
+        "You are a smart document analyzer.\n"
+        "Below are summaries of consecutive parts of one document, in order.\n"
+        f"{task}\n"
+        "Do not add information that is not present in the summaries.\n"
+        "Write the summary in the language of the summaries."
+    )
+
+    parts = "\n\n".join(f"Part {i}:\n{summary}" for i, summary in enumerate(summaries, 1))
+    prompt = f"""{system_instruction}
+
+{parts}
+
+Summary:"""
+
+    return prompt.strip()
+
+
 def build_image_only_prompt(question: str, image_context: str) -> str:
     """
     Build a prompt specifically for image-only queries.
@@ -396,6 +464,8 @@ def format_chunks_for_display(chunks: List[Document]) -> str:
 __all__ = [
     "build_rag_prompt",
     "build_summarize_prompt",
+    "build_section_summary_prompt",
+    "build_reduce_summary_prompt",
     "build_image_only_prompt",
     "format_chunks_for_display",
 ]
\ No newline at end of file
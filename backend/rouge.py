@@ -0,0 +1,217 @@
+"""
+Fast ROUGE scores of summaries against their documents.
+
+This module provides functionality for:
+- Tokenizing like `rouge_score` (lowercase alphanumeric runs, Porter stems
+  of words longer than three characters), with stems cached per word and
+  token ids and n-gram counts cached per document
+- ROUGE-N overlap counted with numpy over integer-encoded n-grams
+- ROUGE-L from a bit-parallel longest common subsequence
+
+Scores match `rouge_score.rouge_scorer.RougeScorer(..., use_stemmer=True)`;
+see benchmarks/bench_rouge.py.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from nltk.stem import porter
+
+from config import ROUGE_TOKEN_CACHE_DOCS
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Same fields as rouge_score's Score, so stored scores keep their shape
+Score = namedtuple("Score", ["precision", "recall", "fmeasure"])
+
+DEFAULT_ROUGE_TYPES = ("rouge1", "rouge2", "rougeL")
+
+_NON_ALPHANUM = re.compile(r"[^a-z0-9]+")
+_VALID_TOKEN = re.compile(r"^[a-z0-9]+$")
+_STEMMER = porter.PorterStemmer()
+
+# Token ids shared by every cached document; reset with the cache when it grows too large
+_MAX_VOCABULARY = 2_000_000
+# Token ids stay below this, so a bigram packs into one int64
+_ID_BASE = 2 ** 31
+_vocabulary: Dict[str, int] = {}
+_documents: "OrderedDict[str, Dict]" = OrderedDict()
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=200_000)
+def _stem(word: str) -> Optional[str]:
+    """Stem a word as `rouge_score` does; None for tokens it drops."""
+    token = _STEMMER.stem(word) if len(word) > 3 else word
+    return token if _VALID_TOKEN.match(token) else None
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into the (stemmed) tokens `rouge_score` scores."""
+    tokens = (_stem(word) for word in _NON_ALPHANUM.sub(" ", text.lower()).split())
+    return [token for token in tokens if token]
+
+
+def _encode(text: str) -> Dict:
+    """Token ids of a text, with a cache for its n-gram counts."""
+    tokens = tokenize(text)
+    with _lock:
+        ids = np.fromiter(
+            (_vocabulary.setdefault(token, len(_vocabulary)) for token in tokens),
+            dtype=np.int64,
+            count=len(tokens)
+        )
+    return {"ids": ids, "ngrams": {}}
+
+
+def _document(text: str) -> Dict:
+    """Encoded document from the LRU cache, keyed by content hash."""
+    key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    with _lock:
+        entry = _documents.get(key)
+        if entry is not None:
+            _documents.move_to_end(key)
+            return entry
+        if len(_vocabulary) > _MAX_VOCABULARY:
+            # Cached ids refer to the vocabulary; drop both together
+            _vocabulary.clear()
+            _documents.clear()
+
+    entry = _encode(text)
+    with _lock:
+        _documents[key] = entry
+        while len(_documents) > ROUGE_TOKEN_CACHE_DOCS:
+            _documents.popitem(last=False)
+    return entry
+
+
+def _ngram_counts(entry: Dict, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct n-grams of an encoded text (as sortable keys) and their counts."""
+    counts = entry["ngrams"].get(n)
+    if counts is not None:
+        return counts
+
+    ids = entry["ids"]
+    if len(ids) < n:
+        # Same key dtype as the other text's n-grams, so they can be intersected
+        keys = np.empty(0, dtype=np.int64 if n <= 2 else f"V{8 * n}")
+        counts = (keys, np.empty(0, dtype=np.int64))
+    else:
+        windows = np.lib.stride_tricks.sliding_window_view(ids, n)
+        if n <= 2:
+            # One integer per n-gram; cached keys must not depend on the vocabulary size
+            keys = windows @ (_ID_BASE ** np.arange(n - 1, -1, -1, dtype=np.int64))
+            counts = np.unique(keys, return_counts=True)
+        else:
+            rows, row_counts = np.unique(windows, axis=0, return_counts=True)
+            keys = np.frombuffer(np.ascontiguousarray(rows).tobytes(), dtype=f"V{8 * n}")
+            counts = (keys, row_counts)
+    entry["ngrams"][n] = counts
+    return counts
+
+
+def _fmeasure(precision: float, recall: float) -> float:
+    return 2 * precision * recall / (precision + recall) if precision + recall > 0 else 0.0
+
+
+def _rouge_n(target: Dict, prediction: Dict, n: int) -> Score:
+    target_keys, target_counts = _ngram_counts(target, n)
+    prediction_keys, prediction_counts = _ngram_counts(prediction, n)
+    _, ti, pi = np.intersect1d(target_keys, prediction_keys, assume_unique=True, return_indices=True)
+    overlap = int(np.minimum(target_counts[ti], prediction_counts[pi]).sum())
+
+    precision = overlap / max(int(prediction_counts.sum()), 1)
+    recall = overlap / max(int(target_counts.sum()), 1)
+    return Score(precision, recall, _fmeasure(precision, recall))
+
+
+def lcs_length(a: Sequence[int], b: Sequence[int]) -> int:
+    """
+    Length of the longest common subsequence of two id sequences.
+
+    Bit-parallel (Hyyro): the shorter sequence is a bit vector, updated with
+    a few integer operations per element of the longer one.
+    """
+    a, b = (a, b) if len(a) <= len(b) else (b, a)
+    if not len(a):
+        return 0
+
+    masks: Dict[int, int] = {}
+    for position, token in enumerate(a.tolist() if isinstance(a, np.ndarray) else a):
+        masks[token] = masks.get(token, 0) | (1 << position)
+
+    full = (1 << len(a)) - 1
+    v = full
+    # Elements of b absent from a leave the vector unchanged
+    b = np.asarray(b)
+    for token in b[np.isin(b, np.fromiter(masks, dtype=np.int64))].tolist():
+        u = v & masks[token]
+        v = ((v + u) | (v - u)) & full
+    return len(a) - bin(v).count("1")
+
+
+def _rouge_l(target: Dict, prediction: Dict) -> Score:
+    target_ids, prediction_ids = target["ids"], prediction["ids"]
+    if not len(target_ids) or not len(prediction_ids):
+        return Score(0, 0, 0)
+    lcs = lcs_length(target_ids, prediction_ids)
+    precision = lcs / len(prediction_ids)
+    recall = lcs / len(target_ids)
+    return Score(precision, recall, _fmeasure(precision, recall))
+
+
+def score(
+    target: str,
+    prediction: str,
+    rouge_types: Sequence[str] = DEFAULT_ROUGE_TYPES
+) -> Dict[str, Score]:
+    """
+    ROUGE scores of a prediction (summary) against a target (document).
+
+    Args:
+        target: Reference text; its tokenization is cached
+        prediction: Text being scored
+        rouge_types: "rougeN" for any N, and "rougeL"
+
+    Returns:
+        Dict: Score (precision, recall, fmeasure) per ROUGE type
+    """
+    target_entry = _document(target)
+    prediction_entry = _encode(prediction)
+
+    scores = {}
+    for rouge_type in rouge_types:
+        if rouge_type == "rougeL":
+            scores[rouge_type] = _rouge_l(target_entry, prediction_entry)
+        elif re.fullmatch(r"rouge[1-9]", rouge_type):
+            scores[rouge_type] = _rouge_n(target_entry, prediction_entry, int(rouge_type[5:]))
+        else:
+            raise ValueError(f"Unsupported ROUGE type '{rouge_type}'")
+    return scores
+
+
+def score_in_worker(target: str, prediction: str) -> Dict[str, Tuple[float, float, float]]:
+    """
+    `score` with the default ROUGE types, as plain tuples, for process pools.
+
+    Defined here so worker processes only import numpy and nltk.
+    """
+    return {name: tuple(values) for name, values in score(target, prediction).items()}
+
+
+# Export public API
+__all__ = [
+    "Score",
+    "DEFAULT_ROUGE_TYPES",
+    "tokenize",
+    "lcs_length",
+    "score",
+    "score_in_worker",
+]
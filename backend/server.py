@@ -15,8 +15,8 @@ import os
 import re
 import time
 import urllib.parse
+from contextlib import asynccontextmanager
 from typing import AsyncGenerator, Dict, List, Optional, Any
-import base64
 from io import BytesIO
 
 from fastapi import FastAPI, File, Form, HTTPException, UploadFile
@@ -28,18 +28,26 @@ from PIL import Image
 from mongo_utils import (
     check_user_exist,
     delete_from_mongodb,
-    ingest_documents_with_summaries_in_background,
-    ingest_images_to_mongodb_and_opensearch
+    find_documents_by_fingerprint,
+    store_duplicate_documents
 )
 from opensearch_utils import (
     delete_from_opensearch, 
     retrieve_with_smart_fallback,
     get_os_connection,
-    ImageRAG
+    get_image_rag
 )
-from rag import build_rag_prompt, build_summarize_prompt
+from cache_utils import content_fingerprint, sha256_bytes, query_embedding_cache
+from config import EMBEDDING_MODEL, EMBEDDING_DEVICE, SUMMARY_MAX_CONCURRENT
+from embedding_batcher import batcher_stats
+from embedding_store import get_embedding_store
+from extraction import ExtractionTimeout, extraction_stage
+from ingest_jobs import QueueFull, ingest_queue
+from model_registry import embedding_registry
+from quality import quality_stage
+from rag import build_rag_prompt
 from rhaiis_utils import call_rhaiis_model_streaming
-from utils import extract_text_from_doc, extract_text_from_pdf
+from summarization import stream_document_summary
 
 # Configure logging
 import logging
@@ -92,49 +100,35 @@ def is_image_file(filename: str) -> bool:
     return any(filename.lower().endswith(ext) for ext in image_extensions)
 
 
-def validate_image_file(file: UploadFile) -> bool:
-    """Validate that the uploaded file is a valid image."""
-    try:
-        # Check file extension
-        if not is_image_file(file.filename):
-            return False
-        
-        # Try to open and verify the image
-        contents = file.file.read()
-        file.file.seek(0)  # Reset file pointer
-        image = Image.open(BytesIO(contents))
-        image.verify()  # Verify it's a valid image
-        return True
-    except Exception:
-        return False
-
-
 def process_image_file(file: UploadFile) -> Dict:
     """
-    Process an image file and return metadata and base64 encoded content.
+    Read, validate and decode an uploaded image exactly once.
+
+    The decoded RGB buffer is shared in memory by captioning, CLIP embedding
+    and metadata extraction, so no temp files or base64 round-trips are needed.
     """
     try:
         contents = file.file.read()
         file.file.seek(0)  # Reset for potential future reads
-        
-        # Get image info
+
+        # Decode fully; this fails on truncated or invalid images
         image = Image.open(BytesIO(contents))
-        
-        # Convert to base64 for storage
-        buffered = BytesIO()
+        image.load()
         image_format = image.format or 'JPEG'
-        image.save(buffered, format=image_format)
-        img_str = base64.b64encode(buffered.getvalue()).decode('utf-8')
-        
+        width, height = image.width, image.height
+        rgb_image = image if image.mode == "RGB" else image.convert("RGB")
+
         return {
             "filename": file.filename,
             "content_type": f"image/{image_format.lower()}",
-            "width": image.width,
-            "height": image.height,
+            "width": width,
+            "height": height,
             "format": image_format,
             "size_bytes": len(contents),
-            "base64_content": img_str,
-            "text": f"Image: {file.filename} - {image.width}x{image.height} {image_format} image"
+            "content_hash": sha256_bytes(contents),
+            "image_bytes": contents,
+            "rgb_image": rgb_image,
+            "text": f"Image: {file.filename} - {width}x{height} {image_format} image"
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error processing image: {str(e)}")
@@ -144,7 +138,23 @@ def process_image_file(file: UploadFile) -> Dict:
 # API SERVER
 # ----------------------------
 
-app = FastAPI(title="Document RAG System API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load and warm up shared models before the first request is served."""
+    try:
+        await asyncio.to_thread(embedding_registry.warm_up, EMBEDDING_MODEL, EMBEDDING_DEVICE)
+    except Exception as e:
+        # Requests will retry the load lazily; don't keep the API from starting
+        logger.error(f"Embedding model warm-up failed: {e}")
+    # Picks up queued jobs, including ones a previous run did not finish
+    ingest_queue.start()
+    yield
+    await ingest_queue.stop()
+    extraction_stage.shutdown()
+    quality_stage.shutdown()
+
+
+app = FastAPI(title="Document RAG System API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -158,14 +168,27 @@ app.add_middleware(
 @app.post("/upload-files")
 async def upload_files(
     files: List[UploadFile] = File(...), 
-    user_id: str = Form(...)
+    user_id: str = Form(...),
+    reingest: bool = Form(False)
 ) -> StreamingResponse:
-    """Process files (documents AND images), stream summarization, then background ingestion."""
+    """
+    Process files (documents AND images), index in the background while summaries stream.
+    
+    With `reingest`, a document uploaded again under its stored name with
+    edited content replaces the stored version; only its changed chunks are
+    embedded and indexed.
+    """
     
     user_id = user_id.lower()
     docs = []
     images = []  # Separate list for images
     
+    # Refuse work the ingestion queue can't take, before anything is summarized
+    try:
+        await asyncio.to_thread(ingest_queue.check_capacity)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    
     # Start overall metrics tracking
     from rhaiis_utils import SimpleMetricsTracker
     overall_metrics = SimpleMetricsTracker.start_tracking(
@@ -175,85 +198,130 @@ async def upload_files(
         file_names=[file.filename for file in files]
     )
 
-    for file in files:
-        # Normalize filename for consistent storage
-        normalized_filename = sanitize_filename_for_storage(file.filename)
+    # PDF/DOCX parses run concurrently in the extraction stage's worker processes
+    extraction_tasks = []
+
+    try:
+        for file in files:
+            # Normalize filename for consistent storage
+            normalized_filename = sanitize_filename_for_storage(file.filename)
         
-        # Check if file is an image
-        if is_image_file(normalized_filename):
-            # Validate image
-            if not validate_image_file(file):
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"File '{normalized_filename}' is not a valid image"
-                )
-            
-            # Process image
-            try:
-                image_data = process_image_file(file)
-                images.append({
-                    "filename": normalized_filename,
-                    "image_data": image_data,
-                    "user_id": user_id
-                })
-                # For image summary, we'll generate caption in background
+            # Check if file is an image
+            if is_image_file(normalized_filename):
+                # Decode and validate image
+                try:
+                    image_data = process_image_file(file)
+                    images.append({
+                        "filename": normalized_filename,
+                        "image_data": image_data,
+                        "user_id": user_id
+                    })
+                    # For image summary, we'll generate caption in background
+                    docs.append({
+                        "filename": normalized_filename,
+                        "text": f"Image file: {normalized_filename}",
+                        "content": f"Image file: {normalized_filename} - To be described by AI",
+                        "is_image": True  # Flag to indicate this is an image
+                    })
+                except Exception as e:
+                    raise HTTPException(
+                        status_code=400, 
+                        detail=f"Error processing image '{normalized_filename}': {str(e)}"
+                    )
+        
+            # Handle documents (existing logic)
+            elif normalized_filename.endswith((".pdf", ".docx")):
+                kind = "pdf" if normalized_filename.endswith(".pdf") else "docx"
+                file_bytes = await file.read()
+                doc = {"filename": normalized_filename, "is_image": False}
+                docs.append(doc)
+                extraction_tasks.append((
+                    doc,
+                    asyncio.create_task(extraction_stage.extract(normalized_filename, kind, file_bytes))
+                ))
+            elif normalized_filename.endswith(".txt"):
+                file_content = file.file.read().decode('utf-8')
                 docs.append({
                     "filename": normalized_filename,
-                    "text": f"Image file: {normalized_filename}",
-                    "content": f"Image file: {normalized_filename} - To be described by AI",
-                    "is_image": True  # Flag to indicate this is an image
+                    "text": str(file_content),
+                    "content": str(file_content),
+                    "is_image": False
                 })
-            except Exception as e:
+            else:
                 raise HTTPException(
                     status_code=400, 
-                    detail=f"Error processing image '{normalized_filename}': {str(e)}"
+                    detail="File not in one of the supported formats (pdf, docx, txt, jpg, png, gif, bmp). Please upload a valid file"
                 )
-        
-        # Handle documents (existing logic)
-        elif normalized_filename.endswith(".pdf"):
-            file_content = extract_text_from_pdf(file.file)
-            docs.append({
-                "filename": normalized_filename,
-                "text": str(file_content),
-                "content": str(file_content),
-                "is_image": False
-            })
-        elif normalized_filename.endswith(".docx"):
-            file_bytes = await file.read()
-            file_content = extract_text_from_doc(file_bytes)
-            docs.append({
-                "filename": normalized_filename,
-                "text": str(file_content),
-                "content": str(file_content),
-                "is_image": False
+    
+    except BaseException:
+        for _, task in extraction_tasks:
+            task.cancel()
+        raise
+
+    # Wait for the parses; text and page offsets (for chunk page numbers) fill in the docs
+    extraction_report = []
+    try:
+        for doc, task in extraction_tasks:
+            filename = doc["filename"]
+            try:
+                extracted = await task
+            except ExtractionTimeout as e:
+                raise HTTPException(status_code=408, detail=str(e))
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Error extracting text from '{filename}': {str(e)}")
+
+            doc.update({
+                "text": extracted["text"],
+                "content": extracted["text"],
+                "page_index": extracted["page_index"],
+                "stage_timings": {
+                    "extract_wait_seconds": extracted["queue_wait_seconds"],
+                    "extract_seconds": extracted["parse_seconds"]
+                }
             })
-        elif normalized_filename.endswith(".txt"):
-            file_content = file.file.read().decode('utf-8')
-            docs.append({
-                "filename": normalized_filename,
-                "text": str(file_content),
-                "content": str(file_content),
-                "is_image": False
+            extraction_report.append({
+                "filename": filename,
+                "backend": extracted["backend"],
+                "page_ranges": extracted["page_ranges"],
+                "queue_wait_seconds": extracted["queue_wait_seconds"],
+                "parse_seconds": extracted["parse_seconds"]
             })
-        else:
-            raise HTTPException(
-                status_code=400, 
-                detail="File not in one of the supported formats (pdf, docx, txt, jpg, png, gif, bmp). Please upload a valid file"
-            )
-    
+            print(f"  Extracted {filename} ({extracted['backend']}): waited {extracted['queue_wait_seconds']:.2f}s, "
+                  f"parsed in {extracted['parse_seconds']:.2f}s")
+    finally:
+        # Don't leave parses running for a request that failed
+        for _, task in extraction_tasks:
+            task.cancel()
+
+    # Exact re-uploads (same extracted text) get their stored summary instead of a new one
+    text_docs = [d for d in docs if not d.get('is_image', False)]
+    if text_docs:
+        fingerprints = await asyncio.to_thread(lambda: [content_fingerprint(d["content"]) for d in text_docs])
+        try:
+            stored = await asyncio.to_thread(find_documents_by_fingerprint, user_id, fingerprints)
+        except Exception as e:
+            logger.error(f"Duplicate lookup failed, summarizing every document: {e}")
+            stored = {}
+        for doc, fingerprint in zip(text_docs, fingerprints):
+            doc["content_hash"] = fingerprint
+            if fingerprint in stored:
+                doc["stored_document"] = stored[fingerprint]
+                print(f"  {doc['filename']}: same content as stored '{stored[fingerprint]['doc_name']}'")
+
     # Update metrics with file type info
     doc_count = len([d for d in docs if not d.get('is_image', False)])
     image_count = len([d for d in docs if d.get('is_image', False)])
     overall_metrics["additional_info"].update({
         "document_count": doc_count,
-        "image_count": image_count
+        "image_count": image_count,
+        "extraction": extraction_report
     })
 
     print(f"\nUPLOAD SUMMARY: {doc_count} documents, {image_count} images for user {user_id}")
 
     # Return streaming response
     return StreamingResponse(
-        stream_and_process_files(docs, images, user_id, overall_metrics),
+        stream_and_process_files(docs, images, user_id, overall_metrics, reingest),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -310,7 +378,7 @@ async def delete_file(
             # If it's an image, also delete from image-specific index
             if is_image_file(normalized_filename):
                 try:
-                    image_rag = ImageRAG()
+                    image_rag = get_image_rag()
                     image_index_name = f"user_{user_id}_images".lower()
                     image_deleted = image_rag.delete_image(
                         index_name=image_index_name,
@@ -452,7 +520,9 @@ async def ask_query(
     try:
         # Search documents (unless searching only images)
         if not search_only_images:
-            retrieved_chunks = retrieve_with_smart_fallback(
+            # Run off the event loop so concurrent queries can share embedding batches
+            retrieved_chunks = await asyncio.to_thread(
+                retrieve_with_smart_fallback,
                 query=query,
                 collection_name=collection_name,
                 document_names=selected_docs,  # Pass document names (not image names)
@@ -476,7 +546,7 @@ async def ask_query(
 
         if should_search_images:
             try:
-                image_rag = ImageRAG()
+                image_rag = get_image_rag()
                 image_index_name = f"user_{user_id}_images".lower()
 
                 # Check if image index exists
@@ -502,7 +572,8 @@ async def ask_query(
                         # If we have a query, also do semantic search for additional context
                         if query and query.strip() and len(image_results) == 0:
                             # Only do semantic search if we didn't find the specific images
-                            semantic_results = image_rag.search_images(
+                            semantic_results = await asyncio.to_thread(
+                                image_rag.search_images,
                                 query=query,
                                 index_name=image_index_name,
                                 k=3,
@@ -512,7 +583,8 @@ async def ask_query(
                     else:
                         # No specific images requested - do normal semantic search
                         if query and query.strip():
-                            image_results = image_rag.search_images(
+                            image_results = await asyncio.to_thread(
+                                image_rag.search_images,
                                 query=query,
                                 index_name=image_index_name,
                                 k=3 if search_only_images else 1,
@@ -637,6 +709,39 @@ async def ask_query(
         )
 
 
+@app.get("/jobs/{job_id}")
+async def get_ingest_job(job_id: str) -> Dict[str, Any]:
+    """Report an ingestion job's status, attempts, and per-file stage and progress."""
+    job = await asyncio.to_thread(ingest_queue.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job '{job_id}' not found")
+    return job
+
+
+@app.get("/rouge-score")
+async def rouge_score(user_id: str, filename: str) -> Dict[str, Any]:
+    """Return a document's ROUGE scores, scoring its summary first if needed."""
+    scores = await quality_stage.get_scores(user_id.lower(), filename)
+    if scores is None:
+        raise HTTPException(status_code=404, detail=f"File '{filename}' not found")
+    return {"filename": filename, "Rouge_Score": scores}
+
+
+@app.get("/models")
+def loaded_models() -> Dict[str, Any]:
+    """Report load time and memory use of the shared models."""
+    return {
+        "embedding_models": embedding_registry.stats(),
+        "image_models": get_image_rag().loaded_components(),
+        "caches": {
+            "captions": get_image_rag().caption_cache.stats(),
+            "query_embeddings": query_embedding_cache.stats(),
+            "chunk_embeddings": get_embedding_store().stats() if get_embedding_store() else None
+        },
+        "embedding_batchers": batcher_stats()
+    }
+
+
 @app.get("/rhaiis/health")
 def rhaiis_health_check() -> JSONResponse:
     """Check health status of RHAIIS endpoint."""
@@ -657,9 +762,10 @@ async def stream_and_process_files(
     docs: List[Dict[str, Any]], 
     images: List[Dict[str, Any]], 
     user_id: str,
-    overall_metrics: Dict[str, Any] = None
+    overall_metrics: Dict[str, Any] = None,
+    reingest: bool = False
 ) -> AsyncGenerator[str, None]:
-    """Stream summaries and collect them for background processing."""
+    """Queue indexing of the documents, then stream their summaries and queue storing them."""
     from rhaiis_utils import SimpleMetricsTracker
 
     all_summaries = []
@@ -673,84 +779,110 @@ async def stream_and_process_files(
     total_summary_chars = 0
 
     try:
-        # First process documents
-        for doc in docs:
-            # Skip images in document processing (they're handled separately)
-            if doc.get("is_image", False):
-                continue
+        text_docs = [doc for doc in docs if not doc.get("is_image", False)]
 
-            file_start_time = time.time()
-            file_metrics = SimpleMetricsTracker.start_tracking(
-                "file_summary",
-                filename=doc['filename'],
-                file_type="document",
-                content_length=len(doc['content'])
-            )
+        # Indexing doesn't need the summaries: queue it right away, so documents
+        # are searchable while their summaries stream. Re-uploads of stored
+        # content are already embedded and indexed.
+        ingest_jobs = []
+        new_docs = [doc for doc in text_docs if doc.get("content") and "stored_document" not in doc]
 
-            # Send document start marker
-            yield f"data: {json.dumps({'event': 'document_start', 'filename': doc['filename']})}\n\n"
-
-            # Send entire raw content
-            yield f"data: {json.dumps({
-                'event': 'raw_content',
-                'filename': doc['filename'],
-                'doc-content': doc['content'],
-                'length': len(doc['content']),
-                'truncated': False
-            })}\n\n"
-
-            prompt = build_summarize_prompt(doc)
-
-            # Call RHAIIS with metrics
-            summary_stream = call_rhaiis_model_streaming(prompt, file_metrics)
-
-            # Collect summary chunks
-            summary_chunks = []
-            file_summary_chars = 0
-
-            # Stream the summary content and collect it
-            async for chunk in summary_stream:
-                if chunk == "[DONE]":
-                    break
-                if chunk.startswith("Error:"):
-                    yield f"data: {json.dumps({'event': 'error', 'message': chunk})}\n\n"
-                    break
-
-                summary_chunks.append(chunk)
-                file_summary_chars += len(chunk)
-                yield f"data: {json.dumps({'event': 'summary_chunk', 'doc-summary': chunk})}\n\n"
-
-            # Combine summary chunks
-            full_summary = ''.join(summary_chunks)
-            total_summary_chars += len(full_summary)
-
-            file_end_time = time.time()
-            file_processing_time = file_end_time - file_start_time
-
-            print(f"  {doc['filename']}: {len(full_summary)} chars, {file_processing_time:.2f}s")
-
-            # Store summary with document
-            doc_with_summary = {
-                "filename": doc["filename"],
-                "text": doc["text"],
-                "content": doc["content"],
-                "summary": full_summary,
-                "summary_clean": clean_summary_text(full_summary),
-                "is_image": False,
-                "processing_time_seconds": file_processing_time,
-                "summary_length": len(full_summary)
-            }
-            all_summaries.append(doc_with_summary)
-
-            processed_files += 1
+        # Stored content under a new name gets a record pointing at the stored document
+        duplicates = [doc for doc in text_docs if doc.get("content") and "stored_document" in doc]
+        if duplicates:
+            try:
+                recorded = set(await asyncio.to_thread(store_duplicate_documents, duplicates, user_id))
+            except Exception as e:
+                logger.error(f"Could not store records of the duplicate documents: {e}")
+                recorded = set()
+                yield f"data: {json.dumps({'event': 'error', 'message': f'Could not store duplicate documents: {e}'})}\n\n"
+            if reingest:
+                # A name stored with other content is re-ingested with this content
+                new_docs += [
+                    doc for doc in duplicates
+                    if doc["filename"] not in recorded and doc["filename"] != doc["stored_document"]["doc_name"]
+                ]
+        if new_docs:
+            try:
+                job = await asyncio.to_thread(ingest_queue.submit_documents, new_docs, user_id, reingest)
+                ingest_jobs.append({"job_id": job["_id"], "kind": job["kind"], "status": job["status"]})
+                yield f"data: {json.dumps({'event': 'ingest_queued', **ingest_jobs[-1]})}\n\n"
+            except Exception as e:
+                logger.error(f"Could not queue indexing of the uploaded documents: {e}")
+                new_docs = []
+                yield f"data: {json.dumps({'event': 'error', 'message': f'Could not queue indexing: {e}'})}\n\n"
+        indexed_names = {doc["filename"] for doc in new_docs}
+
+        # Summarize documents, up to SUMMARY_MAX_CONCURRENT at once. Each
+        # document puts its events on one queue in order, so they interleave
+        # across files but never within a file; a None marks a finished document.
+        events: asyncio.Queue = asyncio.Queue()
+        semaphore = asyncio.Semaphore(max(1, SUMMARY_MAX_CONCURRENT))
+
+        async def summarize(doc: Dict[str, Any]) -> Dict[str, Any]:
+            try:
+                async with semaphore:
+                    doc_with_summary = await summarize_document(doc, events)
+                # The document was queued without its summary; store it once done
+                if doc["filename"] in indexed_names and doc_with_summary["summary_clean"]:
+                    try:
+                        job = await asyncio.to_thread(ingest_queue.submit_summaries, [doc_with_summary], user_id)
+                        ingest_jobs.append({"job_id": job["_id"], "kind": "summaries", "status": job["status"]})
+                    except Exception as e:
+                        logger.error(f"Could not queue storing the summary of '{doc['filename']}': {e}")
+                return doc_with_summary
+            finally:
+                await events.put(None)
+
+        summary_tasks = [asyncio.create_task(summarize(doc)) for doc in text_docs]
+        try:
+            remaining = len(summary_tasks)
+            while remaining:
+                event = await events.get()
+                if event is None:
+                    remaining -= 1
+                    continue
+                yield event
+
+            # Keep upload order; re-raise the first failure
+            for task in summary_tasks:
+                doc_with_summary = task.result()
+                all_summaries.append(doc_with_summary)
+                total_summary_chars += doc_with_summary["summary_length"]
+                processed_files += 1
+        finally:
+            # The client went away or a document failed
+            for task in summary_tasks:
+                task.cancel()
+
+        # Embed and caption all uploaded images in batched model calls, off the event loop.
+        # Ingestion reuses the embeddings and only embeds images that are still missing one.
+        caption_results = []
+        if images:
+            image_rag = get_image_rag()
+            rgb_images = [img_data["image_data"]["rgb_image"] for img_data in images]
+            try:
+                embeddings = await asyncio.to_thread(
+                    image_rag.extract_image_embeddings, rgb_images
+                )
+                for img_data, embedding in zip(images, embeddings):
+                    img_data["embedding"] = embedding
+            except Exception as e:
+                logger.error(f"Error embedding uploaded images: {e}")
 
-            # Send document end marker
-            yield f"data: {json.dumps({'event': 'document_end', 'filename': doc['filename']})}\n\n"
+            try:
+                caption_results = await asyncio.to_thread(
+                    image_rag.generate_image_captions,
+                    rgb_images,
+                    content_hashes=[img_data["image_data"]["content_hash"] for img_data in images]
+                )
+            except Exception as e:
+                logger.error(f"Error captioning uploaded images: {e}")
+                caption_results = [{"caption": "", "error": str(e)} for _ in images]
 
         # Then process images - NOW WITH REAL DESCRIPTIONS
-        for img_data in images:
+        for img_data, caption_result in zip(images, caption_results):
             filename = img_data["filename"]
-            image_data = img_data["image_data"]
 
             file_start_time = time.time()
 
@@ -758,23 +890,10 @@ async def stream_and_process_files(
             yield f"data: {json.dumps({'event': 'image_start', 'filename': filename})}\n\n"
 
             try:
-                # Generate image description immediately (not in background)
-                image_rag = ImageRAG()
-
-                # Save image temporarily to generate description
-                temp_image_path = f"/tmp/{filename}"
-                image_bytes = base64.b64decode(image_data["base64_content"])
-                with open(temp_image_path, "wb") as f:
-                    f.write(image_bytes)
-
-                # Generate caption
-                caption = image_rag.generate_image_caption(temp_image_path)
-
-                # Clean up temp file
-                try:
-                    os.remove(temp_image_path)
-                except:
-                    pass
+                # Caption generated in the batch above
+                if caption_result["error"]:
+                    raise RuntimeError(caption_result["error"])
+                caption = caption_result["caption"]
 
                 # Stream the image description as summary chunks
                 caption_chunks = [caption[i:i+100] for i in range(0, len(caption), 100)]
@@ -783,7 +902,8 @@ async def stream_and_process_files(
                     yield f"data: {json.dumps({'event': 'summary_chunk', 'doc-summary': chunk})}\n\n"
                     await asyncio.sleep(0.05)  # Small delay for realistic streaming
 
-                # Store image for background processing
+                # Store image with its caption so ingestion doesn't caption it again
+                img_data["caption"] = caption
                 all_images.append(img_data)
 
                 # Add to summaries list with actual description
@@ -856,28 +976,18 @@ async def stream_and_process_files(
             })
             SimpleMetricsTracker.complete_and_print(overall_metrics)
 
-        # Send completion marker
-        yield f"data: {json.dumps({'event': 'all_complete'})}\n\n"
-
         # Debug log
-        print(f"Sending {len(all_summaries)} files to background processing "
-              f"({len([d for d in all_summaries if not d.get('is_image', False)])} documents, "
-              f"{len([d for d in all_summaries if d.get('is_image', False)])} images)")
-
-        # Start background ingestion for documents
-        if any(not d.get('is_image', False) for d in all_summaries):
-            asyncio.create_task(
-                ingest_documents_with_summaries_in_background(
-                    [d for d in all_summaries if not d.get('is_image', False)], 
-                    user_id
-                )
-            )
+        print(f"Sending {len(all_images)} images to background processing")
 
-        # Start background ingestion for images
+        # Queue durable ingestion jobs; GET /jobs/{job_id} reports when the files
+        # are searchable, and how long each file spent in each ingestion stage
         if all_images:
-            asyncio.create_task(
-                ingest_images_to_mongodb_and_opensearch(all_images, user_id)
-            )
+            job = await asyncio.to_thread(ingest_queue.submit_images, all_images, user_id)
+            ingest_jobs.append({"job_id": job["_id"], "kind": "images", "status": job["status"]})
+
+        # Send completion marker
+        stage_timings = {d["filename"]: d["stage_timings"] for d in all_summaries if d.get("stage_timings")}
+        yield f"data: {json.dumps({'event': 'all_complete', 'ingest_jobs': ingest_jobs, 'stage_timings': stage_timings})}\n\n"
 
         return
 
@@ -892,40 +1002,106 @@ async def stream_and_process_files(
             SimpleMetricsTracker.complete_and_print(overall_metrics)
 
 
-async def generate_image_description(image_data: Dict) -> str:
+async def summarize_document(doc: Dict[str, Any], events: asyncio.Queue) -> Dict[str, Any]:
     """
-    Generate a description for an image using ImageRAG.
+    Summarize one document, putting its SSE events on a queue.
     
     Args:
-        image_data: Dictionary containing image metadata and base64 content
-        
+        doc: Extracted document with "filename", "text", "content" and "page_index"
+        events: Queue receiving the document's SSE lines, in order
+    
     Returns:
-        str: Generated image caption/description
+        Dict: The document with its summary, for background ingestion
     """
-    try:
-        image_rag = ImageRAG()
-        filename = image_data["filename"]
-
-        # Save image temporarily
-        temp_image_path = f"/tmp/{filename}"
-        image_bytes = base64.b64decode(image_data["base64_content"])
-        with open(temp_image_path, "wb") as f:
-            f.write(image_bytes)
-
-        # Generate caption
-        caption = image_rag.generate_image_caption(temp_image_path)
-
-        # Clean up
-        try:
-            os.remove(temp_image_path)
-        except:
-            pass
+    from rhaiis_utils import SimpleMetricsTracker
 
-        return caption
+    filename = doc["filename"]
+    file_start_time = time.time()
+    file_metrics = SimpleMetricsTracker.start_tracking(
+        "file_summary",
+        filename=filename,
+        file_type="document",
+        content_length=len(doc['content'])
+    )
 
-    except Exception as e:
-        logger.error(f"Error generating image description: {e}")
-        return f"Image: {image_data['filename']} - Error generating description: {str(e)[:100]}"
+    # Send document start marker
+    await events.put(f"data: {json.dumps({'event': 'document_start', 'filename': filename})}\n\n")
+
+    # Send entire raw content
+    await events.put(f"data: {json.dumps({
+        'event': 'raw_content',
+        'filename': filename,
+        'doc-content': doc['content'],
+        'length': len(doc['content']),
+        'truncated': False
+    })}\n\n")
+
+    # Call RHAIIS with metrics; long documents are map-reduced. A document
+    # already stored with the same content streams its stored summary.
+    summary_phases: Dict[str, Any] = {}
+    stored = doc.get("stored_document")
+    if stored is not None:
+        summary_phases["mode"] = "stored"
+        summary_stream = _stored_summary_stream(stored.get("doc_summary", ""))
+    else:
+        summary_stream = stream_document_summary(doc, file_metrics, summary_phases)
+
+    # Collect summary chunks
+    summary_chunks = []
+
+    # Stream the summary content and collect it
+    async for chunk in summary_stream:
+        if chunk == "[DONE]":
+            break
+        if chunk.startswith("Error:"):
+            await events.put(f"data: {json.dumps({'event': 'error', 'filename': filename, 'message': chunk})}\n\n")
+            break
+
+        summary_chunks.append(chunk)
+        await events.put(f"data: {json.dumps({'event': 'summary_chunk', 'filename': filename, 'doc-summary': chunk})}\n\n")
+
+    # Combine summary chunks
+    full_summary = ''.join(summary_chunks)
+    file_processing_time = time.time() - file_start_time
+
+    stage_timings = {**doc.get("stage_timings", {}), "summary_seconds": round(file_processing_time, 3)}
+
+    print(f"  {filename}: {len(full_summary)} chars, {file_processing_time:.2f}s ({summary_phases})")
+
+    # Send document end marker
+    end_event = {
+        'event': 'document_end',
+        'filename': filename,
+        'summary_phases': summary_phases,
+        'stage_timings': stage_timings
+    }
+    if stored is not None:
+        end_event['duplicate_of'] = stored['doc_name']
+    await events.put(f"data: {json.dumps(end_event)}\n\n")
+
+    # Store summary with document
+    return {
+        "filename": filename,
+        "text": doc["text"],
+        "content": doc["content"],
+        "page_index": doc.get("page_index"),
+        "summary": full_summary,
+        "summary_clean": clean_summary_text(full_summary),
+        "is_image": False,
+        "processing_time_seconds": file_processing_time,
+        "summary_length": len(full_summary),
+        "summary_phases": summary_phases,
+        "stage_timings": stage_timings,
+        "content_hash": doc.get("content_hash"),
+        "duplicate_of": stored["doc_name"] if stored is not None else None
+    }
+
+
+async def _stored_summary_stream(summary: str) -> AsyncGenerator[str, None]:
+    """Replay a stored summary in the shape of `call_rhaiis_model_streaming`."""
+    if summary:
+        yield summary
+    yield "[DONE]"
 
 
 async def stream_rhaiis_response(prompt: str, overall_metrics: Dict[str, Any]) -> AsyncGenerator[str, None]:
@@ -0,0 +1,240 @@
+"""
+Document summarization with RHAIIS.
+
+This module provides functionality for:
+- Summarizing short documents with one streamed prompt
+- Map-reduce summarization of long documents: token-budgeted sections are
+  summarized concurrently, then their summaries are combined, over several
+  rounds if needed, into the final streamed summary
+- Reporting the time spent in each phase
+"""
+
+import asyncio
+import logging
+import time
+from functools import lru_cache
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
+
+from chunking import TokenChunker
+from config import (
+    SUMMARY_MODE,
+    SUMMARY_DIRECT_MAX_CHARS,
+    SUMMARY_SECTION_TOKENS,
+    SUMMARY_MAP_CONCURRENCY,
+    SUMMARY_REDUCE_FAN_IN,
+    SUMMARY_REDUCE_MAX_CHARS
+)
+from rag import build_summarize_prompt, build_section_summary_prompt, build_reduce_summary_prompt
+from rhaiis_utils import MAX_PROMPT_LENGTH, SimpleMetricsTracker, call_rhaiis_model_streaming
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class SummaryError(Exception):
+    """Raised when an intermediate (map or reduce) summary fails."""
+
+
+@lru_cache(maxsize=1)
+def get_section_chunker() -> TokenChunker:
+    """Return the chunker cutting documents into summarization sections."""
+    # Sections go to the LLM, not the embedder, so they may exceed its length
+    return TokenChunker(max_tokens=SUMMARY_SECTION_TOKENS, overlap_tokens=0, limit_to_model=False)
+
+
+def split_sections(content: str) -> List[str]:
+    """Split document text into sections of at most SUMMARY_SECTION_TOKENS tokens."""
+    return [chunk["text"] for chunk in get_section_chunker().iter_chunks([content])]
+
+
+def _reduce_budget(fan_in: int = SUMMARY_REDUCE_FAN_IN, max_chars: int = SUMMARY_REDUCE_MAX_CHARS) -> int:
+    """Characters of summaries a reduce prompt of `fan_in` parts holds within MAX_PROMPT_LENGTH."""
+    overhead = max(len(build_reduce_summary_prompt([""] * fan_in, final=final)) for final in (True, False))
+    return max(2, min(max_chars, MAX_PROMPT_LENGTH - overhead))
+
+
+def group_summaries(
+    summaries: List[str],
+    fan_in: int = SUMMARY_REDUCE_FAN_IN,
+    max_chars: int = SUMMARY_REDUCE_MAX_CHARS
+) -> List[List[str]]:
+    """
+    Group consecutive summaries for reduce prompts.
+
+    A group holds at most `fan_in` summaries and `max_chars` characters (less
+    if the prompt would exceed MAX_PROMPT_LENGTH), and at least two summaries
+    when two remain, so every round shrinks. Summaries longer than half the
+    budget are cut, so that two of them always fit.
+    """
+    fan_in = max(2, fan_in)
+    budget = _reduce_budget(fan_in, max_chars)
+    limit = budget // 2
+    groups: List[List[str]] = []
+    current: List[str] = []
+    current_chars = 0
+    for summary in summaries:
+        if len(summary) > limit:
+            logger.warning(f"Cutting a {len(summary)}-character summary to {limit} characters for its reduce prompt")
+            summary = summary[:limit]
+        full = len(current) >= fan_in or (len(current) >= 2 and current_chars + len(summary) > budget)
+        if full:
+            groups.append(current)
+            current, current_chars = [], 0
+        current.append(summary)
+        current_chars += len(summary)
+    if current:
+        groups.append(current)
+    return groups
+
+
+async def _complete(prompt: str, endpoint: str, **info: Any) -> str:
+    """Run one prompt to completion and return its text."""
+    metrics = SimpleMetricsTracker.start_tracking(endpoint, prompt_length=len(prompt), **info)
+    parts = []
+    async for chunk in call_rhaiis_model_streaming(prompt, metrics):
+        if chunk == "[DONE]":
+            break
+        if chunk.startswith("Error:"):
+            raise SummaryError(chunk)
+        parts.append(chunk)
+    return "".join(parts).strip()
+
+
+async def _complete_all(prompts: List[str], endpoint: str, filename: str) -> List[str]:
+    """Run prompts concurrently, at most SUMMARY_MAP_CONCURRENCY at once, keeping their order."""
+    semaphore = asyncio.Semaphore(max(1, SUMMARY_MAP_CONCURRENCY))
+
+    async def run(index: int, prompt: str) -> str:
+        async with semaphore:
+            return await _complete(prompt, endpoint, filename=filename, part=index + 1)
+
+    tasks = [asyncio.create_task(run(i, prompt)) for i, prompt in enumerate(prompts)]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        # Stop the other prompts if one failed
+        for task in tasks:
+            task.cancel()
+
+
+async def _stream(
+    prompt: str,
+    metrics: Optional[Dict[str, Any]],
+    finish: Callable[[], None]
+) -> AsyncGenerator[str, None]:
+    """
+    Relay a streamed call, calling `finish` before its last message.
+
+    Consumers stop at "[DONE]" or an error, so code after the stream's last
+    message would never run.
+    """
+    async for chunk in call_rhaiis_model_streaming(prompt, metrics):
+        if chunk == "[DONE]" or chunk.startswith("Error:"):
+            finish()
+            yield chunk
+            return
+        yield chunk
+    finish()
+
+
+def use_map_reduce(content: str) -> bool:
+    """Whether a document is summarized with map-reduce under SUMMARY_MODE."""
+    if SUMMARY_MODE == "map_reduce":
+        return True
+    if SUMMARY_MODE == "direct":
+        return False
+    return len(content) > SUMMARY_DIRECT_MAX_CHARS
+
+
+async def stream_document_summary(
+    doc: Dict[str, Any],
+    metrics: Optional[Dict[str, Any]] = None,
+    report: Optional[Dict[str, Any]] = None
+) -> AsyncGenerator[str, None]:
+    """
+    Stream the summary of a document.
+
+    Short documents are summarized with one prompt. Long ones are split into
+    sections that are summarized concurrently (map); the section summaries
+    are combined in groups until one group is left, whose combined summary is
+    streamed (reduce).
+
+    Args:
+        doc: Document with "filename" and "content"
+        metrics: Metrics of the streamed (final) RHAIIS call
+        report: Dict filled with the mode, section count and phase timings
+
+    Yields:
+        str: Summary text deltas, then "[DONE]"; or an "Error: ..." message,
+            as `call_rhaiis_model_streaming` does
+    """
+    report = report if report is not None else {}
+    content = doc["content"]
+    filename = doc.get("filename", "")
+
+    sections = None
+    if use_map_reduce(content):
+        start = time.perf_counter()
+        # Tokenizing a long document is CPU work; keep it off the event loop
+        sections = await asyncio.to_thread(split_sections, content)
+        report["split_seconds"] = round(time.perf_counter() - start, 3)
+
+    if not sections or len(sections) < 2:
+        report["mode"] = "direct"
+        start = time.perf_counter()
+
+        def finish_direct() -> None:
+            report["direct_seconds"] = round(time.perf_counter() - start, 3)
+
+        async for chunk in _stream(build_summarize_prompt(doc), metrics, finish_direct):
+            yield chunk
+        return
+
+    report.update({"mode": "map_reduce", "sections": len(sections), "reduce_rounds": 0})
+    try:
+        # Map: summarize every section
+        start = time.perf_counter()
+        summaries = await _complete_all(
+            [build_section_summary_prompt(section, i, len(sections)) for i, section in enumerate(sections, 1)],
+            "summary_map",
+            filename
+        )
+        report["map_seconds"] = round(time.perf_counter() - start, 3)
+
+        # Reduce: combine groups of summaries until one group is left
+        start = time.perf_counter()
+        groups = group_summaries(summaries)
+        while len(groups) > 1:
+            summaries = await _complete_all(
+                [build_reduce_summary_prompt(group, final=False) for group in groups],
+                "summary_reduce",
+                filename
+            )
+            groups = group_summaries(summaries)
+            report["reduce_rounds"] += 1
+    except SummaryError as e:
+        logger.error(f"Map-reduce summary of '{filename}' failed: {e}")
+        yield str(e)
+        return
+
+    def finish_reduce() -> None:
+        report["reduce_rounds"] += 1
+        report["reduce_seconds"] = round(time.perf_counter() - start, 3)
+        logger.info(
+            f"Map-reduce summary of '{filename}': {len(sections)} sections, map {report['map_seconds']:.2f}s, "
+            f"reduce {report['reduce_seconds']:.2f}s over {report['reduce_rounds']} rounds"
+        )
+
+    async for chunk in _stream(build_reduce_summary_prompt(groups[0], final=True), metrics, finish_reduce):
+        yield chunk
+
+
+# Export public API
+__all__ = [
+    "SummaryError",
+    "get_section_chunker",
+    "split_sections",
+    "group_summaries",
+    "use_map_reduce",
+    "stream_document_summary",
+]
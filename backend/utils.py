@@ -2,19 +2,24 @@
 Utility functions for document processing and text manipulation.
 
 This module provides utilities for:
-- Text extraction from PDF and DOCX files
+- Streaming text extraction from DOCX files (paragraphs and table cells in
+  document order, grouped into page-like sections for chunking)
+- Page offsets into joined text, so pages are sliced from it on demand
 - Text chunking for document processing
+- Prefetching a generator on a background thread
 - Colored console logging
 """
 
 import io
-from typing import List, Union, BinaryIO
+import queue
+import threading
+import zipfile
+import zlib
+from xml.etree.ElementTree import iterparse
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar, Union, BinaryIO
 
 from colorama import Fore, Style, init
-from docx import Document
-from PyPDF2 import PdfReader
-
-from config import CHUNK_SIZE, CHUNK_OVERLAP
+from config import CHUNK_SIZE, CHUNK_OVERLAP, DOCX_SECTION_CHARS
 from langdetect import detect_langs, DetectorFactory
 
 
@@ -58,43 +63,194 @@ def green_log(message: str) -> None:
     print(Fore.GREEN + message + Style.RESET_ALL)
 
 
-def extract_text_from_pdf(pdf: Union[str, BinaryIO]) -> str:
+T = TypeVar("T")
+
+
+def join_pages(pages: Iterable[Tuple[Optional[int], str]]) -> str:
+    """
+    Join page texts with newlines.
+    
+    This is the text the chunker sees for paged input, so chunk offsets
+    index into the result.
+    """
+    return "\n".join(text for _, text in pages)
+
+
+def page_index(pages: Iterable[Tuple[Optional[int], str]]) -> List[Tuple[Optional[int], int]]:
     """
-    Extract all text from a PDF using PyPDF2.
+    Page number and start offset of each page in `join_pages(pages)`.
     
-    Works on s390x (no C extensions required).
+    With the joined text, this stands in for the page list, so a document's
+    text is held once.
+    """
+    index = []
+    offset = 0
+    for page_number, text in pages:
+        index.append((page_number, offset))
+        offset += len(text) + 1
+    return index
+
+
+def join_indexed_pages(
+    pages: Iterable[Tuple[Optional[int], str]]
+) -> Tuple[str, List[Tuple[Optional[int], int]]]:
+    """
+    `join_pages` and `page_index` in one pass over `pages`.
+    
+    Pages are written out as they arrive, so a generator's pages are not
+    held alongside the joined text.
     
     Args:
-        pdf: Either a file path (str) or a file-like object (BinaryIO)
-             containing the PDF content
+        pages: Page number and text of each page
     
     Returns:
-        str: Extracted text from the PDF, stripped of surrounding whitespace
+        Tuple[str, List]: The joined text and its page index
     """
-    text = ""
-    try:
-        reader = PdfReader(pdf)
-        for page in reader.pages:
-            # Extract text safely; handle missing text gracefully
-            text += (page.extract_text() or "") + "\n"
-    except Exception as e:
-        print(f"Failed to extract text from {pdf}: {e}")
-    return text.strip()
+    buffer = io.StringIO()
+    index = []
+    offset = 0
+    for page_number, text in pages:
+        if index:
+            buffer.write("\n")
+            offset += 1
+        index.append((page_number, offset))
+        buffer.write(text)
+        offset += len(text)
+    return buffer.getvalue(), index
+
+
+def iter_text_pages(
+    text: str,
+    index: Sequence[Sequence[Optional[int]]]
+) -> Iterator[Tuple[Optional[int], str]]:
+    """
+    Stream the pages of a joined text, slicing one page at a time.
+    
+    Args:
+        text: Text from `join_pages`
+        index: Its `page_index`
+    
+    Yields:
+        Tuple[Optional[int], str]: Page number and the page's text
+    """
+    for i, (page_number, start) in enumerate(index):
+        end = index[i + 1][1] - 1 if i + 1 < len(index) else len(text)
+        yield page_number, text[start:end]
+
+
+# WordprocessingML element names
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_BODY, _W_P, _W_T, _W_TC = _W + "body", _W + "p", _W + "t", _W + "tc"
+_W_BREAKS = {_W + "tab": "\t", _W + "br": "\n", _W + "cr": "\n"}
+
+
+def iter_docx_blocks(docx: Union[str, BinaryIO]) -> Iterator[str]:
+    """
+    Stream the text of a DOCX document block by block.
+    
+    `word/document.xml` is decompressed and parsed incrementally, and each
+    top-level body element is discarded once read, so memory stays bounded
+    by the largest paragraph or table cell rather than the document.
+    
+    Args:
+        docx: Either a file path (str) or a file-like object (BinaryIO)
+              containing the DOCX content
+    
+    Yields:
+        str: Text of each paragraph, and of each table cell (its paragraphs
+             joined with newlines), in document order
+    """
+    with zipfile.ZipFile(docx) as archive, archive.open("word/document.xml") as xml:
+        depth = 0
+        body_depth = None
+        body = None
+        # Text of the paragraph being read and of the enclosing table cells
+        paragraph: List[str] = []
+        cells: List[List[str]] = []
+
+        for event, elem in iterparse(xml, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if elem.tag == _W_BODY:
+                    body, body_depth = elem, depth
+                elif elem.tag == _W_TC:
+                    cells.append([])
+                continue
+
+            depth -= 1
+            tag = elem.tag
+            if tag == _W_T:
+                paragraph.append(elem.text or "")
+            elif tag in _W_BREAKS:
+                paragraph.append(_W_BREAKS[tag])
+            elif tag == _W_P:
+                text = "".join(paragraph)
+                paragraph = []
+                if cells:
+                    cells[-1].append(text)
+                else:
+                    yield text
+            elif tag == _W_TC:
+                text = "\n".join(cells.pop())
+                if cells:
+                    # Nested table: part of the outer cell
+                    cells[-1].append(text)
+                else:
+                    yield text
+
+            if body is not None and depth == body_depth:
+                # A top-level paragraph or table is done; drop it
+                body.clear()
+
+
+def iter_docx_sections(
+    docx: Union[str, BinaryIO],
+    max_chars: int = DOCX_SECTION_CHARS
+) -> Iterator[Tuple[Optional[int], str]]:
+    """
+    Stream a DOCX document as page-like sections of consecutive blocks.
+    
+    Sections stand in for pages in the chunking pipeline. Past half of
+    `max_chars`, a section ends after a block chosen by its content, so
+    inserting or deleting a paragraph moves the boundaries of nearby
+    sections only. A section is also cut before it would exceed `max_chars`.
+    
+    Args:
+        docx: Either a file path (str) or a file-like object (BinaryIO)
+              containing the DOCX content
+        max_chars: Largest section, unless a single block is larger
+    
+    Yields:
+        Tuple[None, str]: No page number, and the section's blocks joined
+            with newlines; joined with `join_pages`, the sections give the
+            text of `extract_text_from_doc`
+    """
+    section: List[str] = []
+    size = 0
+    for block in iter_docx_blocks(docx):
+        if section and size + len(block) > max_chars:
+            yield None, "\n".join(section)
+            section, size = [], 0
+        section.append(block)
+        size += len(block) + 1
+        if size >= max_chars // 2 and zlib.crc32(block.encode("utf-8")) % 4 == 0:
+            yield None, "\n".join(section)
+            section, size = [], 0
+    if section:
+        yield None, "\n".join(section)
 
 
 def extract_text_from_doc(doc: bytes) -> str:
     """
-    Extract text from a DOCX document.
+    Extract text from a DOCX document, including table cells.
     
     Args:
         doc: Bytes containing the DOCX document content
     
     Returns:
-        str: Extracted text from the document
+        str: Extracted text from the document, one block per line
     """
-    doc = Document(io.BytesIO(doc))
-    text = "\n".join([para.text for para in doc.paragraphs])
-    return text
+    return "\n".join(iter_docx_blocks(io.BytesIO(doc)))
 
 
 def chunk_code(
@@ -120,4 +276,55 @@ def chunk_code(
         chunk = "\n".join(lines[i:i + size])
         if chunk.strip():
             chunks.append(chunk)
-    return chunks
\ No newline at end of file
+    return chunks
+
+
+def prefetch(iterable: Iterable[T], depth: int = 64) -> Iterator[T]:
+    """
+    Run a generator ahead on a background thread.
+    
+    Up to `depth` items are produced before the consumer asks for them, so
+    producing (e.g. parsing pages and chunking) overlaps with consuming
+    (e.g. embedding). Exceptions raised by the producer are re-raised in the
+    consumer.
+    
+    Args:
+        iterable: Items to produce
+        depth: Maximum number of items buffered ahead
+    
+    Yields:
+        The items of `iterable`, in order
+    """
+    items: "queue.Queue[tuple]" = queue.Queue(maxsize=max(1, depth))
+    stop = threading.Event()
+    
+    def put(entry: tuple) -> bool:
+        """Queue an entry; False if the consumer went away first."""
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce() -> None:
+        try:
+            for item in iterable:
+                if not put((True, item)):
+                    return
+            put((False, None))
+        except BaseException as e:
+            put((False, e))
+    
+    threading.Thread(target=produce, name="prefetch", daemon=True).start()
+    try:
+        while True:
+            has_item, value = items.get()
+            if not has_item:
+                if value is not None:
+                    raise value
+                return
+            yield value
+    finally:
+        stop.set()